@@ -2,106 +2,34 @@ from dotenv import load_dotenv
 
 load_dotenv("conf/.env")
 
-import atexit
-import json
 import os
-import traceback
-from datetime import datetime
-from urllib.parse import urlparse
 
-from apscheduler.schedulers.background import BackgroundScheduler
-from apscheduler.triggers.cron import CronTrigger
 from flask import Flask, request, jsonify
 
-from biz.gitlab.webhook_handler import slugify_url
-from biz.queue.worker import handle_merge_request_event, handle_push_event, handle_github_pull_request_event, \
-    handle_github_push_event, handle_gitea_pull_request_event, handle_gitea_push_event, handle_svn_commit_event
-from biz.service.review_service import ReviewService
-from biz.utils.im import notifier
-from biz.utils.log import logger
-from biz.utils.queue import handle_queue
-from biz.utils.reporter import Reporter
-
-from biz.utils.config_checker import check_config
+from biz import intake
 
 api_app = Flask(__name__)
 
-push_review_enabled = os.environ.get('PUSH_REVIEW_ENABLED', '0') == '1'
-
 
 @api_app.route('/')
 def home():
-    return """<h2>The code review api server is running.</h2>
-              <p>GitHub project address: <a href="https://github.com/sunmh207/AI-Codereview-Gitlab" target="_blank">
-              https://github.com/sunmh207/AI-Codereview-Gitlab</a></p>
-              <p>Gitee project address: <a href="https://gitee.com/sunminghui/ai-codereview-gitlab" target="_blank">https://gitee.com/sunminghui/ai-codereview-gitlab</a></p>
-              """
+    return intake.HOME_PAGE
 
 
 @api_app.route('/review/daily_report', methods=['GET'])
 def daily_report():
-    # 获取当前日期0点和23点59分59秒的时间戳
-    start_time = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0).timestamp()
-    end_time = datetime.now().replace(hour=23, minute=59, second=59, microsecond=0).timestamp()
-
-    try:
-        if push_review_enabled:
-            df = ReviewService().get_push_review_logs(updated_at_gte=start_time, updated_at_lte=end_time)
-        else:
-            df = ReviewService().get_mr_review_logs(updated_at_gte=start_time, updated_at_lte=end_time)
-
-        if df.empty:
-            logger.info("No data to process.")
-            return jsonify({'message': 'No data to process.'}), 200
-        # 去重：基于 (author, message) 组合
-        df_unique = df.drop_duplicates(subset=["author", "commit_messages"])
-        # 按照 author 排序
-        df_sorted = df_unique.sort_values(by="author")
-        # 转换为适合生成日报的格式
-        commits = df_sorted.to_dict(orient="records")
-        # 生成日报内容
-        report_txt = Reporter().generate_report(json.dumps(commits))
-        # 发送钉钉通知
-        notifier.send_notification(content=report_txt, msg_type="markdown", title="代码提交日报")
+    body, status_code = intake.daily_report()
+    return (body if isinstance(body, str) else jsonify(body)), status_code
 
-        # 返回生成的日报内容
-        return json.dumps(report_txt, ensure_ascii=False, indent=4)
-    except Exception as e:
-        logger.error(f"Failed to generate daily report: {e}")
-        return jsonify({'message': f"Failed to generate daily report: {e}"}), 500
 
+@api_app.route('/review/llm/status', methods=['GET'])
+def llm_status():
+    return jsonify(intake.llm_status())
 
-def setup_scheduler():
-    """
-    配置并启动定时任务调度器
-    """
-    try:
-        scheduler = BackgroundScheduler()
-        crontab_expression = os.getenv('REPORT_CRONTAB_EXPRESSION', '0 18 * * 1-5')
-        cron_parts = crontab_expression.split()
-        cron_minute, cron_hour, cron_day, cron_month, cron_day_of_week = cron_parts
 
-        # Schedule the task based on the crontab expression
-        scheduler.add_job(
-            daily_report,
-            trigger=CronTrigger(
-                minute=cron_minute,
-                hour=cron_hour,
-                day=cron_day,
-                month=cron_month,
-                day_of_week=cron_day_of_week
-            )
-        )
-
-        # Start the scheduler
-        scheduler.start()
-        logger.info("Scheduler started successfully.")
-
-        # Shut down the scheduler when exiting the app
-        atexit.register(lambda: scheduler.shutdown())
-    except Exception as e:
-        logger.error(f"Error setting up scheduler: {e}")
-        logger.error(traceback.format_exc())
+@api_app.route('/review/queue/stats', methods=['GET'])
+def review_queue_stats():
+    return jsonify(intake.review_queue_stats())
 
 
 # 处理 GitLab Merge Request Webhook
@@ -109,187 +37,14 @@ def setup_scheduler():
 def handle_webhook():
     # 获取请求的JSON数据
     if request.is_json:
-        data = request.get_json()
-        if not data:
-            return jsonify({"error": "Invalid JSON"}), 400
-        # 判断webhook来源
-        webhook_source_github = request.headers.get('X-GitHub-Event')
-        webhook_source_gitea = request.headers.get('X-Gitea-Event')
-        webhook_source_svn = request.headers.get('X-SVN-Event') or request.headers.get('X-Subversion-Event')
-
-        # 检查是否是SVN webhook（通过header或请求体中的字段判断）
-        if webhook_source_svn or data.get('revision') or data.get('svn_revision'):
-            return handle_svn_webhook(data)
-        elif webhook_source_gitea:  # Gitea webhook优先处理
-            return handle_gitea_webhook(webhook_source_gitea, data)
-        elif webhook_source_github:  # GitHub webhook
-            return handle_github_webhook(webhook_source_github, data)
-        else:  # GitLab webhook
-            return handle_gitlab_webhook(data)
+        body, status_code, headers = intake.accept_webhook(request.headers, request.get_json(silent=True))
+        return jsonify(body), status_code, headers
     else:
         return jsonify({'message': 'Invalid data format'}), 400
 
 
-def handle_github_webhook(event_type, data):
-    # 获取GitHub配置
-    github_token = os.getenv('GITHUB_ACCESS_TOKEN') or request.headers.get('X-GitHub-Token')
-    if not github_token:
-        return jsonify({'message': 'Missing GitHub access token'}), 400
-
-    github_url = os.getenv('GITHUB_URL') or 'https://github.com'
-    github_url_slug = slugify_url(github_url)
-
-    # 打印整个payload数据
-    logger.info(f'Received GitHub event: {event_type}')
-    logger.info(f'Payload: {json.dumps(data)}')
-
-    if event_type == "pull_request":
-        # 使用handle_queue进行异步处理
-        handle_queue(handle_github_pull_request_event, data, github_token, github_url, github_url_slug)
-        # 立马返回响应
-        return jsonify(
-            {'message': f'GitHub request received(event_type={event_type}), will process asynchronously.'}), 200
-    elif event_type == "push":
-        # 使用handle_queue进行异步处理
-        handle_queue(handle_github_push_event, data, github_token, github_url, github_url_slug)
-        # 立马返回响应
-        return jsonify(
-            {'message': f'GitHub request received(event_type={event_type}), will process asynchronously.'}), 200
-    else:
-        error_message = f'Only pull_request and push events are supported for GitHub webhook, but received: {event_type}.'
-        logger.error(error_message)
-        return jsonify(error_message), 400
-
-
-def handle_gitlab_webhook(data):
-    object_kind = data.get("object_kind")
-
-    # 优先从请求头获取，如果没有，则从环境变量获取，如果没有，则从推送事件中获取
-    gitlab_url = os.getenv('GITLAB_URL') or request.headers.get('X-Gitlab-Instance')
-    if not gitlab_url:
-        repository = data.get('repository')
-        if not repository:
-            return jsonify({'message': 'Missing GitLab URL'}), 400
-        homepage = repository.get("homepage")
-        if not homepage:
-            return jsonify({'message': 'Missing GitLab URL'}), 400
-        try:
-            parsed_url = urlparse(homepage)
-            gitlab_url = f"{parsed_url.scheme}://{parsed_url.netloc}/"
-        except Exception as e:
-            return jsonify({"error": f"Failed to parse homepage URL: {str(e)}"}), 400
-
-    # 优先从环境变量获取，如果没有，则从请求头获取
-    gitlab_token = os.getenv('GITLAB_ACCESS_TOKEN') or request.headers.get('X-Gitlab-Token')
-    # 如果gitlab_token为空，返回错误
-    if not gitlab_token:
-        return jsonify({'message': 'Missing GitLab access token'}), 400
-
-    gitlab_url_slug = slugify_url(gitlab_url)
-
-    # 打印整个payload数据，或根据需求进行处理
-    logger.info(f'Received event: {object_kind}')
-    logger.info(f'Payload: {json.dumps(data)}')
-
-    # 处理Merge Request Hook
-    if object_kind == "merge_request":
-        # 创建一个新进程进行异步处理
-        handle_queue(handle_merge_request_event, data, gitlab_token, gitlab_url, gitlab_url_slug)
-        # 立马返回响应
-        return jsonify(
-            {'message': f'Request received(object_kind={object_kind}), will process asynchronously.'}), 200
-    elif object_kind == "push":
-        # 创建一个新进程进行异步处理
-        # TODO check if PUSH_REVIEW_ENABLED is needed here
-        handle_queue(handle_push_event, data, gitlab_token, gitlab_url, gitlab_url_slug)
-        # 立马返回响应
-        return jsonify(
-            {'message': f'Request received(object_kind={object_kind}), will process asynchronously.'}), 200
-    else:
-        error_message = f'Only merge_request and push events are supported (both Webhook and System Hook), but received: {object_kind}.'
-        logger.error(error_message)
-        return jsonify(error_message), 400
-
-
-def handle_gitea_webhook(event_type, data):
-    gitea_token = os.getenv('GITEA_ACCESS_TOKEN') or request.headers.get('X-Gitea-Token')
-    if not gitea_token:
-        return jsonify({'message': 'Missing Gitea access token'}), 400
-
-    gitea_url = os.getenv('GITEA_URL') or 'https://gitea.com'
-    gitea_url_slug = slugify_url(gitea_url)
-
-    logger.info(f'Received Gitea event: {event_type}')
-    logger.info(f'Payload: {json.dumps(data)}')
-
-    if event_type == "pull_request":
-        handle_queue(handle_gitea_pull_request_event, data, gitea_token, gitea_url, gitea_url_slug)
-        return jsonify(
-            {'message': f'Gitea request received(event_type={event_type}), will process asynchronously.'}), 200
-    elif event_type == "push":
-        handle_queue(handle_gitea_push_event, data, gitea_token, gitea_url, gitea_url_slug)
-        return jsonify(
-            {'message': f'Gitea request received(event_type={event_type}), will process asynchronously.'}), 200
-    else:
-        error_message = f'Only pull_request and push events are supported for Gitea webhook, but received: {event_type}.'
-        logger.error(error_message)
-        return jsonify(error_message), 400
-
-
-def handle_svn_webhook(data):
-    """
-    处理SVN webhook请求
-    SVN post-commit hook通常发送的数据包含：
-    - repository_url: SVN仓库URL
-    - revision: 提交版本号
-    - author: 提交者
-    - message: 提交消息
-    - timestamp: 提交时间
-    """
-    # 获取SVN配置
-    svn_repo_url = os.getenv('SVN_REPO_URL') or data.get('repository_url')
-    svn_username = os.getenv('SVN_USERNAME') or data.get('svn_username')
-    svn_password = os.getenv('SVN_PASSWORD') or data.get('svn_password')
-    
-    # 将SVN配置信息添加到webhook数据中，以便在handler中使用
-    if svn_repo_url and not data.get('repository_url'):
-        data['repository_url'] = svn_repo_url
-    if svn_username and not data.get('svn_username'):
-        data['svn_username'] = svn_username
-    if svn_password and not data.get('svn_password'):
-        data['svn_password'] = svn_password
-    
-    # 如果webhook中没有提供仓库URL，尝试从环境变量获取
-    if not data.get('repository_url'):
-        logger.warn('SVN repository URL not found in webhook data or environment variables')
-        # 不强制要求，因为handler中会尝试从webhook数据中获取
-    
-    # TODO: 调试代码 - 调试完成后应删除或改为DEBUG级别
-    logger.info(f'Received SVN webhook event')
-    logger.info(f'Payload: {json.dumps(data)}')  # DEBUG: 打印完整payload用于调试
-    
-    # 验证必要字段
-    if not data.get('revision') and not data.get('svn_revision'):
-        error_message = 'Missing revision number in SVN webhook data'
-        logger.error(error_message)
-        return jsonify({'message': error_message}), 400
-    
-    # 生成URL slug用于队列
-    from biz.svn.webhook_handler import slugify_url as svn_slugify_url
-    svn_url_slug = svn_slugify_url(data.get('repository_url', 'svn_repo'))
-    
-    # 使用handle_queue进行异步处理（将认证信息放入data中，url_slug使用svn_url_slug）
-    # 注意：handle_queue期望的签名是 (function, data, token, url, url_slug)
-    # 对于SVN，我们将svn_repo_url作为url参数传递，token参数不使用
-    handle_queue(handle_svn_commit_event, data, '', svn_repo_url or '', svn_url_slug)
-    # 立马返回响应
-    return jsonify({'message': 'SVN webhook received, will process asynchronously.'}), 200
-
-
 if __name__ == '__main__':
-    check_config()
-    # 启动定时任务调度器
-    setup_scheduler()
+    intake.start_services()
 
     # 启动Flask API服务
     port = int(os.environ.get('SERVER_PORT', 5001))
@@ -0,0 +1,191 @@
+"""
+ASGI 入口
+
+与 api.py（Flask开发服务器）提供相同的路由，请求处理逻辑共用 biz/intake.py：
+- 事件循环只负责接收请求体和返回响应，JSON解析、去重和入队（async模式下启动进程、rq模式下写Redis）
+  在有界线程池中执行，慢请求不会阻塞其他连接的确认；
+- 同时处理中的webhook超过 ASGI_MAX_IN_FLIGHT 时直接返回429（带Retry-After），由Git平台稍后重试；
+- 请求体超过 ASGI_MAX_BODY_BYTES 时返回413。
+
+启动方式（单个进程，定时日报、任务日志重放、发件箱线程在lifespan启动时开启）：
+
+    uvicorn asgi:app --host 0.0.0.0 --port 5001
+"""
+from dotenv import load_dotenv
+
+load_dotenv("conf/.env")
+
+import asyncio
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Tuple
+
+from biz import intake
+from biz.utils.log import logger
+
+ASGI_MAX_IN_FLIGHT = int(os.getenv('ASGI_MAX_IN_FLIGHT', 64))
+ASGI_MAX_BODY_BYTES = int(os.getenv('ASGI_MAX_BODY_BYTES', 10 * 1024 * 1024))
+ASGI_INTAKE_THREADS = int(os.getenv('ASGI_INTAKE_THREADS', 8))
+
+
+class Headers:
+    """ASGI请求头的大小写不敏感只读映射，供 intake 与 webhook_dedupe 使用"""
+
+    def __init__(self, raw_headers: List[Tuple[bytes, bytes]]):
+        self._headers = {name.decode('latin-1').lower(): value.decode('latin-1') for name, value in raw_headers}
+
+    def get(self, name: str, default=None):
+        return self._headers.get(name.lower(), default)
+
+    def __contains__(self, name: str) -> bool:
+        return name.lower() in self._headers
+
+
+class BodyTooLarge(Exception):
+    pass
+
+
+class WebhookApp:
+    def __init__(self, max_in_flight: int = ASGI_MAX_IN_FLIGHT, max_body_bytes: int = ASGI_MAX_BODY_BYTES,
+                 intake_threads: int = ASGI_INTAKE_THREADS, start_services: bool = True):
+        self.max_in_flight = max_in_flight
+        self.max_body_bytes = max_body_bytes
+        self.start_services = start_services
+        self.executor = ThreadPoolExecutor(max_workers=intake_threads, thread_name_prefix='webhook-intake')
+        self.in_flight = 0
+        self.rejected = 0
+        self.routes = {
+            ('GET', '/'): self.home,
+            ('POST', '/review/webhook'): self.webhook,
+            ('GET', '/review/daily_report'): self.daily_report,
+            ('GET', '/review/llm/status'): self.llm_status,
+            ('GET', '/review/queue/stats'): self.queue_stats,
+        }
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            return
+        handler = self.routes.get((scope['method'], scope['path']))
+        if handler is None:
+            if any(path == scope['path'] for _, path in self.routes):
+                await self.send_json(send, {'message': 'Method Not Allowed'}, 405)
+            else:
+                await self.send_json(send, {'message': 'Not Found'}, 404)
+            return
+        response_started = False
+
+        async def tracked_send(message):
+            nonlocal response_started
+            if message['type'] == 'http.response.start':
+                response_started = True
+            await send(message)
+
+        try:
+            await handler(scope, receive, tracked_send)
+        except Exception:
+            logger.exception(f"Failed to handle {scope['method']} {scope['path']}")
+            # 响应已开始发送时无法再返回500，只记录日志
+            if not response_started:
+                await self.send_json(send, {'message': 'Internal Server Error'}, 500)
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                if self.start_services:
+                    await asyncio.get_running_loop().run_in_executor(None, intake.start_services)
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.executor.shutdown(wait=True)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    @staticmethod
+    async def send_response(send, body: bytes, status: int, content_type: str, headers: Dict[str, str] = None):
+        raw_headers = [(b'content-type', content_type.encode('latin-1')),
+                       (b'content-length', str(len(body)).encode('latin-1'))]
+        for name, value in (headers or {}).items():
+            raw_headers.append((name.lower().encode('latin-1'), str(value).encode('latin-1')))
+        await send({'type': 'http.response.start', 'status': status, 'headers': raw_headers})
+        await send({'type': 'http.response.body', 'body': body})
+
+    async def send_json(self, send, payload: Any, status: int, headers: Dict[str, str] = None):
+        body = json.dumps(payload).encode('utf-8')
+        await self.send_response(send, body, status, 'application/json', headers)
+
+    async def read_body(self, receive) -> bytes:
+        chunks = []
+        size = 0
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                break
+            chunk = message.get('body', b'')
+            size += len(chunk)
+            if size > self.max_body_bytes:
+                raise BodyTooLarge()
+            chunks.append(chunk)
+            if not message.get('more_body', False):
+                break
+        return b''.join(chunks)
+
+    async def home(self, scope, receive, send):
+        await self.send_response(send, intake.HOME_PAGE.encode('utf-8'), 200, 'text/html; charset=utf-8')
+
+    async def webhook(self, scope, receive, send):
+        if self.in_flight >= self.max_in_flight:
+            self.rejected += 1
+            await self.send_json(send, {'message': 'Too many webhook requests in flight'}, 429,
+                                 intake.retry_after_headers())
+            return
+        self.in_flight += 1
+        try:
+            headers = Headers(scope['headers'])
+            # 与Flask的request.is_json判断一致
+            mimetype = (headers.get('content-type') or '').split(';')[0].strip().lower()
+            if not (mimetype == 'application/json' or (mimetype.startswith('application/') and mimetype.endswith('+json'))):
+                await self.send_json(send, {'message': 'Invalid data format'}, 400)
+                return
+            try:
+                body = await self.read_body(receive)
+            except BodyTooLarge:
+                await self.send_json(send, {'message': 'Request body too large'}, 413)
+                return
+            payload, status_code, extra_headers = await asyncio.get_running_loop().run_in_executor(
+                self.executor, self.accept, headers, body)
+            await self.send_json(send, payload, status_code, extra_headers)
+        finally:
+            self.in_flight -= 1
+
+    @staticmethod
+    def accept(headers: Headers, body: bytes) -> intake.Response:
+        return intake.accept_webhook(headers, intake.parse_json(body))
+
+    async def daily_report(self, scope, receive, send):
+        # 生成日报需要调用LLM，使用默认线程池，不占用webhook的接入线程
+        body, status_code = await asyncio.get_running_loop().run_in_executor(None, intake.daily_report)
+        if isinstance(body, str):
+            await self.send_response(send, body.encode('utf-8'), status_code, 'text/html; charset=utf-8')
+        else:
+            await self.send_json(send, body, status_code)
+
+    async def llm_status(self, scope, receive, send):
+        await self.send_json(send, await asyncio.get_running_loop().run_in_executor(None, intake.llm_status), 200)
+
+    async def queue_stats(self, scope, receive, send):
+        stats = await asyncio.get_running_loop().run_in_executor(None, intake.review_queue_stats)
+        stats['asgi'] = {'in_flight': self.in_flight, 'max_in_flight': self.max_in_flight, 'rejected': self.rejected}
+        await self.send_json(send, stats, 200)
+
+
+app = WebhookApp()
+
+
+if __name__ == '__main__':
+    import uvicorn
+
+    uvicorn.run(app, host='0.0.0.0', port=int(os.environ.get('SERVER_PORT', 5001)))
@@ -0,0 +1,16 @@
+"""
+进程启动钩子
+
+导入业务模块时不再访问数据库（原先导入 review_service 即执行数据库迁移，导入 rule_service 即检查并导入YAML规则），
+pandas、tiktoken、matplotlib 以及各LLM SDK也改为在首次使用时导入，fork出的子进程、rq任务、单元测试只承担实际用到的部分。
+- api.py、ui.py 等入口在启动时调用 bootstrap()，提前完成迁移和规则初始化；
+- 未调用 bootstrap() 的进程（如rq worker）首次访问数据库时自动执行迁移，规则在首次读取时从YAML导入。
+bootstrap() 可重复调用，每个进程只执行一次（Streamlit每次交互重新运行脚本也不会重复初始化）。
+"""
+from biz.service.review_service import ReviewService
+from biz.service.rule_service import init_rules
+
+
+def bootstrap():
+    ReviewService.ensure_db()
+    init_rules()
@@ -1,7 +1,7 @@
 class MergeRequestReviewEntity:
     def __init__(self, project_name: str, author: str, source_branch: str, target_branch: str, updated_at: int,
                  commits: list, score: float, url: str, review_result: str, url_slug: str, webhook_data: dict,
-                 additions: int, deletions: int, last_commit_id: str):
+                 additions: int, deletions: int, last_commit_id: str, cached: bool = False):
         self.project_name = project_name
         self.author = author
         self.source_branch = source_branch
@@ -16,6 +16,8 @@ class MergeRequestReviewEntity:
         self.additions = additions
         self.deletions = deletions
         self.last_commit_id = last_commit_id
+        # 审查结果是否来自AI Review缓存
+        self.cached = cached
 
     @property
     def commit_messages(self):
@@ -25,7 +27,8 @@ class MergeRequestReviewEntity:
 
 class PushReviewEntity:
     def __init__(self, project_name: str, author: str, branch: str, updated_at: int, commits: list, score: float,
-                 review_result: str, url_slug: str, webhook_data: dict, additions: int, deletions: int):
+                 review_result: str, url_slug: str, webhook_data: dict, additions: int, deletions: int,
+                 cached: bool = False):
         self.project_name = project_name
         self.author = author
         self.branch = branch
@@ -37,6 +40,8 @@ class PushReviewEntity:
         self.webhook_data = webhook_data
         self.additions = additions
         self.deletions = deletions
+        # 审查结果是否来自AI Review缓存
+        self.cached = cached
 
     @property
     def commit_messages(self):
@@ -1,6 +1,7 @@
 from blinker import Signal
 
 from biz.entity.review_entity import MergeRequestReviewEntity, PushReviewEntity
+from biz.event.outbox import outbox, OutboxHandler, EVENT_OUTBOX_ENABLED
 from biz.service.review_service import ReviewService
 from biz.utils.im import notifier
 
@@ -11,9 +12,8 @@ event_manager = {
 }
 
 
-# 定义事件处理函数
-def on_merge_request_reviewed(mr_review_entity: MergeRequestReviewEntity):
-    # 发送IM消息通知
+def merge_request_notification(mr_review_entity: MergeRequestReviewEntity) -> dict:
+    """合并请求审查完成的IM消息（notifier.send_notification的参数）"""
     im_msg = f"""
 ### 🔀 {mr_review_entity.project_name}: Merge Request
 
@@ -31,16 +31,13 @@ def on_merge_request_reviewed(mr_review_entity: MergeRequestReviewEntity):
 
 {mr_review_entity.review_result}
     """
-    notifier.send_notification(content=im_msg, msg_type='markdown', title='Merge Request Review',
-                               project_name=mr_review_entity.project_name, url_slug=mr_review_entity.url_slug,
-                               webhook_data=mr_review_entity.webhook_data)
-
-    # 记录到数据库
-    ReviewService().insert_mr_review_log(mr_review_entity)
+    return dict(content=im_msg, msg_type='markdown', title='Merge Request Review',
+                project_name=mr_review_entity.project_name, url_slug=mr_review_entity.url_slug,
+                webhook_data=mr_review_entity.webhook_data)
 
 
-def on_push_reviewed(entity: PushReviewEntity):
-    # 发送IM消息通知
+def push_notification(entity: PushReviewEntity) -> dict:
+    """推送审查完成的IM消息（notifier.send_notification的参数）"""
     im_msg = f"### 🚀 {entity.project_name}: Push\n\n"
     im_msg += "#### 提交记录:\n"
 
@@ -58,14 +55,43 @@ def on_push_reviewed(entity: PushReviewEntity):
 
     if entity.review_result:
         im_msg += f"#### AI Review 结果: \n {entity.review_result}\n\n"
-    notifier.send_notification(content=im_msg, msg_type='markdown',title=f"{entity.project_name} Push Event",
-                               project_name=entity.project_name, url_slug=entity.url_slug,
-                               webhook_data=entity.webhook_data)
+    return dict(content=im_msg, msg_type='markdown', title=f"{entity.project_name} Push Event",
+                project_name=entity.project_name, url_slug=entity.url_slug,
+                webhook_data=entity.webhook_data)
+
+
+# 定义事件处理函数
+def on_merge_request_reviewed(mr_review_entity: MergeRequestReviewEntity):
+    if EVENT_OUTBOX_ENABLED:
+        # 写入发件箱后立即返回，由api.py中的分发线程记录到数据库并发送通知
+        outbox.append("merge_request_reviewed", mr_review_entity)
+        return
+
+    # 发送IM消息通知
+    notifier.send_notification(**merge_request_notification(mr_review_entity))
+
+    # 记录到数据库
+    ReviewService().insert_mr_review_log(mr_review_entity)
+
+
+def on_push_reviewed(entity: PushReviewEntity):
+    if EVENT_OUTBOX_ENABLED:
+        outbox.append("push_reviewed", entity)
+        return
+
+    # 发送IM消息通知
+    notifier.send_notification(**push_notification(entity))
 
     # 记录到数据库
     ReviewService().insert_push_review_log(entity)
 
 
+# 发件箱分发线程处理事件的方式
+outbox.register("merge_request_reviewed", OutboxHandler(MergeRequestReviewEntity, ReviewService.write_mr_review_log,
+                                                        merge_request_notification))
+outbox.register("push_reviewed", OutboxHandler(PushReviewEntity, ReviewService.write_push_review_log,
+                                               push_notification))
+
 # 连接事件处理函数到事件信号
 event_manager["merge_request_reviewed"].connect(on_merge_request_reviewed)
 event_manager["push_reviewed"].connect(on_push_reviewed)
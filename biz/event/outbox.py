@@ -0,0 +1,211 @@
+"""
+审查完成事件的发件箱
+
+EVENT_OUTBOX_ENABLED=1 时，merge_request_reviewed / push_reviewed 事件处理函数只在一个事务中把事件写入
+data/data.db 的 event_outbox 表，审查任务随即结束；api.py 中的后台分发线程负责后续处理：
+- 每次取出最多 EVENT_OUTBOX_BATCH_SIZE 个事件，在同一个事务中批量写入审核日志；
+- 按 (事件, 通知渠道) 并发发送IM通知，只重试发送失败的渠道；
+- 失败的事件按退避时间重试，超过 EVENT_OUTBOX_MAX_ATTEMPTS 次后标记为dead，保留在表中以便排查。
+worker（async子进程、rq worker）与 api.py 共享 data 目录，分发线程只在 api.py 进程中运行。
+"""
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Dict, List
+
+from biz.service.review_service import ReviewService
+from biz.utils.im import notifier
+from biz.utils.log import logger
+
+EVENT_OUTBOX_ENABLED = os.getenv('EVENT_OUTBOX_ENABLED', '0') == '1'
+EVENT_OUTBOX_BATCH_SIZE = int(os.getenv('EVENT_OUTBOX_BATCH_SIZE', 50))
+EVENT_OUTBOX_INTERVAL = float(os.getenv('EVENT_OUTBOX_INTERVAL', 2))
+EVENT_OUTBOX_MAX_ATTEMPTS = int(os.getenv('EVENT_OUTBOX_MAX_ATTEMPTS', 5))
+EVENT_OUTBOX_RETRY_DELAY = int(os.getenv('EVENT_OUTBOX_RETRY_DELAY', 30))
+EVENT_OUTBOX_NOTIFY_WORKERS = int(os.getenv('EVENT_OUTBOX_NOTIFY_WORKERS', 4))
+
+STATE_PENDING = 'pending'
+STATE_DEAD = 'dead'
+
+
+@dataclass
+class OutboxHandler:
+    entity_class: type
+    # 在分发线程的事务中写入审核日志
+    persist: Callable
+    # 返回 notifier.send_notification 的参数
+    notification: Callable[[object], Dict]
+
+
+class Outbox:
+    def __init__(self, connect: Callable = None, max_attempts: int = EVENT_OUTBOX_MAX_ATTEMPTS,
+                 retry_delay: int = EVENT_OUTBOX_RETRY_DELAY):
+        self._connect = connect or ReviewService.get_db_connection
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.handlers: Dict[str, OutboxHandler] = {}
+        self._executor = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def register(self, event_type: str, handler: OutboxHandler):
+        self.handlers[event_type] = handler
+
+    def append(self, event_type: str, entity) -> int:
+        """记录一个事件，审查任务只需等待这一次写入"""
+        now = int(time.time())
+        conn = self._connect()
+        try:
+            cursor = conn.execute('''
+                INSERT INTO event_outbox (event_type, payload, state, next_attempt_at, created_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', (event_type, json.dumps(vars(entity), ensure_ascii=False, default=str), STATE_PENDING, now, now, now))
+            conn.commit()
+            return cursor.lastrowid
+        finally:
+            conn.close()
+
+    def _persist(self, conn, events: List[dict]):
+        """批量写入审核日志；批量事务失败时逐个重试，定位出错的事件"""
+        pending = [event for event in events if not event['persisted']]
+        if not pending:
+            return
+        try:
+            cursor = conn.cursor()
+            for event in pending:
+                event['handler'].persist(cursor, event['entity'])
+                cursor.execute('UPDATE event_outbox SET persisted = 1 WHERE id = ?', (event['id'],))
+            conn.commit()
+            for event in pending:
+                event['persisted'] = 1
+            return
+        except Exception as e:
+            conn.rollback()
+            logger.warn(f'Batch persist of {len(pending)} outbox events failed, retry one by one: {e}')
+        for event in pending:
+            try:
+                cursor = conn.cursor()
+                event['handler'].persist(cursor, event['entity'])
+                cursor.execute('UPDATE event_outbox SET persisted = 1 WHERE id = ?', (event['id'],))
+                conn.commit()
+                event['persisted'] = 1
+            except Exception as e:
+                conn.rollback()
+                event['errors'].append(f'persist: {e}')
+
+    def _notify(self, events: List[dict]):
+        """按 (事件, 渠道) 并发发送通知，记录每个事件仍未发送成功的渠道"""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=EVENT_OUTBOX_NOTIFY_WORKERS,
+                                                thread_name_prefix='outbox-notify')
+        futures = []
+        for event in events:
+            if not event['persisted']:
+                continue
+            kwargs = event['handler'].notification(event['entity'])
+            for channel in event['channels']:
+                futures.append((event, channel,
+                                self._executor.submit(notifier.send_notification, channels=[channel], **kwargs)))
+        for event in events:
+            event['failed_channels'] = [] if event['persisted'] else event['channels']
+        for event, channel, future in futures:
+            try:
+                failed = future.result()
+            except Exception as e:
+                failed = [channel]
+                event['errors'].append(f'{channel}: {e}')
+            if failed:
+                event['failed_channels'].append(channel)
+
+    def dispatch_once(self, batch_size: int = EVENT_OUTBOX_BATCH_SIZE) -> int:
+        """
+        处理一批到期的事件
+        :return: 本次处理的事件数
+        """
+        now = int(time.time())
+        conn = self._connect()
+        try:
+            rows = conn.execute('''
+                SELECT id, event_type, payload, persisted, pending_channels, attempts FROM event_outbox
+                WHERE state = ? AND next_attempt_at <= ? ORDER BY id LIMIT ?
+            ''', (STATE_PENDING, now, batch_size)).fetchall()
+            events = []
+            for record_id, event_type, payload, persisted, pending_channels, attempts in rows:
+                handler = self.handlers.get(event_type)
+                try:
+                    if handler is None:
+                        raise ValueError(f'no outbox handler for event type: {event_type}')
+                    entity = handler.entity_class(**json.loads(payload))
+                except Exception as e:
+                    conn.execute('UPDATE event_outbox SET state = ?, last_error = ?, updated_at = ? WHERE id = ?',
+                                 (STATE_DEAD, str(e), now, record_id))
+                    conn.commit()
+                    logger.error(f'Invalid outbox event {record_id}: {e}')
+                    continue
+                events.append({
+                    'id': record_id, 'handler': handler, 'entity': entity, 'persisted': persisted,
+                    'channels': json.loads(pending_channels) if pending_channels else list(notifier.NOTIFY_CHANNELS),
+                    'attempts': attempts, 'errors': [],
+                })
+            if not events:
+                return len(rows)
+
+            self._persist(conn, events)
+            self._notify(events)
+
+            for event in events:
+                if event['persisted'] and not event['failed_channels']:
+                    conn.execute('DELETE FROM event_outbox WHERE id = ?', (event['id'],))
+                    continue
+                attempts = event['attempts'] + 1
+                error = '; '.join(event['errors']) or f"notify failed: {','.join(event['failed_channels'])}"
+                state = STATE_DEAD if attempts >= self.max_attempts else STATE_PENDING
+                conn.execute('''
+                    UPDATE event_outbox SET state = ?, pending_channels = ?, attempts = ?, next_attempt_at = ?,
+                                            last_error = ?, updated_at = ?
+                    WHERE id = ?
+                ''', (state, json.dumps(event['failed_channels']), attempts,
+                      now + self.retry_delay * (2 ** (attempts - 1)), error, now, event['id']))
+                if state == STATE_DEAD:
+                    logger.error(f'Outbox event {event["id"]} failed after {attempts} attempts: {error}')
+                else:
+                    logger.warn(f'Outbox event {event["id"]} failed (attempt {attempts}), will retry: {error}')
+            conn.commit()
+            return len(rows)
+        finally:
+            conn.close()
+
+    def _run(self):
+        while True:
+            try:
+                processed = self.dispatch_once()
+            except Exception as e:
+                logger.error(f'Outbox dispatch failed: {e}')
+                processed = 0
+            # 一批处理满时立即处理下一批
+            if processed < EVENT_OUTBOX_BATCH_SIZE:
+                time.sleep(EVENT_OUTBOX_INTERVAL)
+
+    def start(self):
+        """启动后台分发线程（api.py启动时调用）"""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name='event-outbox-dispatcher', daemon=True)
+            self._thread.start()
+        logger.info(f'Event outbox dispatcher started, batch size: {EVENT_OUTBOX_BATCH_SIZE}, '
+                    f'notify workers: {EVENT_OUTBOX_NOTIFY_WORKERS}')
+
+    def stats(self) -> Dict[str, int]:
+        conn = self._connect()
+        try:
+            rows = conn.execute('SELECT state, COUNT(*) FROM event_outbox GROUP BY state').fetchall()
+            return {state: count for state, count in rows}
+        finally:
+            conn.close()
+
+
+outbox = Outbox()
@@ -0,0 +1,59 @@
+import os
+import tempfile
+from unittest import TestCase, main
+from unittest.mock import patch
+
+from biz.entity.review_entity import PushReviewEntity
+from biz.event.event_manager import push_notification
+from biz.event.outbox import Outbox, OutboxHandler, STATE_DEAD
+from biz.service.review_service import ReviewService
+
+
+class TestOutbox(TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        patcher = patch.object(ReviewService, 'DB_FILE', os.path.join(self.tmpdir.name, 'data.db'))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        ReviewService.init_db()
+        self.outbox = Outbox(max_attempts=2, retry_delay=0)
+        self.outbox.register('push_reviewed', OutboxHandler(PushReviewEntity, ReviewService.write_push_review_log,
+                                                            push_notification))
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    @staticmethod
+    def _entity(author='a'):
+        return PushReviewEntity(project_name='p', author=author, branch='main', updated_at=1,
+                                commits=[{'message': 'fix', 'author': author}], score=80, review_result='总分: 80',
+                                url_slug='git_test_com', webhook_data={'ref': 'main'}, additions=1, deletions=0)
+
+    def test_batch_persist_and_notify(self):
+        self.outbox.append('push_reviewed', self._entity('a'))
+        self.outbox.append('push_reviewed', self._entity('b'))
+        with patch('biz.utils.im.notifier.send_notification', return_value=[]) as send:
+            self.assertEqual(self.outbox.dispatch_once(), 2)
+        # 每个事件向每个渠道单独发送一次
+        self.assertEqual(send.call_count, 8)
+        self.assertEqual(sorted(ReviewService.get_push_review_logs()['author'].tolist()), ['a', 'b'])
+        self.assertEqual(self.outbox.stats(), {})
+
+    def test_retry_only_failed_channels(self):
+        self.outbox.append('push_reviewed', self._entity())
+
+        def fail_wecom(channels, **kwargs):
+            return ['wecom'] if channels == ['wecom'] else []
+
+        with patch('biz.utils.im.notifier.send_notification', side_effect=fail_wecom):
+            self.outbox.dispatch_once()
+        with patch('biz.utils.im.notifier.send_notification', side_effect=fail_wecom) as send:
+            self.outbox.dispatch_once()
+        # 重试时只发送失败的渠道，审核日志不会重复写入
+        self.assertEqual([call.kwargs['channels'] for call in send.call_args_list], [['wecom']])
+        self.assertEqual(len(ReviewService.get_push_review_logs()), 1)
+        self.assertEqual(self.outbox.stats(), {STATE_DEAD: 1})
+
+
+if __name__ == '__main__':
+    main()
@@ -1,12 +1,11 @@
 import os
 import re
-import time
+from typing import Optional
 from urllib.parse import urljoin
 
-import fnmatch
-import requests
-
+from biz.utils import scm_http
 from biz.utils.log import logger
+from biz.utils.protected_branch_cache import protected_branch_cache
 
 
 def filter_changes(changes: list):
@@ -99,38 +98,30 @@ class PullRequestHandler:
             logger.error("Missing repository information for Gitea pull request.")
             return []
 
-        max_retries = 3
-        retry_delay = 10
+        # Gitea计算diff可能存在延迟，返回空列表时由调用方延迟重新入队重试，这里不阻塞等待
         endpoint = f"api/v1/repos/{self.repo_full_name}/pulls/{self.pull_request_index}/files"
         url = urljoin(f"{self.gitea_url}/", endpoint)
 
-        for attempt in range(max_retries):
-            response = requests.get(url, headers=self._headers(), verify=False)
-            logger.debug(
-                f"Get changes response from Gitea (attempt {attempt + 1}): {response.status_code}, {response.text}, URL: {url}")
-
-            if response.status_code == 200:
-                files = response.json() or []
-                if files:
-                    changes = []
-                    for file in files:
-                        changes.append({
-                            'diff': file.get('patch') or file.get('diff') or '',
-                            'new_path': file.get('filename') or file.get('path') or '',
-                            'status': file.get('status', ''),
-                            'additions': file.get('additions'),
-                            'deletions': file.get('deletions')
-                        })
-                    return changes
-                logger.info(
-                    f"Changes is empty, retrying in {retry_delay} seconds... (attempt {attempt + 1}/{max_retries}), URL: {url}")
-                time.sleep(retry_delay)
-            else:
-                logger.warn(f"Failed to get changes from Gitea (URL: {url}): {response.status_code}, {response.text}")
-                return []
-
-        logger.warning(f"Max retries ({max_retries}) reached. Changes is still empty.")
-        return []
+        response = scm_http.get(url, headers=self._headers(), verify=False)
+        logger.debug(f"Get changes response from Gitea: {response.status_code}, {response.text}, URL: {url}")
+
+        if response.status_code == 200:
+            files = response.json() or []
+            if not files:
+                logger.info(f"Changes is empty, URL: {url}")
+            changes = []
+            for file in files:
+                changes.append({
+                    'diff': file.get('patch') or file.get('diff') or '',
+                    'new_path': file.get('filename') or file.get('path') or '',
+                    'status': file.get('status', ''),
+                    'additions': file.get('additions'),
+                    'deletions': file.get('deletions')
+                })
+            return changes
+        else:
+            logger.warn(f"Failed to get changes from Gitea (URL: {url}): {response.status_code}, {response.text}")
+            return []
 
     def get_pull_request_commits(self) -> list:
         if self.event_type != 'pull_request':
@@ -142,7 +133,7 @@ class PullRequestHandler:
 
         endpoint = f"api/v1/repos/{self.repo_full_name}/pulls/{self.pull_request_index}/commits"
         url = urljoin(f"{self.gitea_url}/", endpoint)
-        response = requests.get(url, headers=self._headers(), verify=False)
+        response = scm_http.get(url, headers=self._headers(), verify=False)
         logger.debug(f"Get commits response from Gitea: {response.status_code}, {response.text}")
 
         if response.status_code == 200:
@@ -168,34 +159,51 @@ class PullRequestHandler:
     def add_pull_request_notes(self, review_result: str):
         if not self.repo_full_name or not self.pull_request_index:
             logger.error("Missing repository information for adding pull request notes.")
-            return
+            return None
 
         endpoint = f"api/v1/repos/{self.repo_full_name}/issues/{self.pull_request_index}/comments"
         url = urljoin(f"{self.gitea_url}/", endpoint)
-        response = requests.post(url, headers=self._headers(), json={'body': review_result}, verify=False)
+        response = scm_http.post(url, headers=self._headers(), json={'body': review_result}, verify=False)
         logger.debug(f"Add comment to Gitea pull request {url}: {response.status_code}, {response.text}")
 
         if response.status_code == 201:
             logger.info("Comment successfully added to Gitea pull request.")
+            return response.json().get('id')
         else:
             logger.error(f"Failed to add comment to Gitea pull request: {response.status_code}")
             logger.error(response.text)
+            return None
+
+    def update_pull_request_notes(self, comment_id, review_result: str) -> bool:
+        endpoint = f"api/v1/repos/{self.repo_full_name}/issues/comments/{comment_id}"
+        url = urljoin(f"{self.gitea_url}/", endpoint)
+        response = scm_http.patch(url, headers=self._headers(), json={'body': review_result}, verify=False)
+        logger.debug(f"Update comment to Gitea pull request {url}: {response.status_code}")
+
+        if response.status_code == 200:
+            return True
+        logger.error(f"Failed to update comment on Gitea pull request: {response.status_code}, {response.text}")
+        return False
 
     def target_branch_protected(self) -> bool:
         if not self.repo_full_name or not self.target_branch:
             return False
 
+        return protected_branch_cache.is_protected(self.gitea_url, self.repo_full_name, self.target_branch,
+                                                   self.get_protected_branches)
+
+    def get_protected_branches(self) -> Optional[list]:
         endpoint = f"api/v1/repos/{self.repo_full_name}/branches?protected=true"
         url = urljoin(f"{self.gitea_url}/", endpoint)
-        response = requests.get(url, headers=self._headers(), verify=False)
+        response = scm_http.get(url, headers=self._headers(), verify=False)
         logger.debug(f"Get protected branches response from Gitea: {response.status_code}, {response.text}")
 
         if response.status_code == 200:
             branches = response.json() or []
-            return any(fnmatch.fnmatch(self.target_branch, branch.get('name', '')) for branch in branches)
+            return [branch.get('name', '') for branch in branches]
         else:
             logger.warn(f"Failed to get protected branches from Gitea: {response.status_code}, {response.text}")
-            return False
+            return None
 
 
 class PushHandler:
@@ -265,7 +273,7 @@ class PushHandler:
 
         # endpoint = f"api/v1/repos/{self.repo_full_name}/git/commits/{last_commit_id}/comments"
         # url = urljoin(f"{self.gitea_url}/", endpoint)
-        # response = requests.post(url, headers=self._headers(), json={'body': message}, verify=False)
+        # response = scm_http.post(url, headers=self._headers(), json={'body': message}, verify=False)
         # logger.debug(f"Add comment to Gitea commit {last_commit_id}: {response.status_code}, {response.text}")
 
         # if response.status_code == 201:
@@ -283,7 +291,7 @@ class PushHandler:
 
         endpoint = f"api/v1/repos/{self.repo_full_name}/git/commits/{commit_id}.diff"
         url = urljoin(f"{self.gitea_url}/", endpoint)
-        response = requests.get(url, headers=self._headers(), verify=False)
+        response = scm_http.get(url, headers=self._headers(), verify=False)
         logger.debug(
             f"Get commit diff from Gitea: {response.status_code}, {url}")
         if response.status_code == 200:
@@ -1,10 +1,10 @@
 import os
 import re
-import time
+from typing import Optional
 
-import requests
-import fnmatch
+from biz.utils import scm_http
 from biz.utils.log import logger
+from biz.utils.protected_branch_cache import protected_branch_cache
 
 
 
@@ -83,46 +83,36 @@ class PullRequestHandler:
             logger.warn(f"Invalid event type: {self.event_type}. Only 'pull_request' event is supported now.")
             return []
 
-        # GitHub pull request changes API可能存在延迟，多次尝试
-        max_retries = 3  # 最大重试次数
-        retry_delay = 10  # 重试间隔时间（秒）
-        for attempt in range(max_retries):
-            # 调用 GitHub API 获取 Pull Request 的 files（变更）
-            url = f"https://api.github.com/repos/{self.repo_full_name}/pulls/{self.pull_request_number}/files"
-            headers = {
-                'Authorization': f'token {self.github_token}',
-                'Accept': 'application/vnd.github.v3+json'
-            }
-            response = requests.get(url, headers=headers)
-            logger.debug(
-                f"Get changes response from GitHub (attempt {attempt + 1}): {response.status_code}, {response.text}, URL: {url}")
-
-            # 检查请求是否成功
-            if response.status_code == 200:
-                files = response.json()
-                if files:
-                    # 转换成GitLab格式的changes
-                    changes = []
-                    for file in files:
-                        change = {
-                            'old_path': file.get('filename'),
-                            'new_path': file.get('filename'),
-                            'diff': file.get('patch', ''),
-                            'additions': file.get('additions', 0),
-                            'deletions': file.get('deletions', 0)
-                        }
-                        changes.append(change)
-                    return changes
-                else:
-                    logger.info(
-                        f"Changes is empty, retrying in {retry_delay} seconds... (attempt {attempt + 1}/{max_retries}), URL: {url}")
-                    time.sleep(retry_delay)
-            else:
-                logger.warn(f"Failed to get changes from GitHub (URL: {url}): {response.status_code}, {response.text}")
-                return []
+        # 调用 GitHub API 获取 Pull Request 的 files（变更）
+        # GitHub计算diff可能存在延迟，返回空列表时由调用方延迟重新入队重试，这里不阻塞等待
+        url = f"https://api.github.com/repos/{self.repo_full_name}/pulls/{self.pull_request_number}/files"
+        headers = {
+            'Authorization': f'token {self.github_token}',
+            'Accept': 'application/vnd.github.v3+json'
+        }
+        response = scm_http.get(url, headers=headers)
+        logger.debug(f"Get changes response from GitHub: {response.status_code}, {response.text}, URL: {url}")
 
-        logger.warning(f"Max retries ({max_retries}) reached. Changes is still empty.")
-        return []  # 达到最大重试次数后返回空列表
+        # 检查请求是否成功
+        if response.status_code == 200:
+            files = response.json()
+            if not files:
+                logger.info(f"Changes is empty, URL: {url}")
+            # 转换成GitLab格式的changes
+            changes = []
+            for file in files:
+                change = {
+                    'old_path': file.get('filename'),
+                    'new_path': file.get('filename'),
+                    'diff': file.get('patch', ''),
+                    'additions': file.get('additions', 0),
+                    'deletions': file.get('deletions', 0)
+                }
+                changes.append(change)
+            return changes
+        else:
+            logger.warn(f"Failed to get changes from GitHub (URL: {url}): {response.status_code}, {response.text}")
+            return []
 
     def get_pull_request_commits(self) -> list:
         # 检查是否为 Pull Request Hook 事件
@@ -135,7 +125,7 @@ class PullRequestHandler:
             'Authorization': f'token {self.github_token}',
             'Accept': 'application/vnd.github.v3+json'
         }
-        response = requests.get(url, headers=headers)
+        response = scm_http.get(url, headers=headers)
         logger.debug(f"Get commits response from GitHub: {response.status_code}, {response.text}")
         
         # 检查请求是否成功
@@ -168,29 +158,50 @@ class PullRequestHandler:
         data = {
             'body': review_result
         }
-        response = requests.post(url, headers=headers, json=data)
+        response = scm_http.post(url, headers=headers, json=data)
         logger.debug(f"Add comment to GitHub PR {url}: {response.status_code}, {response.text}")
         if response.status_code == 201:
             logger.info("Comment successfully added to pull request.")
+            return response.json().get('id')
         else:
             logger.error(f"Failed to add comment: {response.status_code}")
             logger.error(response.text)
+            return None
+
+    def update_pull_request_notes(self, comment_id, review_result) -> bool:
+        url = f"https://api.github.com/repos/{self.repo_full_name}/issues/comments/{comment_id}"
+        headers = {
+            'Authorization': f'token {self.github_token}',
+            'Accept': 'application/vnd.github.v3+json'
+        }
+        data = {
+            'body': review_result
+        }
+        response = scm_http.patch(url, headers=headers, json=data)
+        logger.debug(f"Update comment to GitHub PR {url}: {response.status_code}")
+        if response.status_code == 200:
+            return True
+        logger.error(f"Failed to update comment: {response.status_code}, {response.text}")
+        return False
 
     def target_branch_protected(self) -> bool:
+        target_branch = self.webhook_data['pull_request']['base']['ref']
+        return protected_branch_cache.is_protected(self.github_url, self.repo_full_name, target_branch,
+                                                   self.get_protected_branches)
+
+    def get_protected_branches(self) -> Optional[list]:
         url = f"https://api.github.com/repos/{self.repo_full_name}/branches?protected=true"
         headers = {
             'Authorization': f'token {self.github_token}',
             'Accept': 'application/vnd.github.v3+json'
         }
 
-        response = requests.get(url, headers=headers)
+        response = scm_http.get(url, headers=headers)
         if response.status_code == 200:
-            data = response.json()
-            target_branch = self.webhook_data['pull_request']['base']['ref']
-            return any(fnmatch.fnmatch(target_branch, item['name']) for item in data)
+            return [item['name'] for item in response.json()]
         else:
             logger.warn(f"Failed to get protected branches: {response.status_code}, {response.text}")
-            return False
+            return None
 
 
 class PushHandler:
@@ -255,7 +266,7 @@ class PushHandler:
         data = {
             'body': message
         }
-        response = requests.post(url, headers=headers, json=data)
+        response = scm_http.post(url, headers=headers, json=data)
         logger.debug(f"Add comment to commit {last_commit_id}: {response.status_code}, {response.text}")
         if response.status_code == 201:
             logger.info("Comment successfully added to push commit.")
@@ -270,7 +281,7 @@ class PushHandler:
             'Authorization': f'token {self.github_token}',
             'Accept': 'application/vnd.github.v3+json'
         }
-        response = requests.get(url, headers=headers)
+        response = scm_http.get(url, headers=headers)
         logger.debug(
             f"Get commits response from GitHub for repository_commits: {response.status_code}, {response.text}, URL: {url}")
 
@@ -287,7 +298,7 @@ class PushHandler:
             'Authorization': f'token {self.github_token}',
             'Accept': 'application/vnd.github.v3+json'
         }
-        response = requests.get(url, headers=headers)
+        response = scm_http.get(url, headers=headers)
         logger.debug(
             f"Get commit response from GitHub: {response.status_code}, {response.text}, URL: {url}")
 
@@ -302,7 +313,7 @@ class PushHandler:
             'Authorization': f'token {self.github_token}',
             'Accept': 'application/vnd.github.v3+json'
         }
-        response = requests.get(url, headers=headers)
+        response = scm_http.get(url, headers=headers)
         logger.debug(
             f"Get changes response from GitHub for repository_compare: {response.status_code}, {response.text}, URL: {url}")
 
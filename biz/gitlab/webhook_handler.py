@@ -1,11 +1,11 @@
 import os
 import re
-import time
+from typing import Optional
 from urllib.parse import urljoin
-import fnmatch
-import requests
 
+from biz.utils import scm_http
 from biz.utils.log import logger
+from biz.utils.protected_branch_cache import protected_branch_cache
 
 
 def filter_changes(changes: list):
@@ -79,35 +79,25 @@ class MergeRequestHandler:
             logger.warn(f"Invalid event type: {self.event_type}. Only 'merge_request' event is supported now.")
             return []
 
-        # Gitlab merge request changes API可能存在延迟，多次尝试
-        max_retries = 3  # 最大重试次数
-        retry_delay = 10  # 重试间隔时间（秒）
-        for attempt in range(max_retries):
-            # 调用 GitLab API 获取 Merge Request 的 changes
-            url = urljoin(f"{self.gitlab_url}/",
-                          f"api/v4/projects/{self.project_id}/merge_requests/{self.merge_request_iid}/changes?access_raw_diffs=true")
-            headers = {
-                'Private-Token': self.gitlab_token
-            }
-            response = requests.get(url, headers=headers, verify=False)
-            logger.debug(
-                f"Get changes response from GitLab (attempt {attempt + 1}): {response.status_code}, {response.text}, URL: {url}")
-
-            # 检查请求是否成功
-            if response.status_code == 200:
-                changes = response.json().get('changes', [])
-                if changes:
-                    return changes
-                else:
-                    logger.info(
-                        f"Changes is empty, retrying in {retry_delay} seconds... (attempt {attempt + 1}/{max_retries}), URL: {url}")
-                    time.sleep(retry_delay)
-            else:
-                logger.warn(f"Failed to get changes from GitLab (URL: {url}): {response.status_code}, {response.text}")
-                return []
+        # 调用 GitLab API 获取 Merge Request 的 changes
+        # GitLab计算diff可能存在延迟，返回空列表时由调用方延迟重新入队重试，这里不阻塞等待
+        url = urljoin(f"{self.gitlab_url}/",
+                      f"api/v4/projects/{self.project_id}/merge_requests/{self.merge_request_iid}/changes?access_raw_diffs=true")
+        headers = {
+            'Private-Token': self.gitlab_token
+        }
+        response = scm_http.get(url, headers=headers, verify=False)
+        logger.debug(f"Get changes response from GitLab: {response.status_code}, {response.text}, URL: {url}")
 
-        logger.warning(f"Max retries ({max_retries}) reached. Changes is still empty.")
-        return []  # 达到最大重试次数后返回空列表
+        # 检查请求是否成功
+        if response.status_code == 200:
+            changes = response.json().get('changes', [])
+            if not changes:
+                logger.info(f"Changes is empty, URL: {url}")
+            return changes
+        else:
+            logger.warn(f"Failed to get changes from GitLab (URL: {url}): {response.status_code}, {response.text}")
+            return []
 
     def get_merge_request_commits(self) -> list:
         # 检查是否为 Merge Request Hook 事件
@@ -120,7 +110,7 @@ class MergeRequestHandler:
         headers = {
             'Private-Token': self.gitlab_token
         }
-        response = requests.get(url, headers=headers, verify=False)
+        response = scm_http.get(url, headers=headers, verify=False)
         logger.debug(f"Get commits response from gitlab: {response.status_code}, {response.text}")
         # 检查请求是否成功
         if response.status_code == 200:
@@ -139,31 +129,53 @@ class MergeRequestHandler:
         data = {
             'body': review_result
         }
-        response = requests.post(url, headers=headers, json=data, verify=False)
+        response = scm_http.post(url, headers=headers, json=data, verify=False)
         logger.debug(f"Add notes to gitlab {url}: {response.status_code}, {response.text}")
         if response.status_code == 201:
             logger.info("Note successfully added to merge request.")
+            return response.json().get('id')
         else:
             logger.error(f"Failed to add note: {response.status_code}")
             logger.error(response.text)
+            return None
+
+    def update_merge_request_notes(self, note_id, review_result) -> bool:
+        url = urljoin(f"{self.gitlab_url}/",
+                      f"api/v4/projects/{self.project_id}/merge_requests/{self.merge_request_iid}/notes/{note_id}")
+        headers = {
+            'Private-Token': self.gitlab_token,
+            'Content-Type': 'application/json'
+        }
+        data = {
+            'body': review_result
+        }
+        response = scm_http.put(url, headers=headers, json=data, verify=False)
+        logger.debug(f"Update notes to gitlab {url}: {response.status_code}")
+        if response.status_code == 200:
+            return True
+        logger.error(f"Failed to update note: {response.status_code}, {response.text}")
+        return False
 
     def target_branch_protected(self) -> bool:
+        target_branch = self.webhook_data['object_attributes']['target_branch']
+        return protected_branch_cache.is_protected(self.gitlab_url, self.project_id, target_branch,
+                                                   self.get_protected_branches)
+
+    def get_protected_branches(self) -> Optional[list]:
         url = urljoin(f"{self.gitlab_url}/",
                       f"api/v4/projects/{self.project_id}/protected_branches")
         headers = {
             'Private-Token': self.gitlab_token,
             'Content-Type': 'application/json'
         }
-        response = requests.get(url, headers=headers, verify=False)
+        response = scm_http.get(url, headers=headers, verify=False)
         logger.debug(f"Get protected branches response from gitlab: {response.status_code}, {response.text}")
         # 检查请求是否成功
         if response.status_code == 200:
-            data = response.json()
-            target_branch = self.webhook_data['object_attributes']['target_branch']
-            return any(fnmatch.fnmatch(target_branch, item['name']) for item in data)
+            return [item['name'] for item in response.json()]
         else:
             logger.warn(f"Failed to get protected branches: {response.status_code}, {response.text}")
-            return False
+            return None
 
 
 class PushHandler:
@@ -232,7 +244,7 @@ class PushHandler:
         data = {
             'note': message
         }
-        response = requests.post(url, headers=headers, json=data, verify=False)
+        response = scm_http.post(url, headers=headers, json=data, verify=False)
         logger.debug(f"Add comment to commit {last_commit_id}: {response.status_code}, {response.text}")
         if response.status_code == 201:
             logger.info("Comment successfully added to push commit.")
@@ -247,7 +259,7 @@ class PushHandler:
         headers = {
             'Private-Token': self.gitlab_token
         }
-        response = requests.get(url, headers=headers, verify=False)
+        response = scm_http.get(url, headers=headers, verify=False)
         logger.debug(
             f"Get commits response from GitLab for repository_commits: {response.status_code}, {response.text}, URL: {url}")
 
@@ -270,7 +282,7 @@ class PushHandler:
         headers = {
             'Private-Token': self.gitlab_token
         }
-        response = requests.get(url, headers=headers, verify=False)
+        response = scm_http.get(url, headers=headers, verify=False)
         logger.debug(
             f"Get changes response from GitLab for repository_compare: {response.status_code}, {response.text}, URL: {url}")
 
@@ -0,0 +1,399 @@
+"""
+Webhook 接入逻辑
+
+Flask（api.py）与 ASGI（asgi.py）两个入口共用的请求处理，与Web框架无关：
+处理函数接收请求头（大小写不敏感的映射）和已解析的JSON，返回 (响应体, 状态码, 附加响应头)，
+响应体为dict或str，由各入口序列化为JSON。
+"""
+import atexit
+import json
+import logging
+import os
+import traceback
+from datetime import datetime
+from typing import Any, Callable, Dict, Mapping, Optional, Tuple
+from urllib.parse import urlparse
+
+from biz.event.outbox import outbox, EVENT_OUTBOX_ENABLED
+from biz.gitea.webhook_handler import PullRequestHandler as GiteaPullRequestHandler
+from biz.github.webhook_handler import PullRequestHandler as GithubPullRequestHandler
+from biz.gitlab.webhook_handler import slugify_url, MergeRequestHandler
+from biz.llm.client.router import RouterClient
+from biz.llm.factory import Factory
+from biz.queue import coalescer
+from biz.queue.worker import handle_merge_request_event, handle_push_event, handle_github_pull_request_event, \
+    handle_github_push_event, handle_gitea_pull_request_event, handle_gitea_push_event, handle_svn_commit_event
+from biz.service.review_service import ReviewService
+from biz.utils.im import notifier
+from biz.utils.log import logger
+from biz.utils.protected_branch_cache import protected_branch_cache
+from biz.utils.queue import handle_queue, QueueFullError, queue_stats, replay_journal, start_journal_scheduler, \
+    LANE_MR, LANE_MR_PROTECTED
+from biz.utils.reporter import Reporter
+from biz.utils.webhook_dedupe import delivery_dedupe, delivery_key, WEBHOOK_DEDUPE_ENABLED
+
+Response = Tuple[Any, int, Dict[str, str]]
+
+push_review_enabled = os.environ.get('PUSH_REVIEW_ENABLED', '0') == '1'
+
+HOME_PAGE = """<h2>The code review api server is running.</h2>
+              <p>GitHub project address: <a href="https://github.com/sunmh207/AI-Codereview-Gitlab" target="_blank">
+              https://github.com/sunmh207/AI-Codereview-Gitlab</a></p>
+              <p>Gitee project address: <a href="https://gitee.com/sunminghui/ai-codereview-gitlab" target="_blank">https://gitee.com/sunminghui/ai-codereview-gitlab</a></p>
+              """
+
+
+def log_payload(data: dict):
+    # 完整payload可能很大，只在DEBUG级别序列化
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(f'Payload: {json.dumps(data)}')
+
+
+def retry_after_headers() -> Dict[str, str]:
+    return {'Retry-After': os.environ.get('QUEUE_RETRY_AFTER', '30')}
+
+
+def parse_json(body: bytes) -> Optional[Any]:
+    """解析请求体，格式错误时返回None"""
+    try:
+        return json.loads(body)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+def accept_webhook(headers: Mapping[str, str], data: Optional[Any]) -> Response:
+    """校验、去重并入队一次webhook投递"""
+    if not data or not isinstance(data, dict):
+        return {"error": "Invalid JSON"}, 400, {}
+
+    # 平台超时重试的重复投递直接返回，不再入队
+    dedupe_key = delivery_key(headers, data) if WEBHOOK_DEDUPE_ENABLED else None
+    if dedupe_key and not delivery_dedupe.claim(dedupe_key):
+        logger.info(f'Ignore duplicate webhook delivery: {dedupe_key}')
+        return {'message': 'Duplicate delivery, ignored.'}, 200, {}
+    try:
+        body, status_code = dispatch_webhook(headers, data)
+        extra_headers = {}
+    except QueueFullError as e:
+        # 队列已满时返回429，由Git平台按自身策略重试投递
+        logger.warn(f'Reject webhook: {e}')
+        body, status_code, extra_headers = {'message': str(e)}, 429, retry_after_headers()
+    except Exception:
+        if dedupe_key:
+            delivery_dedupe.release(dedupe_key)
+        raise
+    if dedupe_key and status_code != 200:
+        delivery_dedupe.release(dedupe_key)
+    return body, status_code, extra_headers
+
+
+def dispatch_webhook(headers: Mapping[str, str], data: dict) -> Tuple[Any, int]:
+    # 判断webhook来源
+    webhook_source_github = headers.get('X-GitHub-Event')
+    webhook_source_gitea = headers.get('X-Gitea-Event')
+    webhook_source_svn = headers.get('X-SVN-Event') or headers.get('X-Subversion-Event')
+
+    # 检查是否是SVN webhook（通过header或请求体中的字段判断）
+    if webhook_source_svn or data.get('revision') or data.get('svn_revision'):
+        return handle_svn_webhook(data)
+    elif webhook_source_gitea:  # Gitea webhook优先处理
+        return handle_gitea_webhook(headers, webhook_source_gitea, data)
+    elif webhook_source_github:  # GitHub webhook
+        return handle_github_webhook(headers, webhook_source_github, data)
+    else:  # GitLab webhook
+        return handle_gitlab_webhook(headers, data)
+
+
+def mr_lane(scm_url: str, project_id, target_branch: str, loader: Callable[[], Optional[list]]) -> str:
+    """
+    目标分支受保护的MR/PR进入最高优先级通道；只读取受保护分支缓存，不等待SCM平台。
+    缓存未命中时按普通MR处理，同时在后台拉取该项目的受保护分支，之后的MR/PR按缓存选择通道。
+    :param loader: 从SCM平台拉取受保护分支名称列表
+    """
+    if not project_id:
+        return LANE_MR
+    protected = protected_branch_cache.peek(scm_url, project_id, target_branch)
+    if protected is None:
+        protected_branch_cache.prefetch(scm_url, project_id, loader)
+    return LANE_MR_PROTECTED if protected else LANE_MR
+
+
+def enqueue_review(url_slug: str, project, iid, head_sha: str, function: callable, *args, lane: str):
+    """登记MR/PR最新的head commit后入队，被新推送取代的排队任务会在worker中丢弃；队列已满时撤销登记"""
+    previous = coalescer.register_head(url_slug, project, iid, head_sha)
+    try:
+        handle_queue(function, *args, lane=lane)
+    except QueueFullError:
+        coalescer.restore_head(url_slug, project, iid, head_sha, previous)
+        raise
+
+
+def handle_github_webhook(headers: Mapping[str, str], event_type: str, data: dict) -> Tuple[Any, int]:
+    # 获取GitHub配置
+    github_token = os.getenv('GITHUB_ACCESS_TOKEN') or headers.get('X-GitHub-Token')
+    if not github_token:
+        return {'message': 'Missing GitHub access token'}, 400
+
+    github_url = os.getenv('GITHUB_URL') or 'https://github.com'
+    github_url_slug = slugify_url(github_url)
+
+    logger.info(f'Received GitHub event: {event_type}')
+    log_payload(data)
+
+    if event_type == "pull_request":
+        pull_request = data.get('pull_request', {})
+        repo_full_name = data.get('repository', {}).get('full_name')
+        # 使用handle_queue进行异步处理
+        lane = mr_lane(github_url, repo_full_name, pull_request.get('base', {}).get('ref'),
+                       lambda: GithubPullRequestHandler(data, github_token, github_url).get_protected_branches())
+        enqueue_review(github_url_slug, repo_full_name, pull_request.get('number'),
+                       pull_request.get('head', {}).get('sha'),
+                       handle_github_pull_request_event, data, github_token, github_url, github_url_slug, lane=lane)
+        # 立马返回响应
+        return {'message': f'GitHub request received(event_type={event_type}), will process asynchronously.'}, 200
+    elif event_type == "push":
+        # 使用handle_queue进行异步处理
+        handle_queue(handle_github_push_event, data, github_token, github_url, github_url_slug)
+        # 立马返回响应
+        return {'message': f'GitHub request received(event_type={event_type}), will process asynchronously.'}, 200
+    else:
+        error_message = f'Only pull_request and push events are supported for GitHub webhook, but received: {event_type}.'
+        logger.error(error_message)
+        return error_message, 400
+
+
+def handle_gitlab_webhook(headers: Mapping[str, str], data: dict) -> Tuple[Any, int]:
+    object_kind = data.get("object_kind")
+
+    # 优先从请求头获取，如果没有，则从环境变量获取，如果没有，则从推送事件中获取
+    gitlab_url = os.getenv('GITLAB_URL') or headers.get('X-Gitlab-Instance')
+    if not gitlab_url:
+        repository = data.get('repository')
+        if not repository:
+            return {'message': 'Missing GitLab URL'}, 400
+        homepage = repository.get("homepage")
+        if not homepage:
+            return {'message': 'Missing GitLab URL'}, 400
+        try:
+            parsed_url = urlparse(homepage)
+            gitlab_url = f"{parsed_url.scheme}://{parsed_url.netloc}/"
+        except Exception as e:
+            return {"error": f"Failed to parse homepage URL: {str(e)}"}, 400
+
+    # 优先从环境变量获取，如果没有，则从请求头获取
+    gitlab_token = os.getenv('GITLAB_ACCESS_TOKEN') or headers.get('X-Gitlab-Token')
+    # 如果gitlab_token为空，返回错误
+    if not gitlab_token:
+        return {'message': 'Missing GitLab access token'}, 400
+
+    gitlab_url_slug = slugify_url(gitlab_url)
+
+    logger.info(f'Received event: {object_kind}')
+    log_payload(data)
+
+    # 处理Merge Request Hook
+    if object_kind == "merge_request":
+        object_attributes = data.get('object_attributes', {})
+        # 创建一个新进程进行异步处理
+        lane = mr_lane(gitlab_url, object_attributes.get('target_project_id'), object_attributes.get('target_branch'),
+                       lambda: MergeRequestHandler(data, gitlab_token, gitlab_url).get_protected_branches())
+        enqueue_review(gitlab_url_slug, object_attributes.get('target_project_id'), object_attributes.get('iid'),
+                       object_attributes.get('last_commit', {}).get('id'),
+                       handle_merge_request_event, data, gitlab_token, gitlab_url, gitlab_url_slug, lane=lane)
+        # 立马返回响应
+        return {'message': f'Request received(object_kind={object_kind}), will process asynchronously.'}, 200
+    elif object_kind == "push":
+        # 创建一个新进程进行异步处理
+        # TODO check if PUSH_REVIEW_ENABLED is needed here
+        handle_queue(handle_push_event, data, gitlab_token, gitlab_url, gitlab_url_slug)
+        # 立马返回响应
+        return {'message': f'Request received(object_kind={object_kind}), will process asynchronously.'}, 200
+    else:
+        error_message = f'Only merge_request and push events are supported (both Webhook and System Hook), but received: {object_kind}.'
+        logger.error(error_message)
+        return error_message, 400
+
+
+def handle_gitea_webhook(headers: Mapping[str, str], event_type: str, data: dict) -> Tuple[Any, int]:
+    gitea_token = os.getenv('GITEA_ACCESS_TOKEN') or headers.get('X-Gitea-Token')
+    if not gitea_token:
+        return {'message': 'Missing Gitea access token'}, 400
+
+    gitea_url = os.getenv('GITEA_URL') or 'https://gitea.com'
+    gitea_url_slug = slugify_url(gitea_url)
+
+    logger.info(f'Received Gitea event: {event_type}')
+    log_payload(data)
+
+    if event_type == "pull_request":
+        pull_request = data.get('pull_request', {})
+        repo_full_name = data.get('repository', {}).get('full_name')
+        lane = mr_lane(gitea_url.rstrip('/'), repo_full_name,
+                       (pull_request.get('base') or {}).get('ref') or pull_request.get('base_branch'),
+                       lambda: GiteaPullRequestHandler(data, gitea_token, gitea_url).get_protected_branches())
+        enqueue_review(gitea_url_slug, repo_full_name,
+                       pull_request.get('number') or pull_request.get('index') or pull_request.get('id'),
+                       (pull_request.get('head') or {}).get('sha'),
+                       handle_gitea_pull_request_event, data, gitea_token, gitea_url, gitea_url_slug, lane=lane)
+        return {'message': f'Gitea request received(event_type={event_type}), will process asynchronously.'}, 200
+    elif event_type == "push":
+        handle_queue(handle_gitea_push_event, data, gitea_token, gitea_url, gitea_url_slug)
+        return {'message': f'Gitea request received(event_type={event_type}), will process asynchronously.'}, 200
+    else:
+        error_message = f'Only pull_request and push events are supported for Gitea webhook, but received: {event_type}.'
+        logger.error(error_message)
+        return error_message, 400
+
+
+def handle_svn_webhook(data: dict) -> Tuple[Any, int]:
+    """
+    处理SVN webhook请求
+    SVN post-commit hook通常发送的数据包含：
+    - repository_url: SVN仓库URL
+    - revision: 提交版本号
+    - author: 提交者
+    - message: 提交消息
+    - timestamp: 提交时间
+    """
+    # 获取SVN配置
+    svn_repo_url = os.getenv('SVN_REPO_URL') or data.get('repository_url')
+    svn_username = os.getenv('SVN_USERNAME') or data.get('svn_username')
+    svn_password = os.getenv('SVN_PASSWORD') or data.get('svn_password')
+
+    # 将SVN配置信息添加到webhook数据中，以便在handler中使用
+    if svn_repo_url and not data.get('repository_url'):
+        data['repository_url'] = svn_repo_url
+    if svn_username and not data.get('svn_username'):
+        data['svn_username'] = svn_username
+    if svn_password and not data.get('svn_password'):
+        data['svn_password'] = svn_password
+
+    # 如果webhook中没有提供仓库URL，尝试从环境变量获取
+    if not data.get('repository_url'):
+        logger.warn('SVN repository URL not found in webhook data or environment variables')
+        # 不强制要求，因为handler中会尝试从webhook数据中获取
+
+    logger.info(f'Received SVN webhook event')
+    log_payload(data)
+
+    # 验证必要字段
+    if not data.get('revision') and not data.get('svn_revision'):
+        error_message = 'Missing revision number in SVN webhook data'
+        logger.error(error_message)
+        return {'message': error_message}, 400
+
+    # 生成URL slug用于队列
+    from biz.svn.webhook_handler import slugify_url as svn_slugify_url
+    svn_url_slug = svn_slugify_url(data.get('repository_url', 'svn_repo'))
+
+    # 使用handle_queue进行异步处理（将认证信息放入data中，url_slug使用svn_url_slug）
+    # 注意：handle_queue期望的签名是 (function, data, token, url, url_slug)
+    # 对于SVN，我们将svn_repo_url作为url参数传递，token参数不使用
+    handle_queue(handle_svn_commit_event, data, '', svn_repo_url or '', svn_url_slug)
+    # 立马返回响应
+    return {'message': 'SVN webhook received, will process asynchronously.'}, 200
+
+
+def daily_report() -> Tuple[Any, int]:
+    """生成并发送当天的代码提交日报，成功时返回JSON序列化后的日报内容"""
+    # 获取当前日期0点和23点59分59秒的时间戳
+    start_time = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0).timestamp()
+    end_time = datetime.now().replace(hour=23, minute=59, second=59, microsecond=0).timestamp()
+
+    try:
+        if push_review_enabled:
+            df = ReviewService().get_push_review_logs(updated_at_gte=start_time, updated_at_lte=end_time)
+        else:
+            df = ReviewService().get_mr_review_logs(updated_at_gte=start_time, updated_at_lte=end_time)
+
+        if df.empty:
+            logger.info("No data to process.")
+            return {'message': 'No data to process.'}, 200
+        # 去重：基于 (author, message) 组合
+        df_unique = df.drop_duplicates(subset=["author", "commit_messages"])
+        # 按照 author 排序
+        df_sorted = df_unique.sort_values(by="author")
+        # 转换为适合生成日报的格式
+        commits = df_sorted.to_dict(orient="records")
+        # 生成日报内容
+        report_txt = Reporter().generate_report(json.dumps(commits))
+        # 发送钉钉通知
+        notifier.send_notification(content=report_txt, msg_type="markdown", title="代码提交日报")
+
+        # 返回生成的日报内容
+        return json.dumps(report_txt, ensure_ascii=False, indent=4), 200
+    except Exception as e:
+        logger.error(f"Failed to generate daily report: {e}")
+        return {'message': f"Failed to generate daily report: {e}"}, 500
+
+
+def llm_status() -> dict:
+    # LLM_PROVIDER=router 时返回各后端的耗时、错误率和熔断状态（统计的是当前进程内的调用）
+    client = Factory.getClient()
+    stats = client.stats() if isinstance(client, RouterClient) else []
+    return {'provider': os.getenv('LLM_PROVIDER', 'openai'), 'backends': stats}
+
+
+def review_queue_stats() -> dict:
+    # 各优先级通道的队列深度和等待时间
+    stats = queue_stats()
+    # 受保护分支缓存的命中情况（本进程，即webhook接入时选择通道的缓存）
+    stats['protected_branch_cache'] = protected_branch_cache.stats()
+    if EVENT_OUTBOX_ENABLED:
+        stats['outbox'] = outbox.stats()
+    return stats
+
+
+def setup_scheduler():
+    """
+    配置并启动定时任务调度器
+    """
+    try:
+        from apscheduler.schedulers.background import BackgroundScheduler
+        from apscheduler.triggers.cron import CronTrigger
+
+        scheduler = BackgroundScheduler()
+        crontab_expression = os.getenv('REPORT_CRONTAB_EXPRESSION', '0 18 * * 1-5')
+        cron_parts = crontab_expression.split()
+        cron_minute, cron_hour, cron_day, cron_month, cron_day_of_week = cron_parts
+
+        # Schedule the task based on the crontab expression
+        scheduler.add_job(
+            daily_report,
+            trigger=CronTrigger(
+                minute=cron_minute,
+                hour=cron_hour,
+                day=cron_day,
+                month=cron_month,
+                day_of_week=cron_day_of_week
+            )
+        )
+
+        # Start the scheduler
+        scheduler.start()
+        logger.info("Scheduler started successfully.")
+
+        # Shut down the scheduler when exiting the app
+        atexit.register(lambda: scheduler.shutdown())
+    except Exception as e:
+        logger.error(f"Error setting up scheduler: {e}")
+        logger.error(traceback.format_exc())
+
+
+def start_services():
+    """API服务启动时执行：数据库迁移与规则初始化、配置检查、定时日报、任务日志重放、发件箱分发线程"""
+    from biz.bootstrap import bootstrap
+    from biz.utils.config_checker import check_config
+
+    # 执行数据库迁移并初始化审查规则
+    bootstrap()
+    check_config()
+    # 启动定时任务调度器
+    setup_scheduler()
+    # 重新投递上次退出时未完成的任务（QUEUE_JOURNAL_ENABLED=1）
+    replay_journal()
+    # async驱动下到期延迟任务的调度线程
+    start_journal_scheduler()
+    # 审查完成事件的发件箱分发线程（EVENT_OUTBOX_ENABLED=1）
+    if EVENT_OUTBOX_ENABLED:
+        outbox.start()
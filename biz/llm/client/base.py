@@ -1,5 +1,5 @@
 from abc import abstractmethod
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Iterator
 
 from biz.llm.types import NotGiven, NOT_GIVEN
 from biz.utils.log import logger
@@ -24,3 +24,19 @@ class BaseClient:
                     ) -> str:
         """Chat with the model.
         """
+
+    def stream_completions(self,
+                           messages: List[Dict[str, str]],
+                           model: Optional[str] | NotGiven = NOT_GIVEN,
+                           ) -> Iterator[str]:
+        """Chat with the model and yield the response content chunk by chunk.
+
+        Providers without streaming support fall back to a single chunk.
+        """
+        yield self.completions(messages=messages, model=model)
+
+    def close(self):
+        """Release resources owned by this client.
+
+        Shared HTTP connection pools are owned by the client registry and are not closed here.
+        """
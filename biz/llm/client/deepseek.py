@@ -1,6 +1,7 @@
 import os
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Iterator
 
+import httpx
 from openai import OpenAI
 
 from biz.llm.client.base import BaseClient
@@ -9,13 +10,13 @@ from biz.utils.log import logger
 
 
 class DeepSeekClient(BaseClient):
-    def __init__(self, api_key: str = None):
+    def __init__(self, api_key: str = None, http_client: httpx.Client = None):
         self.api_key = api_key or os.getenv("DEEPSEEK_API_KEY")
         self.base_url = os.getenv("DEEPSEEK_API_BASE_URL", "https://api.deepseek.com")
         if not self.api_key:
             raise ValueError("API key is required. Please provide it or set it in the environment variables.")
 
-        self.client = OpenAI(api_key=self.api_key, base_url=self.base_url) # DeepSeek supports OpenAI API SDK
+        self.client = OpenAI(api_key=self.api_key, base_url=self.base_url, http_client=http_client) # DeepSeek supports OpenAI API SDK
         self.default_model = os.getenv("DEEPSEEK_API_MODEL", "deepseek-chat")
 
     def completions(self,
@@ -32,17 +33,32 @@ class DeepSeekClient(BaseClient):
             )
             
             if not completion or not completion.choices:
-                logger.error("Empty response from DeepSeek API")
-                return "AI服务返回为空，请稍后重试"
-                
+                raise ValueError("Empty response from DeepSeek API")
+
             return completion.choices[0].message.content
-            
+
         except Exception as e:
+            # 抛出异常而不是把错误信息当作审查结果返回，由调用方（路由客户端、worker）决定重试或通知
             logger.error(f"DeepSeek API error: {str(e)}")
-            # 检查是否是认证错误
             if "401" in str(e):
-                return "DeepSeek API认证失败，请检查API密钥是否正确"
+                logger.error("DeepSeek API认证失败，请检查API密钥是否正确")
             elif "404" in str(e):
-                return "DeepSeek API接口未找到，请检查API地址是否正确"
-            else:
-                return f"调用DeepSeek API时出错: {str(e)}"
+                logger.error("DeepSeek API接口未找到，请检查API地址是否正确")
+            raise
+
+    def stream_completions(self,
+                           messages: List[Dict[str, str]],
+                           model: Optional[str] | NotGiven = NOT_GIVEN,
+                           ) -> Iterator[str]:
+        model = model or self.default_model
+        stream = self.client.chat.completions.create(
+            model=model,
+            messages=messages,
+            stream=True,
+        )
+        try:
+            for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        finally:
+            stream.close()
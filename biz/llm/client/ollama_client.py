@@ -1,6 +1,6 @@
 import os
 import re
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Iterator
 
 from ollama import ChatResponse
 from ollama import Client
@@ -10,13 +10,18 @@ from biz.llm.types import NotGiven, NOT_GIVEN
 
 
 class OllamaClient(BaseClient):
-    def __init__(self, api_key: str = None):
+    def __init__(self, api_key: str = None, **httpx_kwargs):
         self.default_model = self.default_model = os.getenv("OLLAMA_API_MODEL", "deepseek-r1-8k:14b")
         self.base_url = os.getenv("OLLAMA_API_BASE_URL", "http://127.0.0.1:11434")
+        # ollama.Client内部自行创建httpx.Client，额外参数（如连接池limits）透传给httpx
         self.client = Client(
             host=self.base_url,
+            **httpx_kwargs,
         )
 
+    def close(self):
+        self.client._client.close()
+
     def _extract_content(self, content: str) -> str:
         """
         从内容中提取<think>...</think>标签之外的部分。
@@ -43,3 +48,13 @@ class OllamaClient(BaseClient):
         response: ChatResponse = self.client.chat(model or self.default_model, messages)
         content = response['message']['content']
         return self._extract_content(content)
+
+    def stream_completions(self,
+                           messages: List[Dict[str, str]],
+                           model: Optional[str] | NotGiven = NOT_GIVEN,
+                           ) -> Iterator[str]:
+        # 返回原始片段，<think>标签由调用方增量剔除
+        for chunk in self.client.chat(model or self.default_model, messages, stream=True):
+            content = chunk['message']['content']
+            if content:
+                yield content
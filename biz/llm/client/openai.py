@@ -1,6 +1,7 @@
 import os
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Iterator
 
+import httpx
 from openai import OpenAI
 
 from biz.llm.client.base import BaseClient
@@ -8,13 +9,13 @@ from biz.llm.types import NotGiven, NOT_GIVEN
 
 
 class OpenAIClient(BaseClient):
-    def __init__(self, api_key: str = None):
+    def __init__(self, api_key: str = None, http_client: httpx.Client = None):
         self.api_key = api_key or os.getenv("OPENAI_API_KEY")
         self.base_url = os.getenv("OPENAI_API_BASE_URL", "https://api.openai.com")
         if not self.api_key:
             raise ValueError("API key is required. Please provide it or set it in the environment variables.")
 
-        self.client = OpenAI(api_key=self.api_key, base_url=self.base_url)
+        self.client = OpenAI(api_key=self.api_key, base_url=self.base_url, http_client=http_client)
         self.default_model = os.getenv("OPENAI_API_MODEL", "gpt-4o-mini")
 
     def completions(self,
@@ -27,3 +28,20 @@ class OpenAIClient(BaseClient):
             messages=messages,
         )
         return completion.choices[0].message.content
+
+    def stream_completions(self,
+                           messages: List[Dict[str, str]],
+                           model: Optional[str] | NotGiven = NOT_GIVEN,
+                           ) -> Iterator[str]:
+        model = model or self.default_model
+        stream = self.client.chat.completions.create(
+            model=model,
+            messages=messages,
+            stream=True,
+        )
+        try:
+            for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        finally:
+            stream.close()
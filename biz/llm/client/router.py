@@ -0,0 +1,204 @@
+"""
+多供应商路由客户端
+
+LLM_PROVIDER=router 时，按 LLM_ROUTER_PROVIDERS 配置持有多个供应商/模型（如 deepseek,openai:gpt-4o-mini），
+为每个后端统计最近 LLM_ROUTER_WINDOW 次调用的 p50/p95 耗时和错误率：
+- 请求发往当前最优的健康后端（按p95耗时和错误率排序，未积累足够样本的后端按配置顺序排在后面）；
+- 超时、连接错误、429和5xx时切换到下一个后端；
+- 连续失败 LLM_ROUTER_FAILURE_THRESHOLD 次后熔断 LLM_ROUTER_OPEN_SECONDS 秒，之后放行一次试探请求（半开），
+  成功则恢复，失败则继续熔断。
+"""
+import os
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional
+
+from biz.llm.client.base import BaseClient
+from biz.llm.types import NotGiven, NOT_GIVEN
+from biz.utils.log import logger
+
+LLM_ROUTER_WINDOW = int(os.getenv('LLM_ROUTER_WINDOW', 100))
+LLM_ROUTER_MIN_SAMPLES = int(os.getenv('LLM_ROUTER_MIN_SAMPLES', 5))
+LLM_ROUTER_FAILURE_THRESHOLD = int(os.getenv('LLM_ROUTER_FAILURE_THRESHOLD', 3))
+LLM_ROUTER_OPEN_SECONDS = float(os.getenv('LLM_ROUTER_OPEN_SECONDS', 60))
+
+CIRCUIT_CLOSED = 'closed'
+CIRCUIT_OPEN = 'open'
+CIRCUIT_HALF_OPEN = 'half_open'
+
+
+class AllBackendsFailedError(Exception):
+    """所有后端均不可用或调用失败"""
+
+
+def is_retryable_error(error: Exception) -> bool:
+    """超时、连接错误、限流和服务端错误可以切换后端重试，其余错误（如请求参数错误）直接抛出"""
+    status_code = getattr(error, 'status_code', None)
+    if status_code is not None:
+        return status_code >= 500 or status_code in (408, 429)
+    # openai.APITimeoutError / APIConnectionError、httpx.TimeoutException 等均不带status_code
+    name = type(error).__name__
+    return isinstance(error, (TimeoutError, ConnectionError)) or 'Timeout' in name or 'Connection' in name
+
+
+def percentile(values: List[float], ratio: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(ratio * (len(ordered) - 1))))
+    return ordered[index]
+
+
+@dataclass
+class Backend:
+    name: str
+    client: BaseClient
+    model: Optional[str] = None
+    # (耗时秒数, 是否成功)
+    samples: deque = field(default_factory=lambda: deque(maxlen=LLM_ROUTER_WINDOW))
+    state: str = CIRCUIT_CLOSED
+    consecutive_failures: int = 0
+    opened_at: float = 0.0
+    trial_in_flight: bool = False
+
+    def latencies(self) -> List[float]:
+        return [latency for latency, ok in self.samples if ok]
+
+    def error_rate(self) -> float:
+        if not self.samples:
+            return 0.0
+        return sum(1 for _, ok in self.samples if not ok) / len(self.samples)
+
+    def score(self) -> float:
+        """越小越好；样本不足时无法评估，排在已评估的健康后端之后"""
+        if len(self.samples) < LLM_ROUTER_MIN_SAMPLES:
+            return float('inf')
+        p95 = percentile(self.latencies(), 0.95)
+        if p95 is None:
+            return float('inf')
+        return p95 * (1 + 4 * self.error_rate())
+
+    def stats(self) -> Dict:
+        latencies = self.latencies()
+        return {
+            'name': self.name,
+            'model': self.model or getattr(self.client, 'default_model', None),
+            'state': self.state,
+            'samples': len(self.samples),
+            'p50': percentile(latencies, 0.5),
+            'p95': percentile(latencies, 0.95),
+            'error_rate': round(self.error_rate(), 4),
+            'consecutive_failures': self.consecutive_failures,
+        }
+
+
+class RouterClient(BaseClient):
+    def __init__(self, backends: List[Backend]):
+        if not backends:
+            raise ValueError("LLM_ROUTER_PROVIDERS is required when LLM_PROVIDER=router.")
+        self.backends = backends
+        self.default_model = ','.join(backend.name for backend in backends)
+        self._lock = threading.Lock()
+
+    def _acquire_candidates(self) -> List[Backend]:
+        """按优先级返回本次可用的后端；熔断到期的后端进入半开状态，只放行一次试探请求"""
+        now = time.monotonic()
+        candidates = []
+        with self._lock:
+            for index, backend in enumerate(self.backends):
+                if backend.state == CIRCUIT_OPEN and now - backend.opened_at >= LLM_ROUTER_OPEN_SECONDS:
+                    backend.state = CIRCUIT_HALF_OPEN
+                    logger.info(f"LLM backend {backend.name} circuit half-open, allowing a trial request.")
+                if backend.state == CIRCUIT_OPEN:
+                    continue
+                if backend.state == CIRCUIT_HALF_OPEN and backend.trial_in_flight:
+                    continue
+                candidates.append((backend.score(), index, backend))
+        return [backend for _, _, backend in sorted(candidates, key=lambda item: item[:2])]
+
+    def _begin(self, backend: Backend) -> bool:
+        with self._lock:
+            if backend.state == CIRCUIT_OPEN:
+                return False
+            if backend.state == CIRCUIT_HALF_OPEN:
+                if backend.trial_in_flight:
+                    return False
+                backend.trial_in_flight = True
+            return True
+
+    def _record(self, backend: Backend, latency: float, ok: bool):
+        with self._lock:
+            backend.samples.append((latency, ok))
+            backend.trial_in_flight = False
+            if ok:
+                if backend.state != CIRCUIT_CLOSED:
+                    logger.info(f"LLM backend {backend.name} recovered, circuit closed.")
+                backend.state = CIRCUIT_CLOSED
+                backend.consecutive_failures = 0
+                return
+            backend.consecutive_failures += 1
+            if backend.state == CIRCUIT_HALF_OPEN or backend.consecutive_failures >= LLM_ROUTER_FAILURE_THRESHOLD:
+                if backend.state != CIRCUIT_OPEN:
+                    logger.warning(f"LLM backend {backend.name} circuit opened after "
+                                   f"{backend.consecutive_failures} consecutive failures.")
+                backend.state = CIRCUIT_OPEN
+                backend.opened_at = time.monotonic()
+
+    def completions(self,
+                    messages: List[Dict[str, str]],
+                    model: Optional[str] | NotGiven = NOT_GIVEN,
+                    ) -> str:
+        # 各后端使用各自配置的模型，忽略调用方指定的model
+        errors = []
+        for backend in self._acquire_candidates():
+            if not self._begin(backend):
+                continue
+            start = time.monotonic()
+            try:
+                result = backend.client.completions(messages=messages, model=backend.model or NOT_GIVEN)
+            except Exception as e:
+                self._record(backend, time.monotonic() - start, False)
+                if not is_retryable_error(e):
+                    raise
+                logger.warning(f"LLM backend {backend.name} failed, failing over: {e}")
+                errors.append(f"{backend.name}: {e}")
+                continue
+            self._record(backend, time.monotonic() - start, True)
+            return result
+        raise AllBackendsFailedError(f"All LLM backends failed or unavailable: {errors}")
+
+    def stream_completions(self,
+                           messages: List[Dict[str, str]],
+                           model: Optional[str] | NotGiven = NOT_GIVEN,
+                           ) -> Iterator[str]:
+        errors = []
+        for backend in self._acquire_candidates():
+            if not self._begin(backend):
+                continue
+            start = time.monotonic()
+            started = False
+            try:
+                for chunk in backend.client.stream_completions(messages=messages, model=backend.model or NOT_GIVEN):
+                    started = True
+                    yield chunk
+            except GeneratorExit:
+                # 调用方主动中止（超出预算），不计为后端故障
+                self._record(backend, time.monotonic() - start, True)
+                raise
+            except Exception as e:
+                self._record(backend, time.monotonic() - start, False)
+                # 已经输出部分内容后无法切换后端
+                if started or not is_retryable_error(e):
+                    raise
+                logger.warning(f"LLM backend {backend.name} failed, failing over: {e}")
+                errors.append(f"{backend.name}: {e}")
+                continue
+            self._record(backend, time.monotonic() - start, True)
+            return
+        raise AllBackendsFailedError(f"All LLM backends failed or unavailable: {errors}")
+
+    def stats(self) -> List[Dict]:
+        with self._lock:
+            return [backend.stats() for backend in self.backends]
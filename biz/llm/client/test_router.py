@@ -0,0 +1,58 @@
+from unittest import TestCase, main
+
+from biz.llm.client.base import BaseClient
+from biz.llm.client.router import RouterClient, Backend, AllBackendsFailedError, CIRCUIT_OPEN, \
+    LLM_ROUTER_FAILURE_THRESHOLD
+
+
+class ServerError(Exception):
+    status_code = 503
+
+
+class BadRequestError(Exception):
+    status_code = 400
+
+
+class FakeClient(BaseClient):
+    def __init__(self, result=None, error=None):
+        self.result = result
+        self.error = error
+        self.calls = 0
+
+    def completions(self, messages, model=None):
+        self.calls += 1
+        if self.error:
+            raise self.error
+        return self.result
+
+
+class TestRouterClient(TestCase):
+    def test_fail_over_on_server_error(self):
+        primary = FakeClient(error=ServerError('unavailable'))
+        secondary = FakeClient(result='ok')
+        router = RouterClient([Backend('primary', primary), Backend('secondary', secondary)])
+        self.assertEqual(router.completions([]), 'ok')
+        self.assertEqual(primary.calls, 1)
+
+    def test_circuit_opens_after_consecutive_failures(self):
+        primary = FakeClient(error=ServerError('unavailable'))
+        router = RouterClient([Backend('primary', primary), Backend('secondary', FakeClient(result='ok'))])
+        for _ in range(LLM_ROUTER_FAILURE_THRESHOLD + 2):
+            router.completions([])
+        self.assertEqual(primary.calls, LLM_ROUTER_FAILURE_THRESHOLD)
+        self.assertEqual(router.stats()[0]['state'], CIRCUIT_OPEN)
+
+    def test_non_retryable_error_raised(self):
+        router = RouterClient([Backend('primary', FakeClient(error=BadRequestError('bad'))),
+                               Backend('secondary', FakeClient(result='ok'))])
+        with self.assertRaises(BadRequestError):
+            router.completions([])
+
+    def test_all_backends_failed(self):
+        router = RouterClient([Backend('primary', FakeClient(error=TimeoutError()))])
+        with self.assertRaises(AllBackendsFailedError):
+            router.completions([])
+
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,7 @@
 import os
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Iterator
 
+import httpx
 from zhipuai import ZhipuAI
 
 from biz.llm.client.base import BaseClient
@@ -8,12 +9,12 @@ from biz.llm.types import NotGiven, NOT_GIVEN
 
 
 class ZhipuAIClient(BaseClient):
-    def __init__(self, api_key: str = None):
+    def __init__(self, api_key: str = None, http_client: httpx.Client = None):
         self.api_key = api_key or os.getenv("ZHIPUAI_API_KEY")
         if not self.api_key:
             raise ValueError("API key is required. Please provide it or set it in the environment variables.")
 
-        self.client = ZhipuAI(api_key=api_key)
+        self.client = ZhipuAI(api_key=self.api_key, http_client=http_client)
         self.default_model = os.getenv("ZHIPUAI_API_MODEL", "GLM-4-Flash")
 
     def completions(self,
@@ -26,3 +27,21 @@ class ZhipuAIClient(BaseClient):
             messages=messages,
         )
         return completion.choices[0].message.content
+
+    def stream_completions(self,
+                           messages: List[Dict[str, str]],
+                           model: Optional[str] | NotGiven = NOT_GIVEN,
+                           ) -> Iterator[str]:
+        model = model or self.default_model
+        stream = self.client.chat.completions.create(
+            model=model,
+            messages=messages,
+            stream=True,
+        )
+        try:
+            for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        finally:
+            # zhipuai的StreamResponse没有close方法，直接关闭底层HTTP响应
+            stream.response.close()
@@ -1,28 +1,181 @@
+"""
+LLM 客户端工厂
+
+每次事件都会通过 Factory().getClient() 获取客户端（CodeReviewer、Reporter、LLMReviewFunc等）。
+客户端按 (provider, base_url, model, api key哈希) 缓存在进程级的 ClientRegistry 中，
+OpenAI SDK 系（openai、deepseek、qwen）与 zhipuai 共享同一个 httpx 连接池，
+长期运行的 worker 重复审查时复用已建立的 TCP/TLS 连接。
+各供应商的SDK（openai、zhipuai、ollama）在首次创建对应客户端时才导入，避免拖慢进程启动。
+配置了RPM/TPM限额或并发上限时，客户端外层包装限流（见 biz/llm/rate_limiter.py）。
+"""
+import hashlib
 import os
+import threading
+from typing import TYPE_CHECKING, Callable, Dict, List, Tuple
 
 from biz.llm.client.base import BaseClient
-from biz.llm.client.deepseek import DeepSeekClient
-from biz.llm.client.ollama_client import OllamaClient
-from biz.llm.client.openai import OpenAIClient
-from biz.llm.client.qwen import QwenClient
-from biz.llm.client.zhipuai import ZhipuAIClient
+from biz.llm.client.router import RouterClient, Backend
+from biz.llm.rate_limiter import with_rate_limit
 from biz.utils.log import logger
 
+if TYPE_CHECKING:
+    import httpx
+
+LLM_HTTP_POOL_MAXSIZE = int(os.getenv('LLM_HTTP_POOL_MAXSIZE', 20))
+LLM_HTTP_KEEPALIVE_EXPIRY = float(os.getenv('LLM_HTTP_KEEPALIVE_EXPIRY', 60))
+
+# provider -> (api key, base url, model) 对应的环境变量，用于计算缓存key
+PROVIDER_ENV = {
+    'zhipuai': ('ZHIPUAI_API_KEY', None, 'ZHIPUAI_API_MODEL'),
+    'openai': ('OPENAI_API_KEY', 'OPENAI_API_BASE_URL', 'OPENAI_API_MODEL'),
+    'deepseek': ('DEEPSEEK_API_KEY', 'DEEPSEEK_API_BASE_URL', 'DEEPSEEK_API_MODEL'),
+    'qwen': ('QWEN_API_KEY', 'QWEN_API_BASE_URL', 'QWEN_API_MODEL'),
+    'ollama': (None, 'OLLAMA_API_BASE_URL', 'OLLAMA_API_MODEL'),
+    # 路由客户端的后端由各自的供应商配置决定，这里以后端列表代替模型
+    'router': (None, None, 'LLM_ROUTER_PROVIDERS'),
+}
+
+
+def client_key(provider: str) -> Tuple[str, str, str, str]:
+    """(provider, base_url, model, api key哈希)，配置变化后自动对应新的客户端"""
+    api_key_env, base_url_env, model_env = PROVIDER_ENV.get(provider, (None, None, None))
+    api_key = os.getenv(api_key_env) if api_key_env else None
+    key_hash = hashlib.sha256(api_key.encode('utf-8')).hexdigest()[:16] if api_key else ''
+    base_url = os.getenv(base_url_env, '') if base_url_env else ''
+    model = os.getenv(model_env, '') if model_env else ''
+    return provider, base_url, model, key_hash
+
+
+class ClientRegistry:
+    """进程级LLM客户端缓存"""
+
+    def __init__(self):
+        self._clients: Dict[Tuple[str, str, str, str], BaseClient] = {}
+        self._http_client = None
+        self._lock = threading.RLock()
+
+    def get_http_client(self) -> 'httpx.Client':
+        """共享的httpx连接池，httpx.Client是线程安全的"""
+        if self._http_client is None:
+            with self._lock:
+                if self._http_client is None:
+                    import httpx
+                    from openai import DefaultHttpxClient
+                    self._http_client = DefaultHttpxClient(
+                        limits=httpx.Limits(max_connections=LLM_HTTP_POOL_MAXSIZE,
+                                            max_keepalive_connections=LLM_HTTP_POOL_MAXSIZE,
+                                            keepalive_expiry=LLM_HTTP_KEEPALIVE_EXPIRY))
+        return self._http_client
+
+    def get(self, provider: str, builder: Callable[['ClientRegistry'], BaseClient]) -> BaseClient:
+        key = client_key(provider)
+        client = self._clients.get(key)
+        if client is None:
+            with self._lock:
+                client = self._clients.get(key)
+                if client is None:
+                    client = builder(self)
+                    self._clients[key] = client
+                    logger.info(f"Created LLM client for provider: {provider}, model: {key[2] or 'default'}")
+        return client
+
+    def refresh(self, provider: str = None):
+        """丢弃缓存的客户端（如更换API Key、切换模型后），下次获取时重新创建；provider为空时丢弃全部"""
+        with self._lock:
+            keys = [key for key in self._clients if provider is None or key[0] == provider]
+            clients = [self._clients.pop(key) for key in keys]
+        for client in clients:
+            try:
+                client.close()
+            except Exception as e:
+                logger.warn(f"Failed to close LLM client: {e}")
+
+    def close(self):
+        """关闭全部客户端以及共享的连接池"""
+        self.refresh()
+        with self._lock:
+            http_client, self._http_client = self._http_client, None
+        if http_client is not None:
+            http_client.close()
+
+    def size(self) -> int:
+        return len(self._clients)
+
+    def _reset_after_fork(self):
+        # fork出的子进程不能复用父进程的socket，直接丢弃继承来的客户端和连接池
+        self._clients = {}
+        self._http_client = None
+        self._lock = threading.RLock()
+
+
+client_registry = ClientRegistry()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=client_registry._reset_after_fork)
+
+
+def _build_zhipuai(registry: ClientRegistry) -> BaseClient:
+    from biz.llm.client.zhipuai import ZhipuAIClient
+    return ZhipuAIClient(http_client=registry.get_http_client())
+
+
+def _build_openai(registry: ClientRegistry) -> BaseClient:
+    from biz.llm.client.openai import OpenAIClient
+    return OpenAIClient(http_client=registry.get_http_client())
+
+
+def _build_deepseek(registry: ClientRegistry) -> BaseClient:
+    from biz.llm.client.deepseek import DeepSeekClient
+    return DeepSeekClient(http_client=registry.get_http_client())
+
+
+def _build_qwen(registry: ClientRegistry) -> BaseClient:
+    from biz.llm.client.qwen import QwenClient
+    return QwenClient(http_client=registry.get_http_client())
+
+
+def _build_ollama(registry: ClientRegistry) -> BaseClient:
+    import httpx
+    from biz.llm.client.ollama_client import OllamaClient
+    return OllamaClient(limits=httpx.Limits(max_connections=LLM_HTTP_POOL_MAXSIZE,
+                                            keepalive_expiry=LLM_HTTP_KEEPALIVE_EXPIRY))
+
 
 class Factory:
+    chat_model_providers = {
+        'zhipuai': _build_zhipuai,
+        'openai': _build_openai,
+        'deepseek': _build_deepseek,
+        'qwen': _build_qwen,
+        'ollama': _build_ollama,
+        'router': lambda registry: RouterClient(Factory.router_backends()),
+    }
+
+    @staticmethod
+    def router_backends() -> List[Backend]:
+        """
+        解析LLM_ROUTER_PROVIDERS，格式为逗号分隔的 provider 或 provider:model，按优先级排列，
+        如 deepseek,qwen:qwen-coder-plus,openai:gpt-4o-mini
+        """
+        backends = []
+        for spec in os.getenv('LLM_ROUTER_PROVIDERS', '').split(','):
+            spec = spec.strip()
+            if not spec:
+                continue
+            provider, _, model = spec.partition(':')
+            if provider == 'router':
+                raise Exception('LLM_ROUTER_PROVIDERS cannot contain router')
+            backends.append(Backend(name=spec, client=Factory.getClient(provider), model=model or None))
+        return backends
+
     @staticmethod
     def getClient(provider: str = None) -> BaseClient:
         provider = provider or os.getenv("LLM_PROVIDER", "openai")
-        chat_model_providers = {
-            'zhipuai': lambda: ZhipuAIClient(),
-            'openai': lambda: OpenAIClient(),
-            'deepseek': lambda: DeepSeekClient(),
-            'qwen': lambda: QwenClient(),
-            'ollama': lambda : OllamaClient()
-        }
-
-        provider_func = chat_model_providers.get(provider)
+        provider_func = Factory.chat_model_providers.get(provider)
         if provider_func:
-            return provider_func()
+            if provider == 'router':
+                # 路由的各个后端分别限流
+                return client_registry.get(provider, provider_func)
+            return client_registry.get(provider, lambda registry: with_rate_limit(provider, provider_func(registry)))
         else:
             raise Exception(f'Unknown chat model provider: {provider}')
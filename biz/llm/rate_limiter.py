@@ -0,0 +1,218 @@
+"""
+LLM 调用限流
+
+按 (provider, model) 限制每分钟请求数（RPM）和每分钟token数（TPM），并限制进程内的并发调用数：
+- 采用预约式令牌桶（GCRA）：每个调用先原子地预约额度，得到可以开始的时间后等待，
+  调用按到达顺序依次获得额度，不会失败也不会被后来者插队；
+- QUEUE_DRIVER=rq 时限流状态保存在 Redis 中（Lua脚本原子预约），多个worker进程共享同一额度；
+- token数按prompt的token数加上预留的输出token数（LLM_TPM_OUTPUT_RESERVE）估算。
+
+配置：LLM_RPM_LIMIT、LLM_TPM_LIMIT 为所有供应商的默认值，{PROVIDER}_API_RPM、{PROVIDER}_API_TPM 按供应商覆盖，
+0 表示不限制；额度按每次调用实际使用的模型分别计算。
+LLM_MAX_CONCURRENCY 限制进程内每个供应商同时进行的LLM调用数，{PROVIDER}_MAX_CONCURRENCY 按供应商覆盖。
+"""
+import os
+import threading
+import time
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from biz.llm.client.base import BaseClient
+from biz.llm.types import NotGiven, NOT_GIVEN
+from biz.utils.log import logger
+from biz.utils.queue import queue_driver, get_redis_connection
+from biz.utils.token_util import count_tokens
+
+RATE_LIMIT_PERIOD = 60.0
+LLM_TPM_OUTPUT_RESERVE = int(os.getenv('LLM_TPM_OUTPUT_RESERVE', 1000))
+LLM_MAX_CONCURRENCY = int(os.getenv('LLM_MAX_CONCURRENCY', 0))
+
+# KEYS: 各个桶的key；ARGV[1]: 周期（秒），ARGV[i+1]: 第i个桶本次消耗的时间间隔（消耗量 * 周期 / 限额）
+# 返回需要等待的秒数（字符串，避免Redis把Lua浮点数截断为整数）
+RESERVE_SCRIPT = """
+local now_parts = redis.call('TIME')
+local now = tonumber(now_parts[1]) + tonumber(now_parts[2]) / 1000000
+local period = tonumber(ARGV[1])
+local start = now
+local tats = {}
+for i = 1, #KEYS do
+    local tat = tonumber(redis.call('GET', KEYS[i]) or now)
+    if tat < now then tat = now end
+    tats[i] = tat
+    local allowed_at = tat + tonumber(ARGV[i + 1]) - period
+    if allowed_at > start then start = allowed_at end
+end
+for i = 1, #KEYS do
+    local tat = tats[i]
+    if tat < start then tat = start end
+    local new_tat = tat + tonumber(ARGV[i + 1])
+    redis.call('SET', KEYS[i], tostring(new_tat), 'EX', math.ceil(new_tat - now + period))
+end
+return tostring(start - now)
+"""
+
+
+def reserve_local(tats: Dict[str, float], buckets: Sequence[Tuple[str, float]], now: float,
+                  period: float = RATE_LIMIT_PERIOD) -> float:
+    """
+    与RESERVE_SCRIPT相同的预约逻辑，在进程内执行（调用方负责加锁）
+    :param tats: 桶key -> 理论到达时间（theoretical arrival time）
+    :param buckets: (桶key, 本次消耗的时间间隔) 列表
+    :return: 需要等待的秒数
+    """
+    start = now
+    for key, interval in buckets:
+        tat = max(tats.get(key, now), now)
+        start = max(start, tat + interval - period)
+    for key, interval in buckets:
+        tats[key] = max(tats.get(key, now), start) + interval
+    return start - now
+
+
+class RateLimiter:
+    def __init__(self, name: str, rpm: int, tpm: int, use_redis: bool = False):
+        self.name = name
+        self.rpm = rpm
+        self.tpm = tpm
+        self.use_redis = use_redis
+        self._tats = {}
+        self._lock = threading.Lock()
+        self._script = None
+        self.waits = 0
+        self.waited_seconds = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return self.rpm > 0 or self.tpm > 0
+
+    def _buckets(self, tokens: int) -> List[Tuple[str, float]]:
+        buckets = []
+        if self.rpm > 0:
+            buckets.append((f'llm:ratelimit:{self.name}:rpm', RATE_LIMIT_PERIOD / self.rpm))
+        if self.tpm > 0:
+            # 单次请求超过TPM时按TPM计，否则永远无法满足
+            buckets.append((f'llm:ratelimit:{self.name}:tpm', RATE_LIMIT_PERIOD * min(tokens, self.tpm) / self.tpm))
+        return buckets
+
+    def _reserve(self, tokens: int) -> float:
+        buckets = self._buckets(tokens)
+        if self.use_redis:
+            try:
+                if self._script is None:
+                    self._script = get_redis_connection().register_script(RESERVE_SCRIPT)
+                wait = self._script(keys=[key for key, _ in buckets],
+                                    args=[RATE_LIMIT_PERIOD] + [interval for _, interval in buckets])
+                return float(wait)
+            except Exception as e:
+                # Redis不可用时退化为进程内限流
+                logger.warn(f"LLM rate limiter fell back to local state: {e}")
+        with self._lock:
+            return reserve_local(self._tats, buckets, time.time())
+
+    def acquire(self, tokens: int):
+        """预约一次请求和tokens个token的额度，额度不足时排队等待"""
+        if not self.enabled:
+            return
+        wait = self._reserve(tokens)
+        if wait > 0:
+            self.waits += 1
+            self.waited_seconds += wait
+            logger.info(f"LLM rate limit reached for {self.name}, waiting {wait:.2f}s (tokens: {tokens})")
+            time.sleep(wait)
+
+    def stats(self) -> Dict:
+        return {'name': self.name, 'rpm': self.rpm, 'tpm': self.tpm, 'waits': self.waits,
+                'waited_seconds': round(self.waited_seconds, 2)}
+
+
+def estimate_tokens(messages: List[Dict[str, str]]) -> int:
+    return sum(count_tokens(message.get('content') or '') for message in messages) + LLM_TPM_OUTPUT_RESERVE
+
+
+_limiters: Dict[Tuple[str, str], RateLimiter] = {}
+_concurrency: Dict[str, Optional[threading.BoundedSemaphore]] = {}
+_registry_lock = threading.Lock()
+
+
+def get_rate_limiter(provider: str, model: str, rpm: int, tpm: int) -> RateLimiter:
+    """同一 (provider, model) 在进程内共享一个限流器"""
+    with _registry_lock:
+        limiter = _limiters.get((provider, model))
+        if limiter is None:
+            limiter = RateLimiter(f'{provider}:{model}', rpm, tpm, use_redis=queue_driver == 'rq')
+            _limiters[(provider, model)] = limiter
+        return limiter
+
+
+def provider_concurrency(provider: str) -> Optional[threading.BoundedSemaphore]:
+    """供应商的并发上限（{PROVIDER}_MAX_CONCURRENCY，默认LLM_MAX_CONCURRENCY），同一供应商在进程内共享"""
+    with _registry_lock:
+        if provider not in _concurrency:
+            limit = int(os.getenv(f'{provider.upper()}_MAX_CONCURRENCY', LLM_MAX_CONCURRENCY))
+            _concurrency[provider] = threading.BoundedSemaphore(limit) if limit > 0 else None
+        return _concurrency[provider]
+
+
+class RateLimitedClient(BaseClient):
+    """为BaseClient加上RPM/TPM限流和并发上限"""
+
+    def __init__(self, client: BaseClient, provider: str, rpm: int, tpm: int,
+                 concurrency: Optional[threading.Semaphore] = None):
+        self.client = client
+        self.provider = provider
+        self.rpm = rpm
+        self.tpm = tpm
+        self.concurrency = concurrency
+        self.default_model = getattr(client, 'default_model', '')
+
+    def limiter(self, model: Optional[str] | NotGiven = NOT_GIVEN) -> RateLimiter:
+        """本次调用实际使用的模型对应的限流器"""
+        if not model or isinstance(model, NotGiven):
+            model = self.default_model
+        return get_rate_limiter(self.provider, model or '', self.rpm, self.tpm)
+
+    def _acquire(self, messages: List[Dict[str, str]], model: Optional[str] | NotGiven = NOT_GIVEN):
+        if self.concurrency is not None:
+            self.concurrency.acquire()
+        try:
+            if self.rpm > 0 or self.tpm > 0:
+                self.limiter(model).acquire(estimate_tokens(messages))
+        except BaseException:
+            self._release()
+            raise
+
+    def _release(self):
+        if self.concurrency is not None:
+            self.concurrency.release()
+
+    def completions(self,
+                    messages: List[Dict[str, str]],
+                    model: Optional[str] | NotGiven = NOT_GIVEN,
+                    ) -> str:
+        self._acquire(messages, model)
+        try:
+            return self.client.completions(messages=messages, model=model)
+        finally:
+            self._release()
+
+    def stream_completions(self,
+                           messages: List[Dict[str, str]],
+                           model: Optional[str] | NotGiven = NOT_GIVEN,
+                           ) -> Iterator[str]:
+        self._acquire(messages, model)
+        try:
+            yield from self.client.stream_completions(messages=messages, model=model)
+        finally:
+            self._release()
+
+    def close(self):
+        self.client.close()
+
+
+def with_rate_limit(provider: str, client: BaseClient) -> BaseClient:
+    """按配置为客户端加上限流，未配置任何限制时原样返回"""
+    rpm = int(os.getenv(f'{provider.upper()}_API_RPM', os.getenv('LLM_RPM_LIMIT', 0)))
+    tpm = int(os.getenv(f'{provider.upper()}_API_TPM', os.getenv('LLM_TPM_LIMIT', 0)))
+    concurrency = provider_concurrency(provider)
+    if rpm <= 0 and tpm <= 0 and concurrency is None:
+        return client
+    return RateLimitedClient(client, provider, rpm, tpm, concurrency)
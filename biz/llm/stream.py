@@ -0,0 +1,200 @@
+"""
+LLM 流式输出处理
+
+- ThinkTagStripper: 增量剔除推理模型输出中的 <think>...</think> 思考链；
+- collect_stream: 消费流式片段，统计首token耗时，按需回调进度，并在超出时间或token预算时中止。
+  设置了时间上限时在后台线程读取片段，流在中途停顿（长时间没有新片段）也能按时中止，不必等到SDK的读超时。
+"""
+import queue
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Iterable, Iterator, Optional
+
+from biz.utils.log import logger
+
+THINK_OPEN = "<think>"
+THINK_CLOSE = "</think>"
+COT_ABORT = "COT ABORT!"
+
+
+class StreamAbortedError(Exception):
+    """流式输出超出时间或token预算被中止"""
+
+    def __init__(self, message: str, partial_text: str = ""):
+        super().__init__(message)
+        self.partial_text = partial_text
+
+
+def _partial_tag_length(text: str, *tags: str) -> int:
+    """text结尾可能是某个标签前缀的最大长度，这部分需要等待后续片段才能判断"""
+    longest = 0
+    for tag in tags:
+        for length in range(min(len(tag) - 1, len(text)), 0, -1):
+            if text.endswith(tag[:length]):
+                longest = max(longest, length)
+                break
+    return longest
+
+
+class ThinkTagStripper:
+    """
+    增量剔除<think>...</think>，行为与OllamaClient._extract_content一致：
+    - 只有<think>没有</think>（思考链被截断）时，结果为"COT ABORT!"；
+    - 只有</think>没有<think>时，丢弃</think>之前的全部内容。
+    """
+
+    def __init__(self):
+        self._visible = []
+        self._pending = ""
+        self._in_think = False
+        self._finished = False
+
+    def feed(self, chunk: str):
+        self._pending += chunk
+        while self._pending:
+            if self._in_think:
+                close_index = self._pending.find(THINK_CLOSE)
+                if close_index == -1:
+                    keep = _partial_tag_length(self._pending, THINK_CLOSE)
+                    self._pending = self._pending[len(self._pending) - keep:] if keep else ""
+                    return
+                self._pending = self._pending[close_index + len(THINK_CLOSE):]
+                self._in_think = False
+                continue
+
+            open_index = self._pending.find(THINK_OPEN)
+            close_index = self._pending.find(THINK_CLOSE)
+            if close_index != -1 and (open_index == -1 or close_index < open_index):
+                # 没有<think>开头的思考链，</think>之前的内容全部丢弃
+                self._visible = []
+                self._pending = self._pending[close_index + len(THINK_CLOSE):]
+                continue
+            if open_index != -1:
+                self._visible.append(self._pending[:open_index])
+                self._pending = self._pending[open_index + len(THINK_OPEN):]
+                self._in_think = True
+                continue
+
+            keep = _partial_tag_length(self._pending, THINK_OPEN, THINK_CLOSE)
+            self._visible.append(self._pending[:len(self._pending) - keep])
+            self._pending = self._pending[len(self._pending) - keep:]
+            return
+
+    def finish(self) -> str:
+        self._finished = True
+        if not self._in_think:
+            self._visible.append(self._pending)
+            self._pending = ""
+        return self.text
+
+    @property
+    def aborted(self) -> bool:
+        """思考链未闭合即结束"""
+        return self._finished and self._in_think
+
+    @property
+    def text(self) -> str:
+        if self.aborted:
+            return COT_ABORT
+        return "".join(self._visible).strip()
+
+
+class _StreamDeadlineExceeded(Exception):
+    pass
+
+
+def _read_with_deadline(chunks: Iterable[str], deadline: float, stop: threading.Event) -> Iterator[str]:
+    """
+    在后台线程读取片段，等待下一个片段超过deadline（time.monotonic）时抛出_StreamDeadlineExceeded。
+    调用方设置stop后，读取线程在收到下一个片段（或底层读超时）时停止并关闭流。
+    """
+    buffer = queue.Queue()
+
+    def reader():
+        try:
+            for chunk in chunks:
+                if stop.is_set():
+                    break
+                buffer.put(('chunk', chunk))
+            buffer.put(('done', None))
+        except Exception as e:
+            buffer.put(('error', e))
+        finally:
+            close = getattr(chunks, "close", None)
+            if close:
+                close()
+
+    threading.Thread(target=reader, name='llm-stream-reader', daemon=True).start()
+    while True:
+        try:
+            kind, value = buffer.get(timeout=max(0.0, deadline - time.monotonic()))
+        except queue.Empty:
+            raise _StreamDeadlineExceeded()
+        if kind == 'done':
+            return
+        if kind == 'error':
+            raise value
+        yield value
+
+
+@dataclass
+class StreamResult:
+    text: str
+    time_to_first_token: Optional[float]
+    elapsed: float
+    chunks: int
+
+
+def collect_stream(chunks: Iterable[str], on_progress: Callable[[str], None] = None,
+                   max_seconds: float = None, max_tokens: int = None,
+                   count_tokens: Callable[[str], int] = None) -> StreamResult:
+    """
+    消费流式输出片段
+    :param chunks: 文本片段迭代器
+    :param on_progress: 每收到一个片段后以当前可见文本回调（节流由调用方负责）
+    :param max_seconds: 总耗时上限，超出则中止并抛出StreamAbortedError
+    :param max_tokens: 输出token上限，超出则中止并抛出StreamAbortedError
+    :param count_tokens: token计数函数，max_tokens生效时使用
+    """
+    stripper = ThinkTagStripper()
+    start = time.monotonic()
+    time_to_first_token = None
+    chunk_count = 0
+    token_count = 0
+    stop = threading.Event()
+    reader = _read_with_deadline(chunks, start + max_seconds, stop) if max_seconds else chunks
+    try:
+        for chunk in reader:
+            if not chunk:
+                continue
+            if time_to_first_token is None:
+                time_to_first_token = time.monotonic() - start
+                logger.info(f"LLM首token耗时: {time_to_first_token:.2f}s")
+            chunk_count += 1
+            stripper.feed(chunk)
+
+            if max_tokens:
+                token_count += count_tokens(chunk) if count_tokens else 1
+                if token_count > max_tokens:
+                    raise StreamAbortedError(f"LLM输出超过token上限({max_tokens})，已中止", stripper.text)
+            if max_seconds and time.monotonic() - start > max_seconds:
+                raise StreamAbortedError(f"LLM输出超过时间上限({max_seconds}s)，已中止", stripper.text)
+            if on_progress:
+                on_progress(stripper.text)
+    except _StreamDeadlineExceeded:
+        raise StreamAbortedError(f"LLM输出超过时间上限({max_seconds}s)，已中止", stripper.text)
+    finally:
+        if max_seconds:
+            # 由读取线程关闭流（流可能正阻塞在读取上）
+            stop.set()
+        else:
+            # 提前中止时关闭底层HTTP流
+            close = getattr(chunks, "close", None)
+            if close:
+                close()
+
+    text = stripper.finish()
+    elapsed = time.monotonic() - start
+    logger.info(f"LLM流式输出完成，耗时: {elapsed:.2f}s，片段数: {chunk_count}")
+    return StreamResult(text=text, time_to_first_token=time_to_first_token, elapsed=elapsed, chunks=chunk_count)
@@ -0,0 +1,34 @@
+import os
+from unittest import TestCase, main
+from unittest.mock import patch
+
+from biz.llm.factory import Factory, client_registry
+
+
+@patch.dict(os.environ, {'OPENAI_API_KEY': 'sk-test', 'OPENAI_API_BASE_URL': 'https://api.openai.com/v1'})
+class TestClientRegistry(TestCase):
+    def tearDown(self):
+        client_registry.refresh()
+
+    def test_client_reused(self):
+        self.assertIs(Factory.getClient('openai'), Factory.getClient('openai'))
+
+    def test_http_pool_shared(self):
+        with patch.dict(os.environ, {'QWEN_API_KEY': 'sk-test'}):
+            openai_client = Factory.getClient('openai')
+            qwen_client = Factory.getClient('qwen')
+        self.assertIs(openai_client.client._client, qwen_client.client._client)
+
+    def test_new_client_when_key_changes(self):
+        client = Factory.getClient('openai')
+        with patch.dict(os.environ, {'OPENAI_API_KEY': 'sk-other'}):
+            self.assertIsNot(Factory.getClient('openai'), client)
+
+    def test_refresh(self):
+        client = Factory.getClient('openai')
+        client_registry.refresh('openai')
+        self.assertIsNot(Factory.getClient('openai'), client)
+
+
+if __name__ == '__main__':
+    main()
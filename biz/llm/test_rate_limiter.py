@@ -0,0 +1,53 @@
+from unittest import TestCase, main
+from unittest.mock import MagicMock, patch
+
+from biz.llm.rate_limiter import reserve_local, RateLimiter, RateLimitedClient, provider_concurrency
+
+
+class TestReserveLocal(TestCase):
+    def test_burst_up_to_limit_then_wait(self):
+        tats = {}
+        bucket = [('rpm', 60.0 / 3)]
+        waits = [reserve_local(tats, bucket, now=100.0) for _ in range(5)]
+        # 3 RPM：前3次立即执行，之后每20秒放行一次，按预约顺序排队
+        self.assertEqual(waits, [0.0, 0.0, 0.0, 20.0, 40.0])
+
+    def test_request_waits_for_slowest_bucket(self):
+        tats = {}
+        buckets = [('rpm', 60.0 / 100), ('tpm', 60.0 * 1000 / 1000)]
+        self.assertEqual(reserve_local(tats, buckets, now=0.0), 0.0)
+        # 第一次请求已用满TPM，第二次需要等待一个完整周期
+        self.assertAlmostEqual(reserve_local(tats, buckets, now=0.0), 60.0)
+
+
+class TestRateLimiter(TestCase):
+    def test_disabled_without_limits(self):
+        limiter = RateLimiter('test', rpm=0, tpm=0)
+        self.assertFalse(limiter.enabled)
+        limiter.acquire(100)
+        self.assertEqual(limiter.waits, 0)
+
+
+class TestRateLimitedClient(TestCase):
+    @patch('biz.llm.rate_limiter._limiters', {})
+    @patch('biz.llm.rate_limiter.estimate_tokens', return_value=10)
+    def test_limiter_follows_called_model(self, _):
+        client = RateLimitedClient(MagicMock(default_model='model-a'), 'test', rpm=100, tpm=0)
+        client.completions([{'role': 'user', 'content': 'hi'}], model='model-b')
+        client.completions([{'role': 'user', 'content': 'hi'}])
+        self.assertEqual(client.limiter('model-b').stats()['name'], 'test:model-b')
+        self.assertIsNot(client.limiter('model-b'), client.limiter())
+        self.assertEqual(client.limiter().name, 'test:model-a')
+
+    @patch('biz.llm.rate_limiter._concurrency', {})
+    @patch.dict('os.environ', {'FAST_MAX_CONCURRENCY': '2'})
+    @patch('biz.llm.rate_limiter.LLM_MAX_CONCURRENCY', 5)
+    def test_concurrency_per_provider(self):
+        self.assertIs(provider_concurrency('fast'), provider_concurrency('fast'))
+        self.assertIsNot(provider_concurrency('fast'), provider_concurrency('slow'))
+        self.assertEqual(provider_concurrency('fast')._initial_value, 2)
+        self.assertEqual(provider_concurrency('slow')._initial_value, 5)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+import time
+from unittest import TestCase, main
+
+from biz.llm.stream import ThinkTagStripper, collect_stream, StreamAbortedError, COT_ABORT
+
+
+class TestThinkTagStripper(TestCase):
+    def _strip(self, chunks):
+        stripper = ThinkTagStripper()
+        for chunk in chunks:
+            stripper.feed(chunk)
+        return stripper.finish()
+
+    def test_think_block_split_across_chunks(self):
+        self.assertEqual(self._strip(['<thi', 'nk>推理', '过程</th', 'ink>', '总分:90']), '总分:90')
+
+    def test_unclosed_think_block_aborts(self):
+        self.assertEqual(self._strip(['<think>', '推理被截断']), COT_ABORT)
+
+    def test_close_tag_without_open_tag(self):
+        self.assertEqual(self._strip(['推理过程', '</think>结果']), '结果')
+
+    def test_text_without_tags(self):
+        self.assertEqual(self._strip(['a <b', '> c']), 'a <b> c')
+
+
+class TestCollectStream(TestCase):
+    def test_progress_and_result(self):
+        progress = []
+        result = collect_stream(iter(['<think>x</think>', '总分', ':80']), on_progress=progress.append)
+        self.assertEqual(result.text, '总分:80')
+        self.assertEqual(result.chunks, 3)
+        self.assertEqual(progress[-1], '总分:80')
+
+    def test_abort_on_token_budget(self):
+        closed = []
+
+        def chunks():
+            try:
+                for _ in range(10):
+                    yield 'a'
+            finally:
+                closed.append(True)
+
+        with self.assertRaises(StreamAbortedError) as context:
+            collect_stream(chunks(), max_tokens=3)
+        self.assertEqual(context.exception.partial_text, 'aaaa')
+        self.assertEqual(closed, [True])
+
+    def test_abort_when_stream_stalls(self):
+        closed = []
+
+        def chunks():
+            try:
+                yield '总分'
+                time.sleep(0.5)
+                yield ':80'
+            finally:
+                closed.append(True)
+
+        start = time.monotonic()
+        with self.assertRaises(StreamAbortedError) as context:
+            collect_stream(chunks(), max_seconds=0.1)
+        # 停顿期间没有新片段，也在时间上限到达时中止
+        self.assertLess(time.monotonic() - start, 0.4)
+        self.assertEqual(context.exception.partial_text, '总分')
+        # 读取线程收到下一个片段后停止并关闭流
+        time.sleep(0.6)
+        self.assertEqual(closed, [True])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,143 @@
+"""
+MR/PR 评审任务合并
+
+同一个 MR/PR 在短时间内多次推送时，只有最新的 head commit 需要评审。
+webhook 入队时登记该 MR 最新的 head SHA，worker 在拉取 changes 和调用 LLM 之前检查自己
+携带的 SHA 是否已被更新的推送取代，被取代的任务直接丢弃。
+
+- QUEUE_DRIVER=rq 时最新 SHA 保存在 Redis 中，API 进程和所有 worker 进程共享；
+- QUEUE_DRIVER=pool 时保存在进程内存中，与Redis相同按 REVIEW_COALESCE_TTL 过期，
+  并最多保留 REVIEW_COALESCE_MAX_ENTRIES 个MR/PR（超出时淘汰最久未更新的）；
+- QUEUE_DRIVER=async 时每个任务运行在 fork 出的独立进程中，无法感知之后到达的推送，合并不生效。
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from biz.utils.log import logger
+from biz.utils.queue import queue_driver, get_redis_connection
+
+coalesce_enabled = os.getenv('REVIEW_COALESCE_ENABLED', '1') == '1'
+# Redis中记录的过期时间，避免长期不活跃的MR残留
+COALESCE_TTL = int(os.getenv('REVIEW_COALESCE_TTL', 24 * 3600))
+COALESCE_MAX_ENTRIES = int(os.getenv('REVIEW_COALESCE_MAX_ENTRIES', 10000))
+
+# 进程内登记：{key: (head_sha, 过期时间)}，按更新顺序排列
+_latest_heads = OrderedDict()
+_lock = threading.Lock()
+
+
+def job_key(url_slug: str, project, iid) -> str:
+    return f'review:mr_head:{url_slug}:{project}:{iid}'
+
+
+def _get_local(key: str) -> str:
+    """读取进程内登记，调用方需持有_lock"""
+    entry = _latest_heads.get(key)
+    if entry is None:
+        return ''
+    if entry[1] <= time.time():
+        del _latest_heads[key]
+        return ''
+    return entry[0]
+
+
+def _set_local(key: str, head_sha: str):
+    """写入进程内登记，调用方需持有_lock"""
+    _latest_heads[key] = (head_sha, time.time() + COALESCE_TTL)
+    _latest_heads.move_to_end(key)
+    while len(_latest_heads) > COALESCE_MAX_ENTRIES:
+        _latest_heads.popitem(last=False)
+
+
+def register_head(url_slug: str, project, iid, head_sha: str) -> str:
+    """
+    webhook入队时登记MR/PR的最新head SHA
+    :return: 登记前的head SHA，入队失败时传给restore_head恢复
+    """
+    if not coalesce_enabled or not head_sha or project is None or iid is None:
+        return ''
+    key = job_key(url_slug, project, iid)
+    try:
+        if queue_driver == 'rq':
+            pipeline = get_redis_connection().pipeline()
+            pipeline.get(key)
+            pipeline.set(key, head_sha, ex=COALESCE_TTL)
+            previous, _ = pipeline.execute()
+            return previous.decode() if previous else ''
+        with _lock:
+            previous = _get_local(key)
+            _set_local(key, head_sha)
+            return previous
+    except Exception as e:
+        logger.warn(f'Failed to register head sha for {key}: {e}')
+        return ''
+
+
+def restore_head(url_slug: str, project, iid, head_sha: str, previous: str):
+    """
+    任务未能入队（如队列已满返回429）时撤销register_head的登记，否则已排队的任务会被误判为已取代而丢弃。
+    登记已被之后的推送覆盖时保持不变。
+    """
+    if not coalesce_enabled or not head_sha or project is None or iid is None:
+        return
+    key = job_key(url_slug, project, iid)
+    try:
+        if queue_driver == 'rq':
+            redis = get_redis_connection()
+            if redis.get(key) != head_sha.encode():
+                return
+            if previous:
+                redis.set(key, previous, ex=COALESCE_TTL)
+            else:
+                redis.delete(key)
+        else:
+            with _lock:
+                if _get_local(key) != head_sha:
+                    return
+                if previous:
+                    _set_local(key, previous)
+                else:
+                    del _latest_heads[key]
+    except Exception as e:
+        logger.warn(f'Failed to restore head sha for {key}: {e}')
+
+
+def latest_head(url_slug: str, project, iid) -> str:
+    key = job_key(url_slug, project, iid)
+    try:
+        if queue_driver == 'rq':
+            value = get_redis_connection().get(key)
+            return value.decode() if value else ''
+        with _lock:
+            return _get_local(key)
+    except Exception as e:
+        logger.warn(f'Failed to read head sha for {key}: {e}')
+        return ''
+
+
+def is_superseded(url_slug: str, project, iid, head_sha: str) -> bool:
+    """判断当前任务的head SHA是否已被更新的推送取代"""
+    if not coalesce_enabled or not head_sha or project is None or iid is None:
+        return False
+    latest = latest_head(url_slug, project, iid)
+    return bool(latest) and latest != head_sha
+
+
+def release(url_slug: str, project, iid, head_sha: str):
+    """最新head的评审完成后清理登记，已被新推送覆盖时保留"""
+    if not coalesce_enabled or not head_sha or project is None or iid is None:
+        return
+    key = job_key(url_slug, project, iid)
+    try:
+        if queue_driver == 'rq':
+            redis = get_redis_connection()
+            if redis.get(key) == head_sha.encode():
+                redis.delete(key)
+        else:
+            with _lock:
+                if _get_local(key) == head_sha:
+                    del _latest_heads[key]
+    except Exception as e:
+        logger.warn(f'Failed to release head sha for {key}: {e}')
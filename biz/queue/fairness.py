@@ -0,0 +1,140 @@
+"""
+rq 模式下的项目间公平调度和统计
+
+同一个 url_slug 队列中的任务来自多个项目，单个项目的大量推送会占满所有 worker。
+rq worker 之间无法共享进程内的调度状态，这里在任务开始执行时按项目占用 Redis 中的并发名额：
+- 项目正在执行的任务数达到 QUEUE_PROJECT_MAX_CONCURRENCY 时，任务延迟 QUEUE_PROJECT_DEFER_SECONDS 秒重新入队，
+  worker 立即释放去处理队列中其他项目的任务；
+- 每个项目的入队、开始、完成数，等待和执行耗时，以及最近一小时的完成数保存在 Redis 中，
+  由 /review/queue/stats 汇总。
+pool 模式的项目公平调度（DRR + 并发上限）在 biz.utils.queue.LaneQueue 中实现。
+"""
+import os
+import time
+import uuid
+from datetime import timezone
+from typing import Dict
+
+from rq import get_current_job
+
+from biz.utils.log import logger
+from biz.utils.queue import get_redis_connection, handle_queue_in, QUEUE_PROJECT_MAX_CONCURRENCY
+
+QUEUE_PROJECT_DEFER_SECONDS = float(os.getenv('QUEUE_PROJECT_DEFER_SECONDS', 15))
+# 并发名额的过期时间，worker异常退出时名额最终会被释放
+PROJECT_SLOT_TTL = int(os.getenv('QUEUE_PROJECT_SLOT_TTL', 3600))
+
+
+class ProjectSlots:
+    KEY_PREFIX = 'review:project_running:'
+
+    def __init__(self, max_concurrency: int):
+        self.max_concurrency = max_concurrency
+
+    def acquire(self, project: str) -> bool:
+        if self.max_concurrency <= 0 or not project:
+            return True
+        key = self.KEY_PREFIX + project
+        redis = get_redis_connection()
+        pipeline = redis.pipeline()
+        pipeline.incr(key)
+        pipeline.expire(key, PROJECT_SLOT_TTL)
+        running, _ = pipeline.execute()
+        if running > self.max_concurrency:
+            redis.decr(key)
+            return False
+        return True
+
+    def release(self, project: str):
+        if self.max_concurrency <= 0 or not project:
+            return
+        get_redis_connection().decr(self.KEY_PREFIX + project)
+
+
+class ProjectMetrics:
+    KEY_PREFIX = 'review:project_stats:'
+    INDEX_KEY = 'review:project_stats:index'
+
+    def _update(self, project: str, **increments):
+        try:
+            pipeline = get_redis_connection().pipeline()
+            pipeline.sadd(self.INDEX_KEY, project)
+            for field, value in increments.items():
+                if isinstance(value, float):
+                    pipeline.hincrbyfloat(self.KEY_PREFIX + project, field, value)
+                else:
+                    pipeline.hincrby(self.KEY_PREFIX + project, field, value)
+            pipeline.execute()
+        except Exception as e:
+            logger.warn(f'Failed to update project metrics for {project}: {e}')
+
+    def record_enqueued(self, project: str):
+        self._update(project, enqueued=1)
+
+    def record_started(self, project: str, wait: float):
+        self._update(project, started=1, wait_total=float(wait))
+
+    def record_deferred(self, project: str):
+        self._update(project, deferred=1)
+
+    def record_finished(self, project: str, run_time: float):
+        self._update(project, completed=1, run_total=float(run_time))
+        try:
+            now = time.time()
+            key = f'{self.KEY_PREFIX}{project}:finished'
+            redis = get_redis_connection()
+            redis.zadd(key, {f'{now}:{uuid.uuid4().hex[:8]}': now})
+            redis.zremrangebyscore(key, 0, now - 3600)
+            redis.expire(key, 7200)
+        except Exception as e:
+            logger.warn(f'Failed to record throughput for {project}: {e}')
+
+    def snapshot(self) -> Dict[str, dict]:
+        redis = get_redis_connection()
+        now = time.time()
+        result = {}
+        for project in redis.smembers(self.INDEX_KEY):
+            project = project.decode('utf-8')
+            values = {k.decode('utf-8'): float(v) for k, v in redis.hgetall(self.KEY_PREFIX + project).items()}
+            started = values.get('started', 0)
+            completed = values.get('completed', 0)
+            running = redis.get(ProjectSlots.KEY_PREFIX + project)
+            result[project] = {
+                'enqueued': int(values.get('enqueued', 0)),
+                'started': int(started),
+                'completed': int(completed),
+                'deferred': int(values.get('deferred', 0)),
+                'running': int(running) if running else 0,
+                'avg_wait': round(values.get('wait_total', 0) / started, 3) if started else 0.0,
+                'avg_run': round(values.get('run_total', 0) / completed, 3) if completed else 0.0,
+                'completed_last_hour': redis.zcount(f'{self.KEY_PREFIX}{project}:finished', now - 3600, now),
+            }
+        return result
+
+
+project_slots = ProjectSlots(QUEUE_PROJECT_MAX_CONCURRENCY)
+project_metrics = ProjectMetrics()
+
+
+def run_project_job(project: str, lane: str, function: callable, data: dict, token: str, url: str, url_slug: str,
+                    **kwargs):
+    """rq任务入口：占用项目并发名额后执行实际的任务函数，名额不足时延迟重新入队"""
+    if not project_slots.acquire(project):
+        logger.info(f'Project {project} reached max concurrency ({project_slots.max_concurrency}), '
+                    f'defer {getattr(function, "__name__", function)} for {QUEUE_PROJECT_DEFER_SECONDS}s')
+        project_metrics.record_deferred(project)
+        handle_queue_in(QUEUE_PROJECT_DEFER_SECONDS, function, data, token, url, url_slug, lane=lane, **kwargs)
+        return
+
+    job = get_current_job()
+    wait = 0.0
+    if job is not None and job.enqueued_at:
+        # rq读取的enqueued_at为不带时区的UTC时间
+        wait = max(0.0, time.time() - job.enqueued_at.replace(tzinfo=timezone.utc).timestamp())
+    project_metrics.record_started(project, wait)
+    start = time.monotonic()
+    try:
+        function(data, token, url, url_slug, **kwargs)
+    finally:
+        project_slots.release(project)
+        project_metrics.record_finished(project, time.monotonic() - start)
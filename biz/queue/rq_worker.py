@@ -0,0 +1,108 @@
+"""
+自定义 rq Worker
+
+LaneWorker：QUEUE_LANES_ENABLED=1 时，每个平台按优先级通道拆分为多个队列（{url_slug}_{lane}），
+worker 按 QUEUE_LANE_WEIGHTS 在通道之间平滑加权轮询出队，MR/PR 不会被大量 Push 任务阻塞，
+低优先级通道也不会被饿死。启动方式：
+
+    rq worker -w biz.queue.rq_worker.LaneWorker gitlab_test_cn_mr_protected gitlab_test_cn_mr gitlab_test_cn_push gitlab_test_cn_svn
+
+WarmWorker / WarmLaneWorker / WarmSimpleWorker：默认的 rq worker 为每个任务fork一个work horse，
+任务在子进程中才导入LLM SDK、加载tiktoken BPE文件、读取规则并创建LLM客户端。
+这些worker在开始出队前（work()）于主进程完成上述初始化：
+- WarmWorker、WarmLaneWorker 仍为每个任务fork，子进程通过写时复制直接继承已导入的模块、编码器和渲染好的提示词，
+  预加载完成后调用 gc.freeze()，避免子进程的垃圾回收改写继承来的内存页；
+  LLM客户端的连接不能跨进程复用（fork后由ClientRegistry丢弃），子进程只需用已导入的SDK重新创建客户端；
+- WarmSimpleWorker 在主进程内直接执行任务，LLM客户端及其HTTP连接池、SQLite连接在任务之间复用，
+  但任务崩溃会导致worker退出（由supervisord重启），需要并发时启动多个worker进程。
+
+    rq worker -w biz.queue.rq_worker.WarmWorker git_test_com --with-scheduler
+"""
+import gc
+import os
+import time
+
+from rq import Worker, SimpleWorker
+
+from biz.utils.log import logger
+from biz.utils.queue import SmoothWeightedRoundRobin, LANE_WEIGHTS, LANES
+
+
+def queue_lane(queue_name: str) -> str:
+    for lane in sorted(LANES, key=len, reverse=True):
+        if queue_name.endswith(f'_{lane}'):
+            return lane
+    return queue_name
+
+
+class LaneWorker(Worker):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # 非通道队列（如未拆分的url_slug队列）按权重1参与轮询
+        weights = {queue.name: LANE_WEIGHTS.get(queue_lane(queue.name), 1) for queue in self.queues}
+        self._lane_scheduler = SmoothWeightedRoundRobin(weights)
+        self._queue_index = {queue.name: queue for queue in self.queues}
+        self._ordered_queues = [self._queue_index[name] for name in self._lane_scheduler.order()]
+
+    def reorder_queues(self, reference_queue):
+        self._lane_scheduler.record(reference_queue.name)
+        self._ordered_queues = [self._queue_index[name] for name in self._lane_scheduler.order()]
+
+
+def preload():
+    """在worker主进程中完成每个任务都会重复的初始化，单项失败不影响worker启动（任务中会再次尝试）"""
+    started = time.monotonic()
+
+    def step(name, func):
+        try:
+            func()
+        except Exception as e:
+            logger.warn(f"Worker preload {name} failed: {e}")
+
+    def load_modules():
+        # 任务函数所在模块及其依赖（SCM客户端、CodeReviewer、事件、通知等）
+        import biz.queue.worker  # noqa: F401
+        from biz.bootstrap import bootstrap
+        bootstrap()
+
+    def load_encoder():
+        from biz.utils.token_util import get_encoding
+        get_encoding()
+
+    def load_prompts():
+        from biz.service.rule_service import rule_cache
+        style = os.getenv('REVIEW_STYLE', 'professional')
+        rule_cache.get_prompts('code_review_prompt', style)
+        if os.getenv('REVIEW_MODE', 'truncate') == 'map_reduce':
+            rule_cache.get_prompts('code_review_reduce_prompt', style)
+
+    def load_llm_client():
+        # 导入供应商SDK并创建客户端（含共享的HTTP连接池）
+        from biz.llm.factory import Factory
+        Factory.getClient()
+
+    step('modules', load_modules)
+    step('tiktoken encoder', load_encoder)
+    step('review prompts', load_prompts)
+    step('LLM client', load_llm_client)
+    # 预加载的对象移入永久代，fork出的子进程执行垃圾回收时不再遍历（改写）这些对象所在的内存页
+    gc.freeze()
+    logger.info(f"Worker preload finished in {time.monotonic() - started:.2f}s")
+
+
+class PreloadMixin:
+    def work(self, *args, **kwargs):
+        preload()
+        return super().work(*args, **kwargs)
+
+
+class WarmWorker(PreloadMixin, Worker):
+    """预加载后为每个任务fork（写时复制共享预加载的内容）"""
+
+
+class WarmLaneWorker(PreloadMixin, LaneWorker):
+    """按通道加权出队的WarmWorker"""
+
+
+class WarmSimpleWorker(PreloadMixin, SimpleWorker):
+    """预加载后在主进程内执行任务，LLM客户端和连接池在任务之间复用"""
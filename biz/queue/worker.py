@@ -1,5 +1,7 @@
 import os
+import time
 import traceback
+from concurrent.futures import ThreadPoolExecutor, wait
 from datetime import datetime
 
 from biz.entity.review_entity import MergeRequestReviewEntity, PushReviewEntity
@@ -9,11 +11,112 @@ from biz.github.webhook_handler import filter_changes as filter_github_changes,
 from biz.gitea.webhook_handler import filter_changes as filter_gitea_changes, PullRequestHandler as GiteaPullRequestHandler, \
     PushHandler as GiteaPushHandler
 from biz.svn.webhook_handler import filter_changes as filter_svn_changes, CommitHandler as SvnCommitHandler, slugify_url as svn_slugify_url
+from biz.llm.stream import StreamAbortedError
+from biz.queue import coalescer
 from biz.service.review_service import ReviewService
 from biz.utils.code_reviewer import CodeReviewer
 from biz.utils.im import notifier
 from biz.utils.log import logger
+from biz.utils.queue import handle_queue_in, raise_if_journaled
 
+# changes为空时的延迟重试间隔（秒），平台计算diff存在延迟
+CHANGES_RETRY_DELAYS = [int(delay) for delay in os.getenv('CHANGES_RETRY_DELAYS', '10,20,40').split(',') if delay.strip()]
+# 并发拉取changes、commits阶段的整体超时时间（秒）
+SCM_FETCH_TIMEOUT = float(os.getenv('SCM_FETCH_TIMEOUT', 120))
+# 流式审查：先发布评论，再随LLM输出逐步编辑，两次编辑之间的最小间隔（秒）
+REVIEW_STREAM_ENABLED = os.getenv('REVIEW_STREAM_ENABLED', '0') == '1'
+REVIEW_STREAM_NOTE_INTERVAL = float(os.getenv('REVIEW_STREAM_NOTE_INTERVAL', 5))
+REVIEW_NOTE_PREFIX = 'Auto Review Result: \n'
+
+
+def fetch_concurrently(**calls) -> dict:
+    """
+    并发执行相互独立的SCM请求，整个阶段耗时取决于最慢的一个请求
+    :param calls: 名称 -> 无参可调用对象
+    :return: 名称 -> 调用结果
+    """
+    executor = ThreadPoolExecutor(max_workers=len(calls), thread_name_prefix='scm-fetch')
+    try:
+        futures = {name: executor.submit(call) for name, call in calls.items()}
+        _, not_done = wait(futures.values(), timeout=SCM_FETCH_TIMEOUT)
+        if not_done:
+            pending = [name for name, future in futures.items() if future in not_done]
+            raise TimeoutError(f"SCM fetch stage timed out after {SCM_FETCH_TIMEOUT}s, pending: {pending}")
+        return {name: future.result() for name, future in futures.items()}
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def retry_later(function: callable, retry_attempt: int, webhook_data: dict, token: str, url: str, url_slug: str) -> bool:
+    """
+    按退避策略将任务延迟重新入队，当前worker立即释放去处理其他事件
+    :return: 已安排重试返回True，重试次数用尽返回False
+    """
+    if retry_attempt >= len(CHANGES_RETRY_DELAYS):
+        logger.warning(f"Max retries ({len(CHANGES_RETRY_DELAYS)}) reached. Changes is still empty.")
+        return False
+    delay = CHANGES_RETRY_DELAYS[retry_attempt]
+    logger.info(f"Changes is empty, re-enqueue in {delay} seconds... (attempt {retry_attempt + 1}/{len(CHANGES_RETRY_DELAYS)})")
+    handle_queue_in(delay, function, webhook_data, token, url, url_slug, retry_attempt=retry_attempt + 1)
+    return True
+
+
+class ProgressiveNote:
+    """流式审查时逐步发布评论：收到第一段输出时创建评论，之后按间隔编辑同一条评论"""
+
+    def __init__(self, add_note: callable, update_note: callable, interval: float = REVIEW_STREAM_NOTE_INTERVAL):
+        """
+        :param add_note: 发布评论，返回评论id，失败返回None
+        :param update_note: (评论id, 内容) -> 是否编辑成功
+        """
+        self.add_note = add_note
+        self.update_note = update_note
+        self.interval = interval
+        self.note_id = None
+        self._last_update = 0.0
+        self._last_text = ''
+
+    def on_progress(self, text: str):
+        now = time.monotonic()
+        if not text or text == self._last_text or now - self._last_update < self.interval:
+            return
+        self._last_update = now
+        self._last_text = text
+        body = f'{REVIEW_NOTE_PREFIX}{text}\n\n_AI Review 生成中..._'
+        try:
+            if self.note_id is None:
+                self.note_id = self.add_note(body)
+            else:
+                self.update_note(self.note_id, body)
+        except Exception as e:
+            # 中间进度更新失败不影响审查，最终结果会再次提交
+            logger.warning(f"Failed to update progressive note: {e}")
+
+    def publish(self, review_result: str):
+        body = f'{REVIEW_NOTE_PREFIX}{review_result}'
+        if self.note_id is None or not self.update_note(self.note_id, body):
+            self.add_note(body)
+
+
+def review_and_publish(reviewer: CodeReviewer, changes: list, commits_text: str, add_note: callable,
+                       update_note: callable) -> str:
+    """
+    审查changes并将结果发布为评论，审查结果是否来自缓存见 reviewer.cached
+    开启REVIEW_STREAM_ENABLED时，评论随LLM输出逐步更新；输出超出时间或token预算被中止时，发布已生成的部分
+    """
+    if not REVIEW_STREAM_ENABLED:
+        review_result = reviewer.review_changes(changes, commits_text)
+        add_note(f'{REVIEW_NOTE_PREFIX}{review_result}')
+        return review_result
+
+    note = ProgressiveNote(add_note, update_note)
+    try:
+        review_result = reviewer.review_changes(changes, commits_text, on_progress=note.on_progress)
+    except StreamAbortedError as e:
+        logger.warning(str(e))
+        review_result = f'{e.partial_text}\n\n> {e}'
+    note.publish(review_result)
+    return review_result
 
 
 def handle_push_event(webhook_data: dict, gitlab_token: str, gitlab_url: str, gitlab_url_slug: str):
@@ -27,6 +130,7 @@ def handle_push_event(webhook_data: dict, gitlab_token: str, gitlab_url: str, gi
             return
 
         review_result = None
+        cached = False
         score = 0
         additions = 0
         deletions = 0
@@ -41,7 +145,9 @@ def handle_push_event(webhook_data: dict, gitlab_token: str, gitlab_url: str, gi
 
             if len(changes) > 0:
                 commits_text = ';'.join(commit.get('message', '').strip() for commit in commits)
-                review_result = CodeReviewer().review_and_strip_code(str(changes), commits_text)
+                reviewer = CodeReviewer()
+                review_result = reviewer.review_changes(changes, commits_text)
+                cached = reviewer.cached
                 score = CodeReviewer.parse_review_score(review_text=review_result)
                 for item in changes:
                     additions += item['additions']
@@ -61,21 +167,25 @@ def handle_push_event(webhook_data: dict, gitlab_token: str, gitlab_url: str, gi
             webhook_data=webhook_data,
             additions=additions,
             deletions=deletions,
+            cached=cached,
         ))
 
     except Exception as e:
         error_message = f'服务出现未知错误: {str(e)}\n{traceback.format_exc()}'
         notifier.send_notification(content=error_message)
         logger.error('出现未知错误: %s', error_message)
+        raise_if_journaled(e)
 
 
-def handle_merge_request_event(webhook_data: dict, gitlab_token: str, gitlab_url: str, gitlab_url_slug: str):
+def handle_merge_request_event(webhook_data: dict, gitlab_token: str, gitlab_url: str, gitlab_url_slug: str,
+                               retry_attempt: int = 0):
     '''
     处理Merge Request Hook事件
     :param webhook_data:
     :param gitlab_token:
     :param gitlab_url:
     :param gitlab_url_slug:
+    :param retry_attempt: changes为空时延迟重试的次数
     :return:
     '''
     merge_review_only_protected_branches = os.environ.get('MERGE_REVIEW_ONLY_PROTECTED_BRANCHES_ENABLED', '0') == '1'
@@ -93,11 +203,6 @@ def handle_merge_request_event(webhook_data: dict, gitlab_token: str, gitlab_url
             logger.info("MR为draft，仅发送通知，不触发AI review。")
             return
 
-        # 如果开启了仅review projected branches的，判断当前目标分支是否为projected branches
-        if merge_review_only_protected_branches and not handler.target_branch_protected():
-            logger.info("Merge Request target branch not match protected branches, ignored.")
-            return
-
         if handler.action not in ['open', 'update']:
             logger.info(f"Merge Request Hook event, action={handler.action}, ignored.")
             return
@@ -113,10 +218,27 @@ def handle_merge_request_event(webhook_data: dict, gitlab_token: str, gitlab_url
                 logger.info(f"Merge Request with last_commit_id {last_commit_id} already exists, skipping review for {project_name}.")
                 return
 
+        # 已有更新的推送到达该MR，当前任务被取代，直接丢弃
+        if coalescer.is_superseded(gitlab_url_slug, handler.project_id, handler.merge_request_iid, last_commit_id):
+            logger.info(f"Merge Request head {last_commit_id} superseded by a newer push, skipping review.")
+            return
+
+        # 如果开启了仅review projected branches的，判断当前目标分支是否为projected branches
+        # 在拉取changes之前判断（通常命中受保护分支缓存），非受保护分支不产生diff请求
+        if merge_review_only_protected_branches and not handler.target_branch_protected():
+            logger.info("Merge Request target branch not match protected branches, ignored.")
+            return
+
         # 仅仅在MR创建或更新时进行Code Review
-        # 获取Merge Request的changes
-        changes = handler.get_merge_request_changes()
+        # 并发获取Merge Request的changes、commits
+        fetched = fetch_concurrently(changes=handler.get_merge_request_changes,
+                                     commits=handler.get_merge_request_commits)
+
+        changes = fetched['changes']
         logger.info('changes: %s', changes)
+        if not changes and retry_later(handle_merge_request_event, retry_attempt, webhook_data, gitlab_token,
+                                       gitlab_url, gitlab_url_slug):
+            return
         changes = filter_changes(changes)
         if not changes:
             logger.info('未检测到有关代码的修改,修改文件可能不满足SUPPORTED_EXTENSIONS。')
@@ -128,18 +250,23 @@ def handle_merge_request_event(webhook_data: dict, gitlab_token: str, gitlab_url
             additions += item.get('additions', 0)
             deletions += item.get('deletions', 0)
 
-        # 获取Merge Request的commits
-        commits = handler.get_merge_request_commits()
+        commits = fetched['commits']
         if not commits:
             logger.error('Failed to get commits')
             return
 
+        # 拉取changes期间可能有新的推送到达，调用LLM前再检查一次
+        if coalescer.is_superseded(gitlab_url_slug, handler.project_id, handler.merge_request_iid, last_commit_id):
+            logger.info(f"Merge Request head {last_commit_id} superseded by a newer push, skipping review.")
+            return
+
         # review 代码
         commits_text = ';'.join(commit['title'] for commit in commits)
-        review_result = CodeReviewer().review_and_strip_code(str(changes), commits_text)
-
         # 将review结果提交到Gitlab的 notes
-        handler.add_merge_request_notes(f'Auto Review Result: \n{review_result}')
+        reviewer = CodeReviewer()
+        review_result = review_and_publish(reviewer, changes, commits_text, handler.add_merge_request_notes,
+                                           handler.update_merge_request_notes)
+        coalescer.release(gitlab_url_slug, handler.project_id, handler.merge_request_iid, last_commit_id)
 
         # dispatch merge_request_reviewed event
         event_manager['merge_request_reviewed'].send(
@@ -158,6 +285,7 @@ def handle_merge_request_event(webhook_data: dict, gitlab_token: str, gitlab_url
                 additions=additions,
                 deletions=deletions,
                 last_commit_id=last_commit_id,
+                cached=reviewer.cached,
             )
         )
 
@@ -165,6 +293,7 @@ def handle_merge_request_event(webhook_data: dict, gitlab_token: str, gitlab_url
         error_message = f'AI Code Review 服务出现未知错误: {str(e)}\n{traceback.format_exc()}'
         notifier.send_notification(content=error_message)
         logger.error('出现未知错误: %s', error_message)
+        raise_if_journaled(e)
 
 def handle_github_push_event(webhook_data: dict, github_token: str, github_url: str, github_url_slug: str):
     push_review_enabled = os.environ.get('PUSH_REVIEW_ENABLED', '0') == '1'
@@ -177,6 +306,7 @@ def handle_github_push_event(webhook_data: dict, github_token: str, github_url:
             return
 
         review_result = None
+        cached = False
         score = 0
         additions = 0
         deletions = 0
@@ -191,7 +321,9 @@ def handle_github_push_event(webhook_data: dict, github_token: str, github_url:
 
             if len(changes) > 0:
                 commits_text = ';'.join(commit.get('message', '').strip() for commit in commits)
-                review_result = CodeReviewer().review_and_strip_code(str(changes), commits_text)
+                reviewer = CodeReviewer()
+                review_result = reviewer.review_changes(changes, commits_text)
+                cached = reviewer.cached
                 score = CodeReviewer.parse_review_score(review_text=review_result)
                 for item in changes:
                     additions += item.get('additions', 0)
@@ -211,21 +343,25 @@ def handle_github_push_event(webhook_data: dict, github_token: str, github_url:
             webhook_data=webhook_data,
             additions=additions,
             deletions=deletions,
+            cached=cached,
         ))
 
     except Exception as e:
         error_message = f'服务出现未知错误: {str(e)}\n{traceback.format_exc()}'
         notifier.send_notification(content=error_message)
         logger.error('出现未知错误: %s', error_message)
+        raise_if_journaled(e)
 
 
-def handle_github_pull_request_event(webhook_data: dict, github_token: str, github_url: str, github_url_slug: str):
+def handle_github_pull_request_event(webhook_data: dict, github_token: str, github_url: str, github_url_slug: str,
+                                     retry_attempt: int = 0):
     '''
     处理GitHub Pull Request 事件
     :param webhook_data:
     :param github_token:
     :param github_url:
     :param github_url_slug:
+    :param retry_attempt: changes为空时延迟重试的次数
     :return:
     '''
     merge_review_only_protected_branches = os.environ.get('MERGE_REVIEW_ONLY_PROTECTED_BRANCHES_ENABLED', '0') == '1'
@@ -233,11 +369,6 @@ def handle_github_pull_request_event(webhook_data: dict, github_token: str, gith
         # 解析Webhook数据
         handler = GithubPullRequestHandler(webhook_data, github_token, github_url)
         logger.info('GitHub Pull Request event received')
-        # 如果开启了仅review projected branches的，判断当前目标分支是否为projected branches
-        if merge_review_only_protected_branches and not handler.target_branch_protected():
-            logger.info("Merge Request target branch not match protected branches, ignored.")
-            return
-
         if handler.action not in ['opened', 'synchronize']:
             logger.info(f"Pull Request Hook event, action={handler.action}, ignored.")
             return
@@ -253,10 +384,28 @@ def handle_github_pull_request_event(webhook_data: dict, github_token: str, gith
                 logger.info(f"Pull Request with last_commit_id {github_last_commit_id} already exists, skipping review for {project_name}.")
                 return
 
+        # 已有更新的推送到达该PR，当前任务被取代，直接丢弃
+        if coalescer.is_superseded(github_url_slug, handler.repo_full_name, handler.pull_request_number,
+                                   github_last_commit_id):
+            logger.info(f"Pull Request head {github_last_commit_id} superseded by a newer push, skipping review.")
+            return
+
+        # 如果开启了仅review projected branches的，判断当前目标分支是否为projected branches
+        # 在拉取changes之前判断（通常命中受保护分支缓存），非受保护分支不产生diff请求
+        if merge_review_only_protected_branches and not handler.target_branch_protected():
+            logger.info("Merge Request target branch not match protected branches, ignored.")
+            return
+
         # 仅仅在PR创建或更新时进行Code Review
-        # 获取Pull Request的changes
-        changes = handler.get_pull_request_changes()
+        # 并发获取Pull Request的changes、commits
+        fetched = fetch_concurrently(changes=handler.get_pull_request_changes,
+                                     commits=handler.get_pull_request_commits)
+
+        changes = fetched['changes']
         logger.info('changes: %s', changes)
+        if not changes and retry_later(handle_github_pull_request_event, retry_attempt, webhook_data, github_token,
+                                       github_url, github_url_slug):
+            return
         changes = filter_github_changes(changes)
         if not changes:
             logger.info('未检测到有关代码的修改,修改文件可能不满足SUPPORTED_EXTENSIONS。')
@@ -268,18 +417,24 @@ def handle_github_pull_request_event(webhook_data: dict, github_token: str, gith
             additions += item.get('additions', 0)
             deletions += item.get('deletions', 0)
 
-        # 获取Pull Request的commits
-        commits = handler.get_pull_request_commits()
+        commits = fetched['commits']
         if not commits:
             logger.error('Failed to get commits')
             return
 
+        # 拉取changes期间可能有新的推送到达，调用LLM前再检查一次
+        if coalescer.is_superseded(github_url_slug, handler.repo_full_name, handler.pull_request_number,
+                                   github_last_commit_id):
+            logger.info(f"Pull Request head {github_last_commit_id} superseded by a newer push, skipping review.")
+            return
+
         # review 代码
         commits_text = ';'.join(commit['title'] for commit in commits)
-        review_result = CodeReviewer().review_and_strip_code(str(changes), commits_text)
-
         # 将review结果提交到GitHub的 notes
-        handler.add_pull_request_notes(f'Auto Review Result: \n{review_result}')
+        reviewer = CodeReviewer()
+        review_result = review_and_publish(reviewer, changes, commits_text, handler.add_pull_request_notes,
+                                           handler.update_pull_request_notes)
+        coalescer.release(github_url_slug, handler.repo_full_name, handler.pull_request_number, github_last_commit_id)
 
         # dispatch pull_request_reviewed event
         event_manager['merge_request_reviewed'].send(
@@ -298,12 +453,14 @@ def handle_github_pull_request_event(webhook_data: dict, github_token: str, gith
                 additions=additions,
                 deletions=deletions,
                 last_commit_id=github_last_commit_id,
+                cached=reviewer.cached,
             ))
 
     except Exception as e:
         error_message = f'服务出现未知错误: {str(e)}\n{traceback.format_exc()}'
         notifier.send_notification(content=error_message)
         logger.error('出现未知错误: %s', error_message)
+        raise_if_journaled(e)
 
 
 def handle_gitea_push_event(webhook_data: dict, gitea_token: str, gitea_url: str, gitea_url_slug: str):
@@ -317,6 +474,7 @@ def handle_gitea_push_event(webhook_data: dict, gitea_token: str, gitea_url: str
             return
 
         review_result = None
+        cached = False
         score = 0
         additions = 0
         deletions = 0
@@ -330,7 +488,9 @@ def handle_gitea_push_event(webhook_data: dict, gitea_token: str, gitea_url: str
 
             if len(changes) > 0:
                 commits_text = ';'.join(commit.get('message', '').strip() for commit in commits)
-                review_result = CodeReviewer().review_and_strip_code(str(changes), commits_text)
+                reviewer = CodeReviewer()
+                review_result = reviewer.review_changes(changes, commits_text)
+                cached = reviewer.cached
                 score = CodeReviewer.parse_review_score(review_text=review_result)
                 for item in changes:
                     additions += item.get('additions', 0)
@@ -352,15 +512,18 @@ def handle_gitea_push_event(webhook_data: dict, gitea_token: str, gitea_url: str
             webhook_data=webhook_data,
             additions=additions,
             deletions=deletions,
+            cached=cached,
         ))
 
     except Exception as e:
         error_message = f'服务出现未知错误: {str(e)}\n{traceback.format_exc()}'
         notifier.send_notification(content=error_message)
         logger.error('出现未知错误: %s', error_message)
+        raise_if_journaled(e)
 
 
-def handle_gitea_pull_request_event(webhook_data: dict, gitea_token: str, gitea_url: str, gitea_url_slug: str):
+def handle_gitea_pull_request_event(webhook_data: dict, gitea_token: str, gitea_url: str, gitea_url_slug: str,
+                                    retry_attempt: int = 0):
     merge_review_only_protected_branches = os.environ.get('MERGE_REVIEW_ONLY_PROTECTED_BRANCHES_ENABLED', '0') == '1'
     try:
         handler = GiteaPullRequestHandler(webhook_data, gitea_token, gitea_url)
@@ -368,10 +531,6 @@ def handle_gitea_pull_request_event(webhook_data: dict, gitea_token: str, gitea_
 
         pull_request = webhook_data.get('pull_request', {})
 
-        if merge_review_only_protected_branches and not handler.target_branch_protected():
-            logger.info("Pull Request target branch not match protected branches, ignored.")
-            return
-
         if handler.action not in ['opened', 'open', 'reopened', 'synchronize', 'synchronized']:
             logger.info(f"Pull Request Hook event, action={handler.action}, ignored.")
             return
@@ -389,8 +548,23 @@ def handle_gitea_pull_request_event(webhook_data: dict, gitea_token: str, gitea_
                 logger.info(f"Pull Request with last_commit_id {last_commit_id} already exists, skipping review for {project_name}.")
                 return
 
-        changes = handler.get_pull_request_changes()
+        if coalescer.is_superseded(gitea_url_slug, handler.repo_full_name, handler.pull_request_index, last_commit_id):
+            logger.info(f"Pull Request head {last_commit_id} superseded by a newer push, skipping review.")
+            return
+
+        # 在拉取changes之前判断目标分支是否受保护（通常命中受保护分支缓存）
+        if merge_review_only_protected_branches and not handler.target_branch_protected():
+            logger.info("Pull Request target branch not match protected branches, ignored.")
+            return
+
+        fetched = fetch_concurrently(changes=handler.get_pull_request_changes,
+                                     commits=handler.get_pull_request_commits)
+
+        changes = fetched['changes']
         logger.info('changes: %s', changes)
+        if not changes and retry_later(handle_gitea_pull_request_event, retry_attempt, webhook_data, gitea_token,
+                                       gitea_url, gitea_url_slug):
+            return
         changes = filter_gitea_changes(changes)
         if not changes:
             logger.info('未检测到有关代码的修改,修改文件可能不满足SUPPORTED_EXTENSIONS。')
@@ -402,15 +576,20 @@ def handle_gitea_pull_request_event(webhook_data: dict, gitea_token: str, gitea_
             additions += item.get('additions', 0)
             deletions += item.get('deletions', 0)
 
-        commits = handler.get_pull_request_commits()
+        commits = fetched['commits']
         if not commits:
             logger.error('Failed to get commits for Gitea pull request')
             return
 
-        commits_text = ';'.join(commit.get('title', '') for commit in commits)
-        review_result = CodeReviewer().review_and_strip_code(str(changes), commits_text)
+        if coalescer.is_superseded(gitea_url_slug, handler.repo_full_name, handler.pull_request_index, last_commit_id):
+            logger.info(f"Pull Request head {last_commit_id} superseded by a newer push, skipping review.")
+            return
 
-        handler.add_pull_request_notes(f'Auto Review Result: \n{review_result}')
+        commits_text = ';'.join(commit.get('title', '') for commit in commits)
+        reviewer = CodeReviewer()
+        review_result = review_and_publish(reviewer, changes, commits_text, handler.add_pull_request_notes,
+                                           handler.update_pull_request_notes)
+        coalescer.release(gitea_url_slug, handler.repo_full_name, handler.pull_request_index, last_commit_id)
 
         repository = webhook_data.get('repository', {})
         author_info = pull_request.get('user', {}) or webhook_data.get('sender', {}) or {}
@@ -431,12 +610,14 @@ def handle_gitea_pull_request_event(webhook_data: dict, gitea_token: str, gitea_
                 additions=additions,
                 deletions=deletions,
                 last_commit_id=last_commit_id,
+                cached=reviewer.cached,
             ))
 
     except Exception as e:
         error_message = f'AI Code Review 服务出现未知错误: {str(e)}\n{traceback.format_exc()}'
         notifier.send_notification(content=error_message)
         logger.error('出现未知错误: %s', error_message)
+        raise_if_journaled(e)
 
 
 def handle_svn_commit_event(webhook_data: dict, token: str = None, url: str = None, url_slug: str = None):
@@ -475,6 +656,7 @@ def handle_svn_commit_event(webhook_data: dict, token: str = None, url: str = No
         }]
         
         review_result = None
+        cached = False
         score = 0
         additions = 0
         deletions = 0
@@ -491,7 +673,9 @@ def handle_svn_commit_event(webhook_data: dict, token: str = None, url: str = No
                 review_result = "关注的文件没有修改"
             else:
                 commits_text = commit_info.get('message', '').strip()
-                review_result = CodeReviewer().review_and_strip_code(str(changes), commits_text)
+                reviewer = CodeReviewer()
+                review_result = reviewer.review_changes(changes, commits_text)
+                cached = reviewer.cached
                 score = CodeReviewer.parse_review_score(review_text=review_result)
                 for item in changes:
                     additions += item.get('additions', 0)
@@ -525,9 +709,11 @@ def handle_svn_commit_event(webhook_data: dict, token: str = None, url: str = No
             webhook_data=webhook_data,
             additions=additions,
             deletions=deletions,
+            cached=cached,
         ))
         
     except Exception as e:
         error_message = f'SVN代码审查服务出现未知错误: {str(e)}\n{traceback.format_exc()}'
         notifier.send_notification(content=error_message)
         logger.error('出现未知错误: %s', error_message)
+        raise_if_journaled(e)
@@ -1,10 +1,14 @@
 import sqlite3
+import zlib
 from pathlib import Path
 import os
-
-import pandas as pd
+from typing import TYPE_CHECKING
 
 from biz.entity.review_entity import MergeRequestReviewEntity, PushReviewEntity
+from biz.utils.db import get_connection, get_pool
+
+if TYPE_CHECKING:
+    import pandas as pd
 
 
 def get_project_root():
@@ -17,6 +21,223 @@ def get_project_root():
     return current_file.parent.parent.parent
 
 
+def _table_columns(cursor, table: str) -> list:
+    cursor.execute(f"PRAGMA table_info({table})")
+    return [col[1] for col in cursor.fetchall()]
+
+
+def _migration_create_tables(cursor):
+    """创建基础表（引入版本化迁移前的数据库中表已存在，CREATE TABLE IF NOT EXISTS不会改动它们）"""
+    cursor.execute('''
+            CREATE TABLE IF NOT EXISTS mr_review_log (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                project_name TEXT,
+                author TEXT,
+                source_branch TEXT,
+                target_branch TEXT,
+                updated_at INTEGER,
+                commit_messages TEXT,
+                score INTEGER,
+                url TEXT,
+                review_result TEXT,
+                additions INTEGER DEFAULT 0,
+                deletions INTEGER DEFAULT 0,
+                last_commit_id TEXT DEFAULT ''
+            )
+        ''')
+    cursor.execute('''
+            CREATE TABLE IF NOT EXISTS push_review_log (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                project_name TEXT,
+                author TEXT,
+                branch TEXT,
+                updated_at INTEGER,
+                commit_messages TEXT,
+                score INTEGER,
+                review_result TEXT,
+                additions INTEGER DEFAULT 0,
+                deletions INTEGER DEFAULT 0
+            )
+        ''')
+    # 审查规则表
+    cursor.execute('''
+            CREATE TABLE IF NOT EXISTS review_rules (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                rule_key TEXT NOT NULL UNIQUE,
+                system_prompt TEXT NOT NULL,
+                user_prompt TEXT NOT NULL,
+                description TEXT,
+                is_active INTEGER DEFAULT 1,
+                created_at INTEGER NOT NULL,
+                updated_at INTEGER NOT NULL,
+                updated_by TEXT
+            )
+        ''')
+    # 规则历史记录表
+    cursor.execute('''
+            CREATE TABLE IF NOT EXISTS review_rules_history (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                rule_id INTEGER NOT NULL,
+                rule_key TEXT NOT NULL,
+                system_prompt_old TEXT,
+                system_prompt_new TEXT,
+                user_prompt_old TEXT,
+                user_prompt_new TEXT,
+                change_type TEXT NOT NULL,
+                changed_at INTEGER NOT NULL,
+                changed_by TEXT,
+                change_reason TEXT,
+                FOREIGN KEY (rule_id) REFERENCES review_rules(id)
+            )
+        ''')
+
+
+def _migration_add_diff_stats(cursor):
+    """旧版本的mr_review_log、push_review_log表添加additions、deletions列"""
+    for table in ["mr_review_log", "push_review_log"]:
+        current_columns = _table_columns(cursor, table)
+        for column in ["additions", "deletions"]:
+            if column not in current_columns:
+                cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} INTEGER DEFAULT 0")
+
+
+def _migration_add_last_commit_id(cursor):
+    """旧版本的mr_review_log表添加last_commit_id列"""
+    if "last_commit_id" not in _table_columns(cursor, "mr_review_log"):
+        cursor.execute("ALTER TABLE mr_review_log ADD COLUMN last_commit_id TEXT DEFAULT ''")
+
+
+def _migration_create_indexes(cursor):
+    """时间字段索引（默认查询就需要时间范围）和规则表索引"""
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_push_review_log_updated_at ON push_review_log (updated_at);')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_mr_review_log_updated_at ON mr_review_log (updated_at);')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_review_rules_key ON review_rules(rule_key);')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_review_rules_active ON review_rules(is_active);')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_rules_history_rule_id ON review_rules_history(rule_id);')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_rules_history_changed_at ON review_rules_history(changed_at);')
+
+
+def _migration_mr_last_commit_index(cursor):
+    """
+    check_mr_last_commit_id_exists 的覆盖索引，查询只读索引，不再扫描包含review_result的整张表
+    已有数据中可能存在重复记录（并发的重复投递），因此不建唯一索引
+    """
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_mr_review_log_last_commit ON '
+                   'mr_review_log (project_name, source_branch, target_branch, last_commit_id);')
+
+
+# review_results.log_type，与详情页的type参数一致
+LOG_TYPE_MR = 'mr'
+LOG_TYPE_PUSH = 'push'
+REVIEW_ENCODING_ZLIB = 'zlib'
+
+
+def compress_review(review_result: str) -> bytes:
+    return zlib.compress(review_result.encode('utf-8'), 6)
+
+
+def decompress_review(content: bytes, encoding: str) -> str:
+    if encoding == REVIEW_ENCODING_ZLIB:
+        return zlib.decompress(content).decode('utf-8')
+    return content.decode('utf-8') if isinstance(content, bytes) else content
+
+
+def _migration_split_review_result(cursor):
+    """
+    review_result 移到 review_results 表中压缩保存，日志表只保留 has_review 标记，
+    列表查询（Dashboard、日报）不再读取审查结果正文
+    """
+    cursor.execute('''
+            CREATE TABLE IF NOT EXISTS review_results (
+                log_type TEXT NOT NULL,
+                log_id INTEGER NOT NULL,
+                encoding TEXT NOT NULL,
+                content BLOB NOT NULL,
+                PRIMARY KEY (log_type, log_id)
+            )
+        ''')
+    for table, log_type in [("mr_review_log", LOG_TYPE_MR), ("push_review_log", LOG_TYPE_PUSH)]:
+        if "has_review" not in _table_columns(cursor, table):
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN has_review INTEGER DEFAULT 0")
+        rows = cursor.connection.execute(f"SELECT id, review_result FROM {table} "
+                                         f"WHERE review_result IS NOT NULL AND TRIM(review_result) != ''")
+        for record_id, review_result in rows:
+            cursor.execute('INSERT OR REPLACE INTO review_results (log_type, log_id, encoding, content) '
+                           'VALUES (?, ?, ?, ?)',
+                           (log_type, record_id, REVIEW_ENCODING_ZLIB, compress_review(review_result)))
+        cursor.execute(f"UPDATE {table} SET has_review = 1 "
+                       f"WHERE review_result IS NOT NULL AND TRIM(review_result) != ''")
+        cursor.execute(f"UPDATE {table} SET review_result = NULL WHERE review_result IS NOT NULL")
+
+
+def _migration_create_event_outbox(cursor):
+    """
+    审查完成事件的发件箱（见 biz/event/outbox.py）
+    persisted: 是否已写入审核日志；pending_channels: 尚未发送成功的通知渠道（JSON），为空表示尚未开始发送
+    """
+    cursor.execute('''
+            CREATE TABLE IF NOT EXISTS event_outbox (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                event_type TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                state TEXT NOT NULL DEFAULT 'pending',
+                persisted INTEGER DEFAULT 0,
+                pending_channels TEXT,
+                attempts INTEGER DEFAULT 0,
+                next_attempt_at INTEGER NOT NULL,
+                last_error TEXT,
+                created_at INTEGER NOT NULL,
+                updated_at INTEGER NOT NULL
+            )
+        ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_event_outbox_state ON event_outbox (state, next_attempt_at);')
+
+
+def _migration_create_rules_version(cursor):
+    """规则版本号（单行），规则每次变更时递增，各进程据此判断缓存的规则是否过期"""
+    cursor.execute('''
+            CREATE TABLE IF NOT EXISTS rules_version (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                version INTEGER NOT NULL
+            )
+        ''')
+    cursor.execute('INSERT OR IGNORE INTO rules_version (id, version) VALUES (1, 1)')
+
+
+def _migration_add_cached(cursor):
+    """cached: 审查结果是否来自AI Review缓存（未实际调用LLM）"""
+    for table in ("mr_review_log", "push_review_log"):
+        if "cached" not in _table_columns(cursor, table):
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN cached INTEGER DEFAULT 0")
+
+
+# (版本号, 描述, 迁移函数)，只能追加，不能修改已发布的迁移
+MIGRATIONS = [
+    (1, 'create review log and rule tables', _migration_create_tables),
+    (2, 'add additions/deletions columns', _migration_add_diff_stats),
+    (3, 'add mr_review_log.last_commit_id', _migration_add_last_commit_id),
+    (4, 'create updated_at and rule indexes', _migration_create_indexes),
+    (5, 'create mr_review_log last_commit_id lookup index', _migration_mr_last_commit_index),
+    (6, 'move review_result to compressed review_results table', _migration_split_review_result),
+    (7, 'create event_outbox table', _migration_create_event_outbox),
+    (8, 'create rules_version table', _migration_create_rules_version),
+    (9, 'add review log cached columns', _migration_add_cached),
+]
+LATEST_SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+# 热点查询，语句文本保持不变以复用连接上已编译的语句
+SQL_MR_LAST_COMMIT_EXISTS = '''
+    SELECT 1 FROM mr_review_log
+    WHERE project_name = ? AND source_branch = ? AND target_branch = ? AND last_commit_id = ?
+    LIMIT 1
+'''
+
+
+# 已执行过迁移的数据库文件
+_initialized_db_files = set()
+
+
 class ReviewService:
     # 使用绝对路径
     DB_FILE = str(get_project_root() / "data" / "data.db")
@@ -24,145 +245,72 @@ class ReviewService:
 
     @staticmethod
     def get_db_connection():
-        """获取数据库连接，配置超时和WAL模式"""
-        conn = sqlite3.connect(ReviewService.DB_FILE, timeout=ReviewService.DB_TIMEOUT)
-        # 启用WAL模式以改善并发性能（如果失败也不影响，继续使用默认模式）
-        try:
-            conn.execute('PRAGMA journal_mode=WAL;')
-        except sqlite3.DatabaseError:
-            # WAL模式启用失败，使用默认模式继续
-            pass
-        return conn
+        """获取当前线程复用的数据库连接（WAL等PRAGMA在连接创建时配置一次），close()时归还"""
+        ReviewService.ensure_db()
+        return get_connection(ReviewService.DB_FILE, ReviewService.DB_TIMEOUT)
+
+    @staticmethod
+    def ensure_db(db_file: str = None):
+        """首次访问数据库时执行迁移，每个进程对每个数据库文件只执行一次（导入模块时不再访问数据库）"""
+        if (db_file or ReviewService.DB_FILE) not in _initialized_db_files:
+            ReviewService.init_db(db_file)
+
+    @staticmethod
+    def schema_version(conn) -> int:
+        """当前数据库已应用的迁移版本，未迁移过的数据库为0"""
+        conn.execute('''
+                CREATE TABLE IF NOT EXISTS schema_version (
+                    version INTEGER PRIMARY KEY,
+                    description TEXT,
+                    applied_at INTEGER NOT NULL
+                )
+            ''')
+        row = conn.execute('SELECT MAX(version) FROM schema_version').fetchone()
+        return row[0] or 0
 
     @staticmethod
-    def init_db():
-        """初始化数据库及表结构"""
+    def migrate(conn):
+        """按版本号依次执行未应用的迁移，每个迁移在独立事务中执行并记录到schema_version"""
         import time
+        current = ReviewService.schema_version(conn)
+        if current >= LATEST_SCHEMA_VERSION:
+            return
+        for version, description, migration in MIGRATIONS:
+            if version <= current:
+                continue
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                # 获取写锁后重新读取版本，迁移可能已被其他进程执行
+                if ReviewService.schema_version(conn) >= version:
+                    conn.rollback()
+                    continue
+                migration(conn.cursor())
+                conn.execute('INSERT INTO schema_version (version, description, applied_at) VALUES (?, ?, ?)',
+                             (version, description, int(time.time())))
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            print(f"Applied database migration {version}: {description}")
+
+    @staticmethod
+    def init_db(db_file: str = None):
+        """初始化数据库及表结构（执行版本化迁移，已是最新版本时只读取一次schema_version）"""
+        import time
+        db_file = db_file or ReviewService.DB_FILE
         max_retries = 3
         retry_delay = 1.0
         
         for attempt in range(max_retries):
             try:
-                conn = ReviewService.get_db_connection()
+                conn = get_connection(db_file, ReviewService.DB_TIMEOUT)
+                # 手动管理事务，迁移中的DDL与版本记录在同一事务中提交
+                conn.isolation_level = None
                 try:
-                    cursor = conn.cursor()
-                    cursor.execute('''
-                            CREATE TABLE IF NOT EXISTS mr_review_log (
-                                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                                project_name TEXT,
-                                author TEXT,
-                                source_branch TEXT,
-                                target_branch TEXT,
-                                updated_at INTEGER,
-                                commit_messages TEXT,
-                                score INTEGER,
-                                url TEXT,
-                                review_result TEXT,
-                                additions INTEGER DEFAULT 0,
-                                deletions INTEGER DEFAULT 0,
-                                last_commit_id TEXT DEFAULT ''
-                            )
-                        ''')
-                    cursor.execute('''
-                            CREATE TABLE IF NOT EXISTS push_review_log (
-                                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                                project_name TEXT,
-                                author TEXT,
-                                branch TEXT,
-                                updated_at INTEGER,
-                                commit_messages TEXT,
-                                score INTEGER,
-                                review_result TEXT,
-                                additions INTEGER DEFAULT 0,
-                                deletions INTEGER DEFAULT 0
-                            )
-                        ''')
-                    # 确保旧版本的mr_review_log、push_review_log表添加additions、deletions列
-                    tables = ["mr_review_log", "push_review_log"]
-                    columns = ["additions", "deletions"]
-                    for table in tables:
-                        try:
-                            cursor.execute(f"PRAGMA table_info({table})")
-                            current_columns = [col[1] for col in cursor.fetchall()]
-                            for column in columns:
-                                if column not in current_columns:
-                                    cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} INTEGER DEFAULT 0")
-                        except sqlite3.DatabaseError:
-                            # 如果表不存在，跳过
-                            pass
-
-                    # 为旧版本的mr_review_log表添加last_commit_id字段
-                    try:
-                        mr_columns = [
-                            {
-                                "name": "last_commit_id",
-                                "type": "TEXT",
-                                "default": "''"
-                            }
-                        ]
-                        cursor.execute(f"PRAGMA table_info('mr_review_log')")
-                        current_columns = [col[1] for col in cursor.fetchall()]
-                        for column in mr_columns:
-                            if column.get("name") not in current_columns:
-                                cursor.execute(f"ALTER TABLE mr_review_log ADD COLUMN {column.get('name')} {column.get('type')} "
-                                               f"DEFAULT {column.get('default')}")
-                    except sqlite3.DatabaseError:
-                        # 如果表不存在，跳过
-                        pass
-
-                    conn.commit()
-                    
-                    # 创建审查规则表
-                    cursor.execute('''
-                            CREATE TABLE IF NOT EXISTS review_rules (
-                                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                                rule_key TEXT NOT NULL UNIQUE,
-                                system_prompt TEXT NOT NULL,
-                                user_prompt TEXT NOT NULL,
-                                description TEXT,
-                                is_active INTEGER DEFAULT 1,
-                                created_at INTEGER NOT NULL,
-                                updated_at INTEGER NOT NULL,
-                                updated_by TEXT
-                            )
-                        ''')
-                    
-                    # 创建规则历史记录表
-                    cursor.execute('''
-                            CREATE TABLE IF NOT EXISTS review_rules_history (
-                                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                                rule_id INTEGER NOT NULL,
-                                rule_key TEXT NOT NULL,
-                                system_prompt_old TEXT,
-                                system_prompt_new TEXT,
-                                user_prompt_old TEXT,
-                                user_prompt_new TEXT,
-                                change_type TEXT NOT NULL,
-                                changed_at INTEGER NOT NULL,
-                                changed_by TEXT,
-                                change_reason TEXT,
-                                FOREIGN KEY (rule_id) REFERENCES review_rules(id)
-                            )
-                        ''')
-                    
-                    conn.commit()
-                    
-                    # 添加时间字段索引（默认查询就需要时间范围）
-                    try:
-                        conn.execute('CREATE INDEX IF NOT EXISTS idx_push_review_log_updated_at ON '
-                                     'push_review_log (updated_at);')
-                        conn.execute('CREATE INDEX IF NOT EXISTS idx_mr_review_log_updated_at ON mr_review_log (updated_at);')
-                        # 添加规则表索引
-                        conn.execute('CREATE INDEX IF NOT EXISTS idx_review_rules_key ON review_rules(rule_key);')
-                        conn.execute('CREATE INDEX IF NOT EXISTS idx_review_rules_active ON review_rules(is_active);')
-                        conn.execute('CREATE INDEX IF NOT EXISTS idx_rules_history_rule_id ON review_rules_history(rule_id);')
-                        conn.execute('CREATE INDEX IF NOT EXISTS idx_rules_history_changed_at ON review_rules_history(changed_at);')
-                        conn.commit()
-                    except sqlite3.DatabaseError:
-                        # 索引创建失败不影响，继续
-                        pass
+                    ReviewService.migrate(conn)
                 finally:
                     conn.close()
+                _initialized_db_files.add(db_file)
                 # 成功则退出重试循环
                 return
             except sqlite3.OperationalError as e:
@@ -186,23 +334,35 @@ class ReviewService:
                 print(f"Unexpected error during database initialization: {e}")
                 return
 
+    @staticmethod
+    def _insert_review_result(cursor, log_type: str, log_id: int, review_result: str):
+        cursor.execute('INSERT OR REPLACE INTO review_results (log_type, log_id, encoding, content) VALUES (?, ?, ?, ?)',
+                       (log_type, log_id, REVIEW_ENCODING_ZLIB, compress_review(review_result)))
+
+    @staticmethod
+    def write_mr_review_log(cursor, entity: MergeRequestReviewEntity):
+        """在调用方的事务中写入合并请求审核日志，审查结果压缩后保存在review_results表"""
+        has_review = 1 if entity.review_result and entity.review_result.strip() else 0
+        cursor.execute('''
+                        INSERT INTO mr_review_log (project_name,author, source_branch, target_branch, 
+                        updated_at, commit_messages, score, url, additions, deletions, 
+                        last_commit_id, has_review, cached)
+                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    ''',
+                       (entity.project_name, entity.author, entity.source_branch,
+                        entity.target_branch, entity.updated_at, entity.commit_messages, entity.score,
+                        entity.url, entity.additions, entity.deletions,
+                        entity.last_commit_id, has_review, 1 if entity.cached else 0))
+        if has_review:
+            ReviewService._insert_review_result(cursor, LOG_TYPE_MR, cursor.lastrowid, entity.review_result)
+
     @staticmethod
     def insert_mr_review_log(entity: MergeRequestReviewEntity):
         """插入合并请求审核日志"""
         try:
             conn = ReviewService.get_db_connection()
             try:
-                cursor = conn.cursor()
-                cursor.execute('''
-                                INSERT INTO mr_review_log (project_name,author, source_branch, target_branch, 
-                                updated_at, commit_messages, score, url,review_result, additions, deletions, 
-                                last_commit_id)
-                                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                            ''',
-                               (entity.project_name, entity.author, entity.source_branch,
-                                entity.target_branch, entity.updated_at, entity.commit_messages, entity.score,
-                                entity.url, entity.review_result, entity.additions, entity.deletions,
-                                entity.last_commit_id))
+                ReviewService.write_mr_review_log(conn.cursor(), entity)
                 conn.commit()
             finally:
                 conn.close()
@@ -211,13 +371,14 @@ class ReviewService:
 
     @staticmethod
     def get_mr_review_logs(authors: list = None, project_names: list = None, updated_at_gte: int = None,
-                           updated_at_lte: int = None) -> pd.DataFrame:
-        """获取符合条件的合并请求审核日志"""
+                           updated_at_lte: int = None) -> 'pd.DataFrame':
+        """获取符合条件的合并请求审核日志（不包含审查结果正文，has_review标记是否有审查结果）"""
+        import pandas as pd
         try:
             conn = ReviewService.get_db_connection()
             try:
                 query = """
-                            SELECT id, project_name, author, source_branch, target_branch, updated_at, commit_messages, score, url, review_result, additions, deletions
+                            SELECT id, project_name, author, source_branch, target_branch, updated_at, commit_messages, score, url, has_review, additions, deletions
                             FROM mr_review_log
                             WHERE 1=1
                             """
@@ -253,35 +414,36 @@ class ReviewService:
     def check_mr_last_commit_id_exists(project_name: str, source_branch: str, target_branch: str, last_commit_id: str) -> bool:
         """检查指定项目的Merge Request是否已经存在相同的last_commit_id"""
         try:
-            conn = ReviewService.get_db_connection()
-            try:
-                cursor = conn.cursor()
-                cursor.execute('''
-                    SELECT COUNT(*) FROM mr_review_log 
-                    WHERE project_name = ? AND source_branch = ? AND target_branch = ? AND last_commit_id = ?
-                ''', (project_name, source_branch, target_branch, last_commit_id))
-                count = cursor.fetchone()[0]
-                return count > 0
-            finally:
-                conn.close()
+            # 命中idx_mr_review_log_last_commit，找到一条即返回
+            ReviewService.ensure_db()
+            row = get_pool(ReviewService.DB_FILE, ReviewService.DB_TIMEOUT).fetch_one(
+                SQL_MR_LAST_COMMIT_EXISTS, (project_name, source_branch, target_branch, last_commit_id))
+            return row is not None
         except sqlite3.DatabaseError as e:
             print(f"Error checking last_commit_id: {e}")
             return False
 
+    @staticmethod
+    def write_push_review_log(cursor, entity: PushReviewEntity):
+        """在调用方的事务中写入推送审核日志，审查结果压缩后保存在review_results表"""
+        has_review = 1 if entity.review_result and entity.review_result.strip() else 0
+        cursor.execute('''
+                        INSERT INTO push_review_log (project_name,author, branch, updated_at, commit_messages, score, additions, deletions, has_review, cached)
+                         VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    ''',
+                       (entity.project_name, entity.author, entity.branch,
+                        entity.updated_at, entity.commit_messages, entity.score,
+                        entity.additions, entity.deletions, has_review, 1 if entity.cached else 0))
+        if has_review:
+            ReviewService._insert_review_result(cursor, LOG_TYPE_PUSH, cursor.lastrowid, entity.review_result)
+
     @staticmethod
     def insert_push_review_log(entity: PushReviewEntity):
         """插入推送审核日志"""
         try:
             conn = ReviewService.get_db_connection()
             try:
-                cursor = conn.cursor()
-                cursor.execute('''
-                                INSERT INTO push_review_log (project_name,author, branch, updated_at, commit_messages, score,review_result, additions, deletions)
-                                 VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-                            ''',
-                               (entity.project_name, entity.author, entity.branch,
-                                entity.updated_at, entity.commit_messages, entity.score,
-                                entity.review_result, entity.additions, entity.deletions))
+                ReviewService.write_push_review_log(conn.cursor(), entity)
                 conn.commit()
             finally:
                 conn.close()
@@ -290,14 +452,15 @@ class ReviewService:
 
     @staticmethod
     def get_push_review_logs(authors: list = None, project_names: list = None, updated_at_gte: int = None,
-                             updated_at_lte: int = None) -> pd.DataFrame:
-        """获取符合条件的推送审核日志"""
+                             updated_at_lte: int = None) -> 'pd.DataFrame':
+        """获取符合条件的推送审核日志（不包含审查结果正文，has_review标记是否有审查结果）"""
+        import pandas as pd
         try:
             conn = ReviewService.get_db_connection()
             try:
                 # 基础查询
                 query = """
-                    SELECT id, project_name, author, branch, updated_at, commit_messages, score, review_result, additions, deletions
+                    SELECT id, project_name, author, branch, updated_at, commit_messages, score, has_review, additions, deletions
                     FROM push_review_log
                     WHERE 1=1
                 """
@@ -337,8 +500,20 @@ class ReviewService:
             return pd.DataFrame()
 
     @staticmethod
-    def get_mr_review_log_by_id(record_id: int) -> pd.DataFrame:
+    def _attach_review_result(conn, df: 'pd.DataFrame', log_type: str, record_id: int) -> 'pd.DataFrame':
+        """从review_results表读取并解压审查结果，填入review_result列"""
+        if df.empty:
+            return df
+        row = conn.execute('SELECT encoding, content FROM review_results WHERE log_type = ? AND log_id = ?',
+                           (log_type, record_id)).fetchone()
+        if row is not None:
+            df['review_result'] = decompress_review(row[1], row[0])
+        return df
+
+    @staticmethod
+    def get_mr_review_log_by_id(record_id: int) -> 'pd.DataFrame':
         """根据ID获取单条合并请求审核日志"""
+        import pandas as pd
         try:
             conn = ReviewService.get_db_connection()
             try:
@@ -348,7 +523,7 @@ class ReviewService:
                             WHERE id = ?
                             """
                 df = pd.read_sql_query(sql=query, con=conn, params=[record_id])
-                return df
+                return ReviewService._attach_review_result(conn, df, LOG_TYPE_MR, record_id)
             finally:
                 conn.close()
         except sqlite3.DatabaseError as e:
@@ -356,8 +531,9 @@ class ReviewService:
             return pd.DataFrame()
 
     @staticmethod
-    def get_push_review_log_by_id(record_id: int) -> pd.DataFrame:
+    def get_push_review_log_by_id(record_id: int) -> 'pd.DataFrame':
         """根据ID获取单条推送审核日志"""
+        import pandas as pd
         try:
             conn = ReviewService.get_db_connection()
             try:
@@ -367,13 +543,9 @@ class ReviewService:
                             WHERE id = ?
                             """
                 df = pd.read_sql_query(sql=query, con=conn, params=[record_id])
-                return df
+                return ReviewService._attach_review_result(conn, df, LOG_TYPE_PUSH, record_id)
             finally:
                 conn.close()
         except sqlite3.DatabaseError as e:
             print(f"Error retrieving push review log by id: {e}")
             return pd.DataFrame()
-
-
-# Initialize database
-ReviewService.init_db()
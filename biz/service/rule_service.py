@@ -1,16 +1,26 @@
 """审查规则管理服务"""
 import sqlite3
+import threading
 import time
 from pathlib import Path
-from typing import Dict, Any, Optional
+from typing import TYPE_CHECKING, Dict, Any, Optional, Tuple
 import os
 
-import pandas as pd
 import yaml
+from jinja2 import Template
 
 from biz.entity.rule_entity import RuleEntity, RuleHistoryEntity
+# review_rules、rules_version等表由ReviewService的迁移创建
+from biz.service.review_service import ReviewService
+from biz.utils.db import get_connection, get_pool
 from biz.utils.log import logger
 
+if TYPE_CHECKING:
+    import pandas as pd
+
+# 其他进程（如Dashboard）修改规则后，本进程最迟在该间隔（秒）后使用新规则
+RULE_CACHE_CHECK_INTERVAL = float(os.getenv('RULE_CACHE_CHECK_INTERVAL', 5))
+
 
 def get_project_root():
     """获取项目根目录的绝对路径"""
@@ -20,6 +30,16 @@ def get_project_root():
     return current_file.parent.parent.parent
 
 
+# 热点查询（每次审查都会读取规则），语句文本保持不变以复用连接上已编译的语句
+SQL_ACTIVE_RULE = '''
+    SELECT id, rule_key, system_prompt, user_prompt, description,
+           is_active, created_at, updated_at, updated_by
+    FROM review_rules
+    WHERE rule_key = ? AND is_active = 1
+'''
+SQL_RULES_VERSION = 'SELECT version FROM rules_version WHERE id = 1'
+
+
 class RuleService:
     """审查规则管理服务"""
     
@@ -29,13 +49,42 @@ class RuleService:
     
     @staticmethod
     def get_db_connection():
-        """获取数据库连接，配置超时和WAL模式"""
-        conn = sqlite3.connect(RuleService.DB_FILE, timeout=RuleService.DB_TIMEOUT)
-        try:
-            conn.execute('PRAGMA journal_mode=WAL;')
-        except sqlite3.DatabaseError:
-            pass
-        return conn
+        """获取当前线程复用的数据库连接（与ReviewService共用同一个连接池），close()时归还"""
+        ReviewService.ensure_db(RuleService.DB_FILE)
+        return get_connection(RuleService.DB_FILE, RuleService.DB_TIMEOUT)
+
+    @staticmethod
+    def _pool():
+        ReviewService.ensure_db(RuleService.DB_FILE)
+        return get_pool(RuleService.DB_FILE, RuleService.DB_TIMEOUT)
+
+    @staticmethod
+    def get_rules_version() -> int:
+        """规则版本号，review_rules每次变更时递增"""
+        row = RuleService._pool().fetch_one(SQL_RULES_VERSION)
+        return row[0] if row else 0
+
+    @staticmethod
+    def _bump_rules_version(cursor):
+        """在规则变更的事务中递增规则版本号"""
+        cursor.execute('UPDATE rules_version SET version = version + 1 WHERE id = 1')
+
+    @staticmethod
+    def _fetch_active_rule(rule_key: str) -> Optional[Dict[str, Any]]:
+        row = RuleService._pool().fetch_one(SQL_ACTIVE_RULE, (rule_key,))
+        if not row:
+            return None
+        return {
+            'id': row[0],
+            'rule_key': row[1],
+            'system_prompt': row[2],
+            'user_prompt': row[3],
+            'description': row[4],
+            'is_active': row[5],
+            'created_at': row[6],
+            'updated_at': row[7],
+            'updated_by': row[8]
+        }
 
     
     @staticmethod
@@ -99,6 +148,7 @@ class RuleService:
                     VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
                 ''', (rule_id, rule_key, None, system_prompt, None, user_prompt,
                       'create', current_time, imported_by, '从YAML文件初始化导入'))
+                RuleService._bump_rules_version(cursor)
                 
                 conn.commit()
                 logger.info(f"成功从YAML导入规则: {rule_key}")
@@ -136,31 +186,9 @@ class RuleService:
         """
         # 尝试从数据库加载
         try:
-            conn = RuleService.get_db_connection()
-            try:
-                cursor = conn.cursor()
-                cursor.execute('''
-                    SELECT id, rule_key, system_prompt, user_prompt, description, 
-                           is_active, created_at, updated_at, updated_by
-                    FROM review_rules
-                    WHERE rule_key = ? AND is_active = 1
-                ''', (rule_key,))
-                
-                row = cursor.fetchone()
-                if row:
-                    return {
-                        'id': row[0],
-                        'rule_key': row[1],
-                        'system_prompt': row[2],
-                        'user_prompt': row[3],
-                        'description': row[4],
-                        'is_active': row[5],
-                        'created_at': row[6],
-                        'updated_at': row[7],
-                        'updated_by': row[8]
-                    }
-            finally:
-                conn.close()
+            rule = RuleService._fetch_active_rule(rule_key)
+            if rule:
+                return rule
         except sqlite3.DatabaseError as e:
             logger.warn(f"数据库查询失败，尝试从YAML加载: {e}")
         
@@ -169,31 +197,9 @@ class RuleService:
         if RuleService.import_from_yaml(rule_key):
             # 导入成功，再次从数据库读取
             try:
-                conn = RuleService.get_db_connection()
-                try:
-                    cursor = conn.cursor()
-                    cursor.execute('''
-                        SELECT id, rule_key, system_prompt, user_prompt, description, 
-                               is_active, created_at, updated_at, updated_by
-                        FROM review_rules
-                        WHERE rule_key = ? AND is_active = 1
-                    ''', (rule_key,))
-                    
-                    row = cursor.fetchone()
-                    if row:
-                        return {
-                            'id': row[0],
-                            'rule_key': row[1],
-                            'system_prompt': row[2],
-                            'user_prompt': row[3],
-                            'description': row[4],
-                            'is_active': row[5],
-                            'created_at': row[6],
-                            'updated_at': row[7],
-                            'updated_by': row[8]
-                        }
-                finally:
-                    conn.close()
+                rule = RuleService._fetch_active_rule(rule_key)
+                if rule:
+                    return rule
             except sqlite3.DatabaseError as e:
                 logger.error(f"导入后数据库查询失败: {e}")
         
@@ -281,9 +287,12 @@ class RuleService:
                     ''', (rule_id, rule_key, old_system_prompt, system_prompt, 
                           old_user_prompt, user_prompt, 'update', current_time, 
                           updated_by, change_reason))
+                    RuleService._bump_rules_version(cursor)
                     
                     # 提交事务
                     conn.commit()
+                    # 本进程的规则缓存立即失效，其他进程通过规则版本号感知
+                    rule_cache.invalidate()
                     logger.info(f"成功更新规则: {rule_key} by {updated_by}")
                     return True
                     
@@ -305,7 +314,7 @@ class RuleService:
 
     
     @staticmethod
-    def get_rule_history(rule_key: str, limit: int = 50) -> pd.DataFrame:
+    def get_rule_history(rule_key: str, limit: int = 50) -> 'pd.DataFrame':
         """
         获取规则修改历史
         
@@ -316,6 +325,7 @@ class RuleService:
         Returns:
             pd.DataFrame: 历史记录DataFrame
         """
+        import pandas as pd
         try:
             conn = RuleService.get_db_connection()
             try:
@@ -337,13 +347,14 @@ class RuleService:
             return pd.DataFrame()
     
     @staticmethod
-    def get_all_rules() -> pd.DataFrame:
+    def get_all_rules() -> 'pd.DataFrame':
         """
         获取所有规则列表
         
         Returns:
             pd.DataFrame: 规则列表DataFrame
         """
+        import pandas as pd
         try:
             conn = RuleService.get_db_connection()
             try:
@@ -362,12 +373,78 @@ class RuleService:
 
 
 
-# 系统启动时自动初始化规则
+class RuleCache:
+    """
+    按 (rule_key, style) 缓存渲染后的提示词，避免每次审查都查询规则并重新编译Jinja2模板
+    缓存以规则版本号为准：距上次检查超过 RULE_CACHE_CHECK_INTERVAL 秒时重新读取版本号，版本变化则清空缓存
+    """
+
+    def __init__(self, check_interval: float = RULE_CACHE_CHECK_INTERVAL):
+        self.check_interval = check_interval
+        # (rule_key, style) -> (规则版本号, system_prompt, user_prompt)
+        self._entries: Dict[Tuple[str, str], Tuple[int, str, str]] = {}
+        self._version = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _current_version(self) -> Optional[int]:
+        now = time.monotonic()
+        if self._version is not None and now - self._checked_at < self.check_interval:
+            return self._version
+        try:
+            version = RuleService.get_rules_version()
+        except sqlite3.DatabaseError as e:
+            logger.warn(f"读取规则版本号失败，不使用规则缓存: {e}")
+            return None
+        with self._lock:
+            if version != self._version:
+                self._entries.clear()
+            self._version = version
+            self._checked_at = now
+        return version
+
+    def get_prompts(self, rule_key: str, style: str) -> Tuple[str, str]:
+        """
+        获取渲染后的 (system_prompt, user_prompt)
+        """
+        version = self._current_version()
+        entry = self._entries.get((rule_key, style))
+        if version is not None and entry is not None and entry[0] == version:
+            self.hits += 1
+            return entry[1], entry[2]
+
+        self.misses += 1
+        rule = RuleService.get_rule(rule_key, style)
+        system_prompt = Template(rule['system_prompt']).render(style=style)
+        user_prompt = Template(rule['user_prompt']).render(style=style)
+        # 从YAML降级加载的规则不缓存，数据库恢复后重新读取
+        if version is not None and rule.get('id') is not None:
+            with self._lock:
+                self._entries[(rule_key, style)] = (version, system_prompt, user_prompt)
+        return system_prompt, user_prompt
+
+    def invalidate(self):
+        with self._lock:
+            self._entries.clear()
+            self._version = None
+
+
+rule_cache = RuleCache()
+
+
+# 已检查过规则的数据库文件
+_rules_initialized = set()
+
+
 def init_rules():
     """
-    系统启动时自动初始化规则
+    系统启动时初始化规则（见 biz/bootstrap.py），每个进程对每个数据库文件只检查一次
     检查数据库中是否存在规则，如果不存在则从YAML导入
     """
+    if RuleService.DB_FILE in _rules_initialized:
+        return
     try:
         conn = RuleService.get_db_connection()
         try:
@@ -382,11 +459,8 @@ def init_rules():
                 logger.info("规则导入完成")
             else:
                 logger.info(f"数据库中已存在 {count} 条规则配置")
+            _rules_initialized.add(RuleService.DB_FILE)
         finally:
             conn.close()
     except Exception as e:
         logger.error(f"规则初始化失败: {e}")
-
-
-# 在模块加载时自动初始化
-init_rules()
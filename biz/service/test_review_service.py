@@ -0,0 +1,129 @@
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+from unittest import TestCase, main
+from unittest.mock import patch
+
+from biz.entity.review_entity import PushReviewEntity
+from biz.service.review_service import ReviewService, LATEST_SCHEMA_VERSION
+
+
+class TestSchemaMigration(TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db_file = os.path.join(self.tmpdir.name, 'data.db')
+        patcher = patch.object(ReviewService, 'DB_FILE', self.db_file)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _versions(self):
+        conn = sqlite3.connect(self.db_file)
+        try:
+            return [row[0] for row in conn.execute('SELECT version FROM schema_version ORDER BY version')]
+        finally:
+            conn.close()
+
+    def test_upgrade_legacy_database(self):
+        # 引入版本化迁移前、尚未添加additions/deletions/last_commit_id列的数据库
+        conn = sqlite3.connect(self.db_file)
+        conn.execute('CREATE TABLE mr_review_log (id INTEGER PRIMARY KEY AUTOINCREMENT, project_name TEXT, '
+                     'author TEXT, source_branch TEXT, target_branch TEXT, updated_at INTEGER, '
+                     'commit_messages TEXT, score INTEGER, url TEXT, review_result TEXT)')
+        conn.execute("INSERT INTO mr_review_log (project_name, source_branch, target_branch, review_result) "
+                     "VALUES ('p', 's', 't', '总分: 90')")
+        conn.commit()
+        conn.close()
+
+        ReviewService.init_db()
+        self.assertEqual(self._versions(), list(range(1, LATEST_SCHEMA_VERSION + 1)))
+        conn = sqlite3.connect(self.db_file)
+        try:
+            columns = [col[1] for col in conn.execute('PRAGMA table_info(mr_review_log)')]
+            self.assertIn('last_commit_id', columns)
+            self.assertIn('additions', columns)
+            conn.execute("UPDATE mr_review_log SET last_commit_id = 'abc'")
+            conn.commit()
+        finally:
+            conn.close()
+        self.assertTrue(ReviewService.check_mr_last_commit_id_exists('p', 's', 't', 'abc'))
+        self.assertFalse(ReviewService.check_mr_last_commit_id_exists('p', 's', 't', 'def'))
+        # 旧记录的审查结果迁移到review_results表
+        listing = ReviewService.get_mr_review_logs()
+        self.assertNotIn('review_result', listing.columns)
+        self.assertEqual(listing.iloc[0]['has_review'], 1)
+        self.assertEqual(ReviewService.get_mr_review_log_by_id(1).iloc[0]['review_result'], '总分: 90')
+
+    def test_init_db_is_idempotent(self):
+        ReviewService.init_db()
+        ReviewService.init_db()
+        self.assertEqual(self._versions(), list(range(1, LATEST_SCHEMA_VERSION + 1)))
+
+
+class TestReviewResultStorage(TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        patcher = patch.object(ReviewService, 'DB_FILE', os.path.join(self.tmpdir.name, 'data.db'))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        ReviewService.init_db()
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _insert_push(self, review_result, cached=False):
+        ReviewService.insert_push_review_log(PushReviewEntity(
+            project_name='p', author='a', branch='main', updated_at=1, commits=[{'message': 'fix'}], score=80,
+            review_result=review_result, url_slug='', webhook_data={}, additions=1, deletions=0, cached=cached))
+
+    def test_review_result_stored_separately(self):
+        self._insert_push('# 审查结果\n' * 100)
+        self._insert_push('')
+        listing = ReviewService.get_push_review_logs()
+        self.assertNotIn('review_result', listing.columns)
+        self.assertEqual(sorted(listing['has_review'].tolist()), [0, 1])
+        detail = ReviewService.get_push_review_log_by_id(1)
+        self.assertEqual(detail.iloc[0]['review_result'], '# 审查结果\n' * 100)
+        self.assertEqual(detail.iloc[0]['commit_messages'], 'fix')
+
+    def test_cached_flag_stored(self):
+        self._insert_push('总分: 80', cached=True)
+        self._insert_push('总分: 80')
+        with sqlite3.connect(ReviewService.DB_FILE) as conn:
+            rows = conn.execute('SELECT cached FROM push_review_log ORDER BY id').fetchall()
+        self.assertEqual(rows, [(1,), (0,)])
+
+
+class TestLazyInit(TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db_file = os.path.join(self.tmpdir.name, 'data.db')
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_import_has_no_side_effects(self):
+        os.makedirs(os.path.join(self.tmpdir.name, 'data'))
+        code = ('import sys, biz.queue.worker, biz.llm.factory; '
+                'print(",".join(m for m in ("pandas", "tiktoken", "openai", "zhipuai", "ollama") if m in sys.modules))')
+        output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True,
+                                env={**os.environ, 'PROJECT_ROOT': self.tmpdir.name},
+                                cwd=os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+        self.assertEqual(output.stdout.strip(), '')
+        self.assertEqual(os.listdir(os.path.join(self.tmpdir.name, 'data')), [])
+
+    def test_first_connection_migrates(self):
+        with patch.object(ReviewService, 'DB_FILE', self.db_file):
+            conn = ReviewService.get_db_connection()
+            try:
+                self.assertEqual(ReviewService.schema_version(conn), LATEST_SCHEMA_VERSION)
+            finally:
+                conn.close()
+
+
+if __name__ == '__main__':
+    main()
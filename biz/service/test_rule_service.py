@@ -0,0 +1,48 @@
+import os
+import tempfile
+from unittest import TestCase, main
+from unittest.mock import patch
+
+from biz.service.review_service import ReviewService
+from biz.service.rule_service import RuleService, RuleCache
+
+
+class TestRuleCache(TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        db_file = os.path.join(self.tmpdir.name, 'data.db')
+        for service in (ReviewService, RuleService):
+            patcher = patch.object(service, 'DB_FILE', db_file)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        ReviewService.init_db()
+        RuleService.import_from_yaml('code_review_prompt', 'test')
+        self.cache = RuleCache(check_interval=0)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_cached_until_version_changes(self):
+        system_prompt, _ = self.cache.get_prompts('code_review_prompt', 'professional')
+        self.cache.get_prompts('code_review_prompt', 'professional')
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+
+        # 模拟其他进程修改规则：只递增规则版本号，不调用本缓存的invalidate
+        version = RuleService.get_rules_version()
+        conn = RuleService.get_db_connection()
+        try:
+            conn.execute("UPDATE review_rules SET system_prompt = system_prompt || '\n# changed' "
+                         "WHERE rule_key = 'code_review_prompt'")
+            RuleService._bump_rules_version(conn.cursor())
+            conn.commit()
+        finally:
+            conn.close()
+        self.assertEqual(RuleService.get_rules_version(), version + 1)
+
+        reloaded, _ = self.cache.get_prompts('code_review_prompt', 'professional')
+        self.assertEqual(reloaded, system_prompt + '\n# changed')
+        self.assertEqual(self.cache.misses, 2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+import asyncio
+from unittest import TestCase, main
+from unittest.mock import patch
+
+import httpx
+
+from asgi import WebhookApp
+from biz.intake import mr_lane
+from biz.queue import coalescer
+from biz.utils.protected_branch_cache import ProtectedBranchCache
+from biz.utils.queue import QueueFullError, LANE_MR, LANE_MR_PROTECTED
+
+GITLAB_HEADERS = {'X-Gitlab-Token': 'token', 'X-Gitlab-Instance': 'https://gitlab.example.com'}
+PUSH_EVENT = {'object_kind': 'push', 'after': 'a' * 40, 'project': {'path_with_namespace': 'group/project'}}
+
+
+def merge_request_event(head_sha: str) -> dict:
+    return {'object_kind': 'merge_request',
+            'object_attributes': {'target_project_id': 1, 'iid': 7, 'target_branch': 'main', 'action': 'update',
+                                  'last_commit': {'id': head_sha}}}
+
+
+class TestAsgiApp(TestCase):
+    def request(self, app, method, path, **kwargs):
+        async def send():
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url='http://test') as client:
+                return await client.request(method, path, **kwargs)
+
+        return asyncio.run(send())
+
+    @patch('biz.intake.WEBHOOK_DEDUPE_ENABLED', False)
+    @patch('biz.intake.handle_queue')
+    def test_webhook_enqueued(self, handle_queue):
+        app = WebhookApp(start_services=False)
+        response = self.request(app, 'POST', '/review/webhook', json=PUSH_EVENT, headers=GITLAB_HEADERS)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('object_kind=push', response.json()['message'])
+        self.assertEqual(handle_queue.call_args.args[2:], ('token', 'https://gitlab.example.com', 'gitlab_example_com'))
+
+    def test_invalid_requests(self):
+        app = WebhookApp(start_services=False)
+        self.assertEqual(self.request(app, 'POST', '/review/webhook', content=b'x').status_code, 400)
+        self.assertEqual(self.request(app, 'POST', '/review/webhook', content=b'{',
+                                      headers={'Content-Type': 'application/json'}).status_code, 400)
+        self.assertEqual(self.request(app, 'GET', '/review/webhook').status_code, 405)
+        self.assertEqual(self.request(app, 'GET', '/review/unknown').status_code, 404)
+
+    def test_reject_when_saturated(self):
+        app = WebhookApp(max_in_flight=0, start_services=False)
+        response = self.request(app, 'POST', '/review/webhook', json=PUSH_EVENT, headers=GITLAB_HEADERS)
+        self.assertEqual(response.status_code, 429)
+        self.assertIn('retry-after', response.headers)
+
+    @patch('biz.intake.WEBHOOK_DEDUPE_ENABLED', False)
+    @patch('biz.intake.protected_branch_cache.prefetch')
+    @patch('biz.queue.coalescer.queue_driver', 'pool')
+    @patch('biz.queue.coalescer._latest_heads', coalescer.OrderedDict())
+    @patch('biz.intake.handle_queue')
+    def test_queue_full_keeps_queued_head(self, handle_queue, prefetch):
+        app = WebhookApp(start_services=False)
+        response = self.request(app, 'POST', '/review/webhook', json=merge_request_event('a' * 40),
+                                headers=GITLAB_HEADERS)
+        self.assertEqual(response.status_code, 200)
+
+        # 队列已满未入队的推送不能取代已排队的任务
+        handle_queue.side_effect = QueueFullError('full')
+        response = self.request(app, 'POST', '/review/webhook', json=merge_request_event('b' * 40),
+                                headers=GITLAB_HEADERS)
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(coalescer.latest_head('gitlab_example_com', 1, 7), 'a' * 40)
+        self.assertFalse(coalescer.is_superseded('gitlab_example_com', 1, 7, 'a' * 40))
+
+    @patch('biz.intake.queue_stats', return_value={'lanes': {}})
+    def test_queue_stats_include_protected_branch_cache(self, queue_stats):
+        app = WebhookApp(start_services=False)
+        response = self.request(app, 'GET', '/review/queue/stats')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(response.json()['protected_branch_cache']),
+                         {'size', 'hits', 'redis_hits', 'misses', 'hit_rate'})
+
+    def test_handler_error_after_response_started(self):
+        app = WebhookApp(start_services=False)
+        messages = []
+
+        async def broken(scope, receive, send):
+            await send({'type': 'http.response.start', 'status': 200, 'headers': []})
+            raise RuntimeError('boom')
+
+        async def call():
+            async def receive():
+                return {'type': 'http.request', 'body': b''}
+
+            async def send(message):
+                messages.append(message)
+
+            await app({'type': 'http', 'method': 'GET', 'path': '/'}, receive, send)
+
+        app.routes[('GET', '/')] = broken
+        asyncio.run(call())
+        # 响应已开始后不能再发送第二个http.response.start
+        self.assertEqual([message['type'] for message in messages], ['http.response.start'])
+
+        async def broken_before_start(scope, receive, send):
+            raise RuntimeError('boom')
+
+        app.routes[('GET', '/')] = broken_before_start
+        messages.clear()
+        asyncio.run(call())
+        self.assertEqual(messages[0]['status'], 500)
+
+
+class TestMrLane(TestCase):
+    def test_cache_miss_prefetches_in_background(self):
+        cache = ProtectedBranchCache()
+        with patch('biz.intake.protected_branch_cache', cache):
+            self.assertEqual(mr_lane('https://gitlab.example.com', 1, 'main', lambda: ['main', 'release/*']), LANE_MR)
+            cache._executor.shutdown(wait=True)
+            self.assertEqual(mr_lane('https://gitlab.example.com', 1, 'release/1.0', lambda: []), LANE_MR_PROTECTED)
+            self.assertEqual(mr_lane('https://gitlab.example.com', 1, 'feature', lambda: []), LANE_MR)
+        self.assertEqual(cache.stats()['misses'], 1)
+
+
+if __name__ == '__main__':
+    main()
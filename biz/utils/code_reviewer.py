@@ -1,14 +1,17 @@
 import abc
 import os
 import re
-from typing import Dict, Any, List
-
-from jinja2 import Template
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Callable, Optional
 
+from biz.llm.client.router import RouterClient
 from biz.llm.factory import Factory
-from biz.service.rule_service import RuleService
+from biz.llm.stream import collect_stream
+from biz.service.rule_service import rule_cache
 from biz.utils.log import logger
-from biz.utils.token_util import count_tokens, truncate_text_by_tokens
+from biz.utils.review_cache import review_cache, make_cache_key
+from biz.utils.token_util import count_tokens, truncate_text_by_tokens, token_budget, changes_token_budget
 
 
 class BaseReviewer(abc.ABC):
@@ -18,6 +21,31 @@ class BaseReviewer(abc.ABC):
         self.client = Factory().getClient()
         self.prompt_key = prompt_key
         self.style = os.getenv("REVIEW_STYLE", "professional")
+        # 本次审查的LLM调用次数与缓存命中次数（map_reduce模式下在多个线程中累加）
+        self.llm_calls = 0
+        self.cache_hits = 0
+        self._stats_lock = threading.Lock()
+
+    @property
+    def cached(self) -> bool:
+        """审查结果是否完全来自缓存（没有实际调用LLM）"""
+        return self.cache_hits > 0 and self.llm_calls == 0
+
+    def add_stats(self, other: 'BaseReviewer'):
+        """累加另一个审查器（如map_reduce的合并调用）的LLM调用次数和缓存命中次数"""
+        with self._stats_lock:
+            self.llm_calls += other.llm_calls
+            self.cache_hits += other.cache_hits
+
+    def cache_model(self) -> Optional[str]:
+        """
+        缓存key中的模型，即实际生成审查结果的模型
+        RouterClient按后端健康状况切换供应商和模型，调用前无法确定，返回None表示不使用缓存
+        """
+        client = getattr(self.client, 'client', self.client)  # 限流包装（RateLimitedClient）
+        if isinstance(client, RouterClient):
+            return None
+        return getattr(self.client, 'default_model', '')
 
     def _load_prompts(self) -> Dict[str, Any]:
         """
@@ -25,12 +53,8 @@ class BaseReviewer(abc.ABC):
         优先从数据库加载，失败则从YAML加载
         """
         try:
-            # 从 RuleService 获取规则
-            rule_data = RuleService.get_rule(self.prompt_key, self.style)
-            
-            # 使用Jinja2渲染模板
-            system_prompt = Template(rule_data['system_prompt']).render(style=self.style)
-            user_prompt = Template(rule_data['user_prompt']).render(style=self.style)
+            # 从规则缓存获取渲染后的提示词，规则变更后自动重新加载
+            system_prompt, user_prompt = rule_cache.get_prompts(self.prompt_key, self.style)
             
             return {
                 "system_message": {"role": "system", "content": system_prompt},
@@ -40,11 +64,40 @@ class BaseReviewer(abc.ABC):
             logger.error(f"加载提示词配置失败: {e}")
             raise Exception(f"提示词配置加载失败: {e}")
 
-    def call_llm(self, messages: List[Dict[str, Any]]) -> str:
-        """调用 LLM 进行代码审核"""
+    def call_llm(self, messages: List[Dict[str, Any]], on_progress: Callable[[str], None] = None) -> str:
+        """
+        调用 LLM 进行代码审核，相同的prompt、风格和模型优先使用缓存结果
+        :param on_progress: 开启REVIEW_STREAM_ENABLED时，以当前已生成的内容回调，用于逐步更新评论
+        """
+        cache_key = None
+        model = self.cache_model() if review_cache.enabled else None
+        if model is not None:
+            cache_key = make_cache_key(messages, self.style, model)
+            cached_result = review_cache.get(cache_key)
+            if cached_result is not None:
+                logger.info(f"命中AI Review缓存(key={cache_key}, model={model})，跳过LLM调用")
+                logger.debug(f"AI Review缓存结果: {cached_result}")
+                with self._stats_lock:
+                    self.cache_hits += 1
+                return cached_result
+
+        with self._stats_lock:
+            self.llm_calls += 1
+
         logger.info(f"向 AI 发送代码 Review 请求, messages: {messages}")
-        review_result = self.client.completions(messages=messages)
+        if os.getenv("REVIEW_STREAM_ENABLED", "0") == "1":
+            max_tokens = int(os.getenv("REVIEW_STREAM_MAX_TOKENS", 0))
+            review_result = collect_stream(self.client.stream_completions(messages=messages),
+                                           on_progress=on_progress,
+                                           max_seconds=float(os.getenv("REVIEW_STREAM_MAX_SECONDS", 600)),
+                                           max_tokens=max_tokens,
+                                           count_tokens=count_tokens if max_tokens else None).text
+        else:
+            review_result = self.client.completions(messages=messages)
         logger.info(f"收到 AI 返回结果: {review_result}")
+        # 只缓存包含评分的正常审查结果，避免缓存错误信息
+        if cache_key and review_result and re.search(r"总分[:：]\s*(\d+)", review_result):
+            review_cache.set(cache_key, review_result, model)
         return review_result
 
     @abc.abstractmethod
@@ -53,18 +106,135 @@ class BaseReviewer(abc.ABC):
         pass
 
 
+def split_diff_hunks(diff: str) -> List[str]:
+    """按hunk（以@@开头的行）切分单个文件的diff"""
+    hunks = []
+    current = []
+    for line in diff.splitlines(keepends=True):
+        if line.startswith('@@') and current:
+            hunks.append(''.join(current))
+            current = []
+        current.append(line)
+    if current:
+        hunks.append(''.join(current))
+    return hunks
+
+
+def batch_changes(changes: List[Dict[str, Any]], max_tokens: int,
+                  count: Callable[[str], int] = count_tokens) -> List[List[Dict[str, Any]]]:
+    """
+    按token预算将changes切分为多个批次，优先按文件边界切分；
+    单个文件超出预算时按hunk边界拆分，单个hunk仍超出预算时截断该hunk
+    :param count: token计数函数
+    """
+    # (片段, token数)，每个片段只计数一次
+    pieces = []
+    for change in changes:
+        change_tokens = count(str(change))
+        if change_tokens <= max_tokens:
+            pieces.append((change, change_tokens))
+            continue
+        overhead = None
+        for hunk in split_diff_hunks(change.get('diff', '')):
+            piece = dict(change, diff=hunk)
+            piece_tokens = count(str(piece))
+            if piece_tokens > max_tokens:
+                if overhead is None:
+                    overhead = count(str(dict(change, diff='')))
+                piece['diff'] = truncate_text_by_tokens(hunk, max(max_tokens - overhead, 1))
+                # 截断后恰好占满预算，单独成为一个批次
+                piece_tokens = max_tokens
+            pieces.append((piece, piece_tokens))
+
+    batches = []
+    current = []
+    current_tokens = 0
+    for piece, piece_tokens in pieces:
+        if current and current_tokens + piece_tokens > max_tokens:
+            batches.append(current)
+            current = []
+            current_tokens = 0
+        current.append(piece)
+        current_tokens += piece_tokens
+    if current:
+        batches.append(current)
+    return batches
+
+
+def strip_markdown_fence(review_result: str) -> str:
+    """如果review_result是markdown代码块格式，则去掉头尾的```"""
+    review_result = review_result.strip()
+    if review_result.startswith("```markdown") and review_result.endswith("```"):
+        return review_result[11:-3].strip()
+    return review_result
+
+
 class CodeReviewer(BaseReviewer):
     """代码 Diff 级别的审查"""
 
     def __init__(self):
         super().__init__("code_review_prompt")
 
-    def review_and_strip_code(self, changes_text: str, commits_text: str = "") -> str:
+    def review_changes(self, changes: List[Dict[str, Any]], commits_text: str = "",
+                       on_progress: Callable[[str], None] = None) -> str:
+        """
+        根据REVIEW_MODE审查changes：
+        - truncate（默认）：超出REVIEW_MAX_TOKENS的部分被截断，不参与审查
+        - map_reduce：按token预算切分为多个批次并行审查，再合并为一份报告
+        :param on_progress: 流式输出时的进度回调，map_reduce模式下只用于最终合并的调用
+        """
+        review_mode = os.getenv("REVIEW_MODE", "truncate")
+        review_max_tokens = int(os.getenv("REVIEW_MAX_TOKENS", 10000))
+        if not changes:
+            return self.review_and_strip_code("", commits_text, on_progress)
+
+        # 每个文件只编码一次，同时得到总token数、各文件token数和截断后的文本；估算模式下可跳过编码
+        estimate = os.getenv("REVIEW_TOKEN_ESTIMATE", "0") == "1"
+        budget = changes_token_budget(changes, review_max_tokens, estimate=estimate)
+        if budget.estimated:
+            logger.info(f"变更token数（估算）: {budget.count}")
+        else:
+            logger.info(f"变更token数: {budget.count}, 各文件token数: {budget.file_counts}")
+        if budget.truncated and review_mode == "map_reduce":
+            return self.map_reduce_review(changes, commits_text, review_max_tokens, on_progress)
+        if budget.truncated:
+            logger.info(f"变更token数超过REVIEW_MAX_TOKENS={review_max_tokens}，超出部分已截断")
+        return strip_markdown_fence(self.review_code(budget.text, commits_text, on_progress))
+
+    def map_reduce_review(self, changes: List[Dict[str, Any]], commits_text: str, max_tokens: int,
+                          on_progress: Callable[[str], None] = None) -> str:
+        """分批并行审查（map），再由一次LLM调用合并各批次结论并给出总分（reduce）"""
+        concurrency = int(os.getenv("REVIEW_MAP_CONCURRENCY", 3))
+        max_batches = int(os.getenv("REVIEW_MAX_BATCHES", 10))
+        batches = batch_changes(changes, max_tokens)
+        if len(batches) > max_batches:
+            logger.warn(f"变更被切分为{len(batches)}个批次，超过REVIEW_MAX_BATCHES={max_batches}，超出部分不参与审查")
+            batches = batches[:max_batches]
+        logger.info(f"map_reduce审查: {len(batches)}个批次，并发数{concurrency}")
+
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='review-map') as executor:
+            findings = list(executor.map(
+                lambda batch: strip_markdown_fence(self.review_code(str(batch), commits_text)), batches))
+
+        findings_text = "\n\n".join(
+            f"### 第{index}批（{', '.join(item.get('new_path', '') for item in batch)}）\n{finding}"
+            for index, (batch, finding) in enumerate(zip(batches, findings), start=1)
+        )
+        reducer = ReviewReducer()
+        try:
+            return strip_markdown_fence(reducer.review_code(findings_text, commits_text, on_progress))
+        finally:
+            # 合并调用计入本次审查，只有全部调用都命中缓存时才算来自缓存
+            self.add_stats(reducer)
+
+    def review_and_strip_code(self, changes_text: str, commits_text: str = "",
+                              on_progress: Callable[[str], None] = None) -> str:
         """
         Review判断changes_text超出取前REVIEW_MAX_TOKENS个token，超出则截断changes_text，
         调用review_code方法，返回review_result，如果review_result是markdown格式，则去掉头尾的```
         :param changes_text:
         :param commits_text:
+        :param on_progress: 流式输出时的进度回调
         :return:
         """
         # 如果超长，取前REVIEW_MAX_TOKENS个token
@@ -74,17 +244,13 @@ class CodeReviewer(BaseReviewer):
             logger.info("代码为空, diffs_text = %", str(changes_text))
             return "代码为空"
 
-        # 计算tokens数量，如果超过REVIEW_MAX_TOKENS，截断changes_text
-        tokens_count = count_tokens(changes_text)
-        if tokens_count > review_max_tokens:
-            changes_text = truncate_text_by_tokens(changes_text, review_max_tokens)
+        # 计算tokens数量，如果超过REVIEW_MAX_TOKENS，截断changes_text（只编码一次）
+        estimate = os.getenv("REVIEW_TOKEN_ESTIMATE", "0") == "1"
+        changes_text = token_budget(changes_text, review_max_tokens, estimate=estimate).text
 
-        review_result = self.review_code(changes_text, commits_text).strip()
-        if review_result.startswith("```markdown") and review_result.endswith("```"):
-            return review_result[11:-3].strip()
-        return review_result
+        return strip_markdown_fence(self.review_code(changes_text, commits_text, on_progress))
 
-    def review_code(self, diffs_text: str, commits_text: str = "") -> str:
+    def review_code(self, diffs_text: str, commits_text: str = "", on_progress: Callable[[str], None] = None) -> str:
         """Review 代码并返回结果，每次审查时重新加载规则"""
         # 每次审查时重新加载规则，实现热更新
         prompts = self._load_prompts()
@@ -98,7 +264,7 @@ class CodeReviewer(BaseReviewer):
                 ),
             },
         ]
-        return self.call_llm(messages)
+        return self.call_llm(messages, on_progress)
 
     @staticmethod
     def parse_review_score(review_text: str) -> int:
@@ -108,3 +274,22 @@ class CodeReviewer(BaseReviewer):
         match = re.search(r"总分[:：]\s*(\d+)分?", review_text)
         return int(match.group(1)) if match else 0
 
+
+class ReviewReducer(BaseReviewer):
+    """合并map_reduce模式下各批次的审查结论"""
+
+    def __init__(self):
+        super().__init__("code_review_reduce_prompt")
+
+    def review_code(self, findings_text: str, commits_text: str = "", on_progress: Callable[[str], None] = None) -> str:
+        prompts = self._load_prompts()
+        messages = [
+            prompts["system_message"],
+            {
+                "role": "user",
+                "content": prompts["user_message"]["content"].format(
+                    findings_text=findings_text, commits_text=commits_text
+                ),
+            },
+        ]
+        return self.call_llm(messages, on_progress)
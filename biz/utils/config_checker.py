@@ -15,7 +15,7 @@ REQUIRED_ENV_VARS = [
 ]
 
 # 允许的 LLM 供应商
-LLM_PROVIDERS = {"zhipuai", "openai", "deepseek", "ollama", "qwen"}
+LLM_PROVIDERS = {"zhipuai", "openai", "deepseek", "ollama", "qwen", "router"}
 
 # 每种供应商必须配置的键
 LLM_REQUIRED_KEYS = {
@@ -24,6 +24,7 @@ LLM_REQUIRED_KEYS = {
     "deepseek": ["DEEPSEEK_API_KEY", "DEEPSEEK_API_MODEL"],
     "ollama": ["OLLAMA_API_BASE_URL", "OLLAMA_API_MODEL"],
     "qwen": ["QWEN_API_KEY", "QWEN_API_MODEL"],
+    "router": ["LLM_ROUTER_PROVIDERS"],
 }
 
 
@@ -56,6 +57,19 @@ def check_llm_provider():
     else:
         logger.info(f"LLM 供应商 {llm_provider} 的配置项已设置。")
 
+    if llm_provider == "router":
+        # 路由的每个后端也需要完整的供应商配置
+        for spec in os.getenv("LLM_ROUTER_PROVIDERS", "").split(","):
+            provider = spec.strip().partition(":")[0]
+            if not provider:
+                continue
+            if provider not in LLM_REQUIRED_KEYS or provider == "router":
+                logger.error(f"LLM_ROUTER_PROVIDERS 包含不支持的供应商: {provider}")
+                continue
+            missing_keys = [key for key in LLM_REQUIRED_KEYS[provider] if not os.getenv(key)]
+            if missing_keys:
+                logger.error(f"路由后端 {provider} 缺少必要的环境变量: {', '.join(missing_keys)}")
+
 def check_llm_connectivity():
     client = Factory().getClient()
     logger.info(f"正在检查 LLM 供应商的连接...")
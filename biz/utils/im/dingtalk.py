@@ -53,7 +53,7 @@ class DingTalkNotifier:
     def send_message(self, content: str, msg_type='text', title='通知', is_at_all=False, project_name=None, url_slug = None):
         if not self.enabled:
             logger.info("钉钉推送未启用")
-            return
+            return True
 
         try:
             post_url = self._get_webhook_url(project_name=project_name, url_slug=url_slug)
@@ -86,7 +86,8 @@ class DingTalkNotifier:
             response_data = response.json()
             if response_data.get('errmsg') == 'ok':
                 logger.info(f"钉钉消息发送成功! webhook_url:{post_url}")
-            else:
-                logger.error(f"钉钉消息发送失败! webhook_url:{post_url},errmsg:{response_data.get('errmsg')}")
+                return True
+            logger.error(f"钉钉消息发送失败! webhook_url:{post_url},errmsg:{response_data.get('errmsg')}")
         except Exception as e:
             logger.error(f"钉钉消息发送失败! ", e)
+        return False
@@ -56,7 +56,7 @@ class FeishuNotifier:
         """
         if not self.enabled:
             logger.info("飞书推送未启用")
-            return
+            return True
 
         try:
             post_url = self._get_webhook_url(project_name=project_name, url_slug=url_slug)
@@ -116,13 +116,15 @@ class FeishuNotifier:
 
             if response.status_code != 200:
                 logger.error(f"飞书消息发送失败! webhook_url:{post_url}, error_msg:{response.text}")
-                return
+                return False
 
             result = response.json()
             if result.get('msg') != "success":
                 logger.error(f"发送飞书消息失败! webhook_url:{post_url},errmsg:{result}")
             else:
                 logger.info(f"飞书消息发送成功! webhook_url:{post_url}")
+                return True
 
         except Exception as e:
             logger.error(f"飞书消息发送失败! ", e)
+        return False
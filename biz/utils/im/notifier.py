@@ -4,8 +4,12 @@ from biz.utils.im.webhook import ExtraWebhookNotifier
 from biz.utils.im.wecom import WeComNotifier
 
 
+# 通知渠道名称，用于指定或重试部分渠道
+NOTIFY_CHANNELS = ['dingtalk', 'wecom', 'feishu', 'extra_webhook']
+
+
 def send_notification(content, msg_type='text', title="通知", is_at_all=False, project_name=None, url_slug=None,
-                      webhook_data: dict={}):
+                      webhook_data: dict={}, channels: list = None) -> list:
     """
     发送通知消息到配置的平台(钉钉和企业微信)
     :param content: 消息内容
@@ -14,30 +18,44 @@ def send_notification(content, msg_type='text', title="通知", is_at_all=False,
     :param is_at_all: 是否@所有人
     :param url_slug: 由gitlab服务器的url地址(如:http://www.gitlab.com)转换成的slug格式，如: www_gitlab_com
     :param webhook_data: push event、merge event的数据内容
+    :param channels: 只发送到指定的渠道（NOTIFY_CHANNELS中的名称），为空时发送到全部渠道
+    :return: 发送失败的渠道列表
     """
+    failed = []
+
     # 钉钉推送
-    dingtalk_notifier = DingTalkNotifier()
-    dingtalk_notifier.send_message(content=content, msg_type=msg_type, title=title, is_at_all=is_at_all,
-                                   project_name=project_name, url_slug=url_slug)
+    if channels is None or 'dingtalk' in channels:
+        dingtalk_notifier = DingTalkNotifier()
+        if not dingtalk_notifier.send_message(content=content, msg_type=msg_type, title=title, is_at_all=is_at_all,
+                                              project_name=project_name, url_slug=url_slug):
+            failed.append('dingtalk')
 
     # 企业微信推送
-    wecom_notifier = WeComNotifier()
-    wecom_notifier.send_message(content=content, msg_type=msg_type, title=title, is_at_all=is_at_all,
-                                project_name=project_name, url_slug=url_slug)
+    if channels is None or 'wecom' in channels:
+        wecom_notifier = WeComNotifier()
+        if not wecom_notifier.send_message(content=content, msg_type=msg_type, title=title, is_at_all=is_at_all,
+                                           project_name=project_name, url_slug=url_slug):
+            failed.append('wecom')
 
     # 飞书推送
-    feishu_notifier = FeishuNotifier()
-    feishu_notifier.send_message(content=content, msg_type=msg_type, title=title, is_at_all=is_at_all,
-                                 project_name=project_name, url_slug=url_slug)
+    if channels is None or 'feishu' in channels:
+        feishu_notifier = FeishuNotifier()
+        if not feishu_notifier.send_message(content=content, msg_type=msg_type, title=title, is_at_all=is_at_all,
+                                            project_name=project_name, url_slug=url_slug):
+            failed.append('feishu')
 
     # 额外自定义webhook通知
-    extra_webhook_notifier = ExtraWebhookNotifier()
-    system_data = {
-        "content": content,
-        "msg_type": msg_type,
-        "title": title,
-        "is_at_all": is_at_all,
-        "project_name": project_name,
-        "url_slug": url_slug
-    }
-    extra_webhook_notifier.send_message(system_data=system_data, webhook_data=webhook_data)
\ No newline at end of file
+    if channels is None or 'extra_webhook' in channels:
+        extra_webhook_notifier = ExtraWebhookNotifier()
+        system_data = {
+            "content": content,
+            "msg_type": msg_type,
+            "title": title,
+            "is_at_all": is_at_all,
+            "project_name": project_name,
+            "url_slug": url_slug
+        }
+        if not extra_webhook_notifier.send_message(system_data=system_data, webhook_data=webhook_data):
+            failed.append('extra_webhook')
+
+    return failed
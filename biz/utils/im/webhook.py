@@ -20,7 +20,7 @@ class ExtraWebhookNotifier:
         """
         if not self.enabled:
             logger.info("ExtraWebhook推送未启用")
-            return
+            return True
 
         try:
             data = {
@@ -35,7 +35,9 @@ class ExtraWebhookNotifier:
 
             if response.status_code != 200:
                 logger.error(f"ExtraWebhook消息发送失败! webhook_url:{self.default_webhook_url}, error_msg:{response.text}")
-                return
+                return False
+            return True
 
         except Exception as e:
-            logger.error(f"ExtraWebhook消息发送失败! ", e)
\ No newline at end of file
+            logger.error(f"ExtraWebhook消息发送失败! ", e)
+        return False
\ No newline at end of file
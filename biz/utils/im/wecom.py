@@ -79,7 +79,7 @@ class WeComNotifier:
         """
         if not self.enabled:
             logger.info("企业微信推送未启用")
-            return
+            return True
 
         try:
             post_url = self._get_webhook_url(project_name=project_name, url_slug=url_slug)
@@ -96,24 +96,27 @@ class WeComNotifier:
             if content_length <= MAX_CONTENT_BYTES:
                 # 内容长度在限制范围内，直接发送
                 data = self._build_message(content, title, msg_type, is_at_all)
-                self._send_message(post_url, data)
+                return self._send_message(post_url, data)
             else:
                 # 内容超过限制，需要分割发送
                 logger.warning(f"消息内容超过{MAX_CONTENT_BYTES}字节限制，将分割发送。总长度: {content_length}字节")
-                self._send_message_in_chunks(content, title, post_url, msg_type, is_at_all, MAX_CONTENT_BYTES)
+                return self._send_message_in_chunks(content, title, post_url, msg_type, is_at_all, MAX_CONTENT_BYTES)
 
         except Exception as e:
             logger.error(f"企业微信消息发送失败! {e}")
+        return False
 
     def _send_message_in_chunks(self, content, title, post_url, msg_type, is_at_all, max_bytes):
         """
         将内容分割成多个部分并分别发送
         """
         chunks = self._split_content(content, max_bytes)
+        success = True
         for i, chunk in enumerate(chunks):
             chunk_title = f"{title} (第{i + 1}/{len(chunks)}部分)" if title else f"消息 (第{i + 1}/{len(chunks)}部分)"
             data = self._build_message(chunk, chunk_title, msg_type, is_at_all)
-            self._send_message(post_url, data, chunk_num=i + 1, total_chunks=len(chunks))
+            success = self._send_message(post_url, data, chunk_num=i + 1, total_chunks=len(chunks)) and success
+        return success
 
     def _split_content(self, content, max_bytes):
         """
@@ -149,13 +152,15 @@ class WeComNotifier:
                 f"发送企业微信消息{'分块' if chunk_num else ''} {chunk_num}/{total_chunks if chunk_num else ''}: url={post_url}, data={data}")
             response = self._send_request(post_url, data)
 
-            if response and response.get('errcode') != 0:
+            if not response or response.get('errcode') != 0:
                 logger.error(f"企业微信消息发送失败! webhook_url:{post_url}, errmsg:{response}")
-            else:
-                logger.info(f"企业微信消息{'分块' if chunk_num else ''}发送成功! webhook_url:{post_url}")
+                return False
+            logger.info(f"企业微信消息{'分块' if chunk_num else ''}发送成功! webhook_url:{post_url}")
+            return True
 
         except Exception as e:
             logger.error(f"企业微信消息{'分块' if chunk_num else ''}发送失败! {e}")
+        return False
 
     def _send_request(self, url, data):
         """ 发送请求并返回 JSON 响应 """
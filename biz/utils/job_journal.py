@@ -0,0 +1,211 @@
+"""
+本地任务日志（async / pool 队列驱动）
+
+QUEUE_DRIVER=async/pool 时任务只存在于内存或 fork 出的进程中，容器重启后未完成的任务会丢失。
+开启 QUEUE_JOURNAL_ENABLED=1 后，任务入队前先写入 data/queue.db：
+- pending：等待执行（available_at 之后可执行）；
+- scheduled：async驱动的延迟任务，available_at 到期后由 API 进程的调度线程认领并投递
+  （不论是否开启 QUEUE_JOURNAL_ENABLED，见 biz/utils/queue.py）；
+- running：执行中，attempts 为已开始执行的次数；
+- done：执行完成（ack）；
+- dead：超过 QUEUE_JOURNAL_MAX_ATTEMPTS 次仍未完成，不再重试。
+任务执行失败时按退避时间重新变为 pending；进程崩溃时任务停留在 running，
+api.py 启动时将所有 pending/running 的任务重新投递，保证至少执行一次。
+"""
+import importlib
+import json
+import os
+import sqlite3
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from biz.utils.db import get_connection
+from biz.utils.log import logger
+
+QUEUE_JOURNAL_ENABLED = os.getenv('QUEUE_JOURNAL_ENABLED', '0') == '1'
+QUEUE_JOURNAL_MAX_ATTEMPTS = int(os.getenv('QUEUE_JOURNAL_MAX_ATTEMPTS', 3))
+QUEUE_JOURNAL_RETRY_DELAY = float(os.getenv('QUEUE_JOURNAL_RETRY_DELAY', 30))
+QUEUE_JOURNAL_RETENTION_DAYS = int(os.getenv('QUEUE_JOURNAL_RETENTION_DAYS', 7))
+
+STATE_PENDING = 'pending'
+STATE_SCHEDULED = 'scheduled'
+STATE_RUNNING = 'running'
+STATE_DONE = 'done'
+STATE_DEAD = 'dead'
+
+
+def get_project_root():
+    """获取项目根目录的绝对路径"""
+    if 'PROJECT_ROOT' in os.environ:
+        return Path(os.environ['PROJECT_ROOT'])
+    current_file = Path(__file__).resolve()
+    return current_file.parent.parent.parent
+
+
+def function_path(function: callable) -> str:
+    return f'{function.__module__}:{function.__qualname__}'
+
+
+def resolve_function(path: str) -> callable:
+    module_name, _, qualname = path.partition(':')
+    target = importlib.import_module(module_name)
+    for name in qualname.split('.'):
+        target = getattr(target, name)
+    return target
+
+
+class JobJournal:
+    DB_TIMEOUT = 30.0
+
+    def __init__(self, db_file: str, max_attempts: int = QUEUE_JOURNAL_MAX_ATTEMPTS,
+                 retry_delay: float = QUEUE_JOURNAL_RETRY_DELAY):
+        self.db_file = db_file
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self._initialized_pid = None
+
+    def get_db_connection(self):
+        conn = get_connection(self.db_file, self.DB_TIMEOUT)
+        conn.row_factory = sqlite3.Row
+        if self._initialized_pid != os.getpid():
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS queue_jobs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    function TEXT NOT NULL,
+                    args TEXT NOT NULL,
+                    kwargs TEXT NOT NULL,
+                    lane TEXT,
+                    project TEXT,
+                    state TEXT NOT NULL,
+                    attempts INTEGER DEFAULT 0,
+                    last_error TEXT,
+                    available_at REAL NOT NULL,
+                    created_at INTEGER NOT NULL,
+                    updated_at INTEGER NOT NULL
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_queue_jobs_state ON queue_jobs (state, id);')
+            conn.commit()
+            # 任务参数中包含SCM访问令牌，限制文件只有当前用户可读写
+            try:
+                os.chmod(self.db_file, 0o600)
+            except OSError:
+                pass
+            self._initialized_pid = os.getpid()
+        return conn
+
+    def _execute(self, sql: str, params: tuple = ()) -> sqlite3.Cursor:
+        conn = self.get_db_connection()
+        try:
+            cursor = conn.execute(sql, params)
+            conn.commit()
+            return cursor
+        finally:
+            conn.close()
+
+    def add(self, function: callable, args: tuple, kwargs: dict, lane: str = None, project: str = '',
+            delay: float = 0, scheduled: bool = False) -> int:
+        """:param scheduled: 是否由调度线程到期后投递（claim_due），否则由调用方自行投递"""
+        now = time.time()
+        cursor = self._execute('''
+            INSERT INTO queue_jobs (function, args, kwargs, lane, project, state, attempts, available_at,
+                                    created_at, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, 0, ?, ?, ?)
+        ''', (function_path(function), json.dumps(list(args), ensure_ascii=False),
+              json.dumps(kwargs, ensure_ascii=False), lane, project, STATE_SCHEDULED if scheduled else STATE_PENDING,
+              now + delay, int(now), int(now)))
+        return cursor.lastrowid
+
+    def discard(self, job_id: int):
+        """任务未能投递（如队列已满，webhook返回429由平台重试）时删除记录"""
+        self._execute('DELETE FROM queue_jobs WHERE id = ?', (job_id,))
+
+    def start(self, job_id: int):
+        self._execute('UPDATE queue_jobs SET state = ?, attempts = attempts + 1, updated_at = ? WHERE id = ?',
+                      (STATE_RUNNING, int(time.time()), job_id))
+
+    def ack(self, job_id: int):
+        self._execute('UPDATE queue_jobs SET state = ?, updated_at = ? WHERE id = ?',
+                      (STATE_DONE, int(time.time()), job_id))
+
+    def fail(self, job_id: int, error: str, scheduled: bool = False) -> Optional[float]:
+        """
+        记录一次执行失败
+        :param scheduled: 重试是否由调度线程到期后投递（claim_due），否则由调用方按返回的等待时间投递
+        :return: 可以重试时返回重试前的等待秒数，重试次数用尽（进入dead状态）时返回None
+        """
+        conn = self.get_db_connection()
+        try:
+            row = conn.execute('SELECT attempts FROM queue_jobs WHERE id = ?', (job_id,)).fetchone()
+            attempts = row['attempts'] if row else self.max_attempts
+            now = time.time()
+            if attempts >= self.max_attempts:
+                conn.execute('UPDATE queue_jobs SET state = ?, last_error = ?, updated_at = ? WHERE id = ?',
+                             (STATE_DEAD, error, int(now), job_id))
+                conn.commit()
+                return None
+            delay = self.retry_delay * (2 ** (attempts - 1))
+            conn.execute('''
+                UPDATE queue_jobs SET state = ?, last_error = ?, available_at = ?, updated_at = ? WHERE id = ?
+            ''', (STATE_SCHEDULED if scheduled else STATE_PENDING, error, now + delay, int(now), job_id))
+            conn.commit()
+            return delay
+        finally:
+            conn.close()
+
+    def defer(self, job_id: int):
+        """改为由调度线程在available_at到期后投递"""
+        self._execute('UPDATE queue_jobs SET state = ?, updated_at = ? WHERE id = ? AND state = ?',
+                      (STATE_SCHEDULED, int(time.time()), job_id, STATE_PENDING))
+
+    def claim_due(self, limit: int = 100) -> List[sqlite3.Row]:
+        """
+        认领已到期的scheduled任务（改为pending），多个进程同时认领时每个任务只会被一个进程取得
+        :return: 认领成功的任务，由调用方投递执行
+        """
+        if not os.path.exists(self.db_file):
+            return []
+        conn = self.get_db_connection()
+        try:
+            rows = conn.execute('''
+                SELECT * FROM queue_jobs WHERE state = ? AND available_at <= ? ORDER BY available_at LIMIT ?
+            ''', (STATE_SCHEDULED, time.time(), limit)).fetchall()
+            claimed = []
+            for row in rows:
+                cursor = conn.execute('UPDATE queue_jobs SET state = ?, updated_at = ? WHERE id = ? AND state = ?',
+                                      (STATE_PENDING, int(time.time()), row['id'], STATE_SCHEDULED))
+                if cursor.rowcount == 1:
+                    claimed.append(row)
+            conn.commit()
+            return claimed
+        finally:
+            conn.close()
+
+    def mark_dead(self, job_id: int, error: str):
+        self._execute('UPDATE queue_jobs SET state = ?, last_error = ?, updated_at = ? WHERE id = ?',
+                      (STATE_DEAD, error, int(time.time()), job_id))
+
+    def unfinished(self) -> List[sqlite3.Row]:
+        conn = self.get_db_connection()
+        try:
+            return conn.execute('SELECT * FROM queue_jobs WHERE state IN (?, ?) ORDER BY id',
+                                (STATE_PENDING, STATE_RUNNING)).fetchall()
+        finally:
+            conn.close()
+
+    def purge(self, retention_days: int = QUEUE_JOURNAL_RETENTION_DAYS):
+        """删除保留期之前已完成的任务，dead任务保留以便排查"""
+        self._execute('DELETE FROM queue_jobs WHERE state = ? AND updated_at < ?',
+                      (STATE_DONE, int(time.time()) - retention_days * 86400))
+
+    def stats(self) -> Dict[str, int]:
+        conn = self.get_db_connection()
+        try:
+            rows = conn.execute('SELECT state, COUNT(*) AS count FROM queue_jobs GROUP BY state').fetchall()
+            return {row['state']: row['count'] for row in rows}
+        finally:
+            conn.close()
+
+
+job_journal = JobJournal(str(get_project_root() / 'data' / 'queue.db'))
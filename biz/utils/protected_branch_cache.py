@@ -0,0 +1,176 @@
+"""
+受保护分支列表缓存
+
+MERGE_REVIEW_ONLY_PROTECTED_BRANCHES_ENABLED=1 时，每个 MR/PR 事件都需要判断目标分支是否受保护。
+受保护分支列表很少变化，这里按 (scm url, project id) 缓存编译好的 fnmatch 规则：
+- 进程内使用 LRU + TTL 缓存；
+- QUEUE_DRIVER=rq 时额外以 Redis 作为二级缓存，在多个 worker 进程之间共享。
+
+webhook 接入时按目标分支是否受保护选择优先级通道（见 biz/intake.py 的 mr_lane）：接入只读缓存（peek），
+未命中时通过 prefetch 在后台线程拉取并写入缓存，不阻塞webhook响应，该项目之后的MR/PR即可进入受保护分支通道。
+"""
+import fnmatch
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional
+
+from biz.utils.log import logger
+from biz.utils.queue import queue_driver, get_redis_connection
+
+PROTECTED_BRANCH_CACHE_TTL = int(os.getenv('PROTECTED_BRANCH_CACHE_TTL', 300))
+PROTECTED_BRANCH_CACHE_SIZE = int(os.getenv('PROTECTED_BRANCH_CACHE_SIZE', 1024))
+# webhook接入时后台拉取受保护分支的线程数，以及同时拉取的项目数上限（超出时放弃本次拉取）
+PROTECTED_BRANCH_PREFETCH_WORKERS = int(os.getenv('PROTECTED_BRANCH_PREFETCH_WORKERS', 2))
+PROTECTED_BRANCH_PREFETCH_MAX_PENDING = int(os.getenv('PROTECTED_BRANCH_PREFETCH_MAX_PENDING', 100))
+
+
+class ProtectedBranchCache:
+    def __init__(self, max_size: int = PROTECTED_BRANCH_CACHE_SIZE, ttl: int = PROTECTED_BRANCH_CACHE_TTL,
+                 use_redis: bool = False, prefetch_workers: int = PROTECTED_BRANCH_PREFETCH_WORKERS,
+                 prefetch_max_pending: int = PROTECTED_BRANCH_PREFETCH_MAX_PENDING):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.use_redis = use_redis
+        self.prefetch_workers = prefetch_workers
+        self.prefetch_max_pending = prefetch_max_pending
+        self._prefetching = set()
+        self._executor = None
+        # key -> (过期时间, 编译后的规则列表)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def cache_key(scm_url: str, project_id) -> str:
+        return f'review:protected_branches:{scm_url.rstrip("/")}:{project_id}'
+
+    @staticmethod
+    def compile_patterns(names: List[str]) -> List[re.Pattern]:
+        return [re.compile(fnmatch.translate(name)) for name in names if name]
+
+    def _get_local(self, key: str) -> Optional[List[re.Pattern]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, patterns = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return patterns
+
+    def _set_local(self, key: str, patterns: List[re.Pattern]):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, patterns)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def _get_redis(self, key: str) -> Optional[List[str]]:
+        if not self.use_redis:
+            return None
+        try:
+            value = get_redis_connection().get(key)
+            return json.loads(value) if value else None
+        except Exception as e:
+            logger.warn(f'Failed to read protected branches from redis: {e}')
+            return None
+
+    def _set_redis(self, key: str, names: List[str]):
+        if not self.use_redis:
+            return
+        try:
+            get_redis_connection().set(key, json.dumps(names), ex=self.ttl)
+        except Exception as e:
+            logger.warn(f'Failed to write protected branches to redis: {e}')
+
+    def get_patterns(self, scm_url: str, project_id,
+                     loader: Callable[[], Optional[List[str]]]) -> Optional[List[re.Pattern]]:
+        """
+        获取受保护分支规则，未命中缓存时调用loader从平台拉取
+        :param loader: 返回受保护分支名称（支持通配符）列表，拉取失败返回None（失败结果不缓存）
+        """
+        key = self.cache_key(scm_url, project_id)
+        patterns = self._get_local(key)
+        if patterns is not None:
+            self.hits += 1
+            return patterns
+
+        names = self._get_redis(key)
+        if names is not None:
+            self.redis_hits += 1
+        else:
+            self.misses += 1
+            names = loader()
+            if names is None:
+                return None
+            self._set_redis(key, names)
+
+        patterns = self.compile_patterns(names)
+        self._set_local(key, patterns)
+        return patterns
+
+    def is_protected(self, scm_url: str, project_id, branch: str,
+                     loader: Callable[[], Optional[List[str]]]) -> bool:
+        patterns = self.get_patterns(scm_url, project_id, loader)
+        if not patterns or not branch:
+            return False
+        return any(pattern.match(branch) for pattern in patterns)
+
+    def peek(self, scm_url: str, project_id, branch: str) -> Optional[bool]:
+        """只读缓存判断分支是否受保护，不请求SCM平台；缓存中没有该项目时返回None"""
+        key = self.cache_key(scm_url, project_id)
+        patterns = self._get_local(key)
+        if patterns is None:
+            names = self._get_redis(key)
+            if names is None:
+                return None
+            patterns = self.compile_patterns(names)
+            self._set_local(key, patterns)
+        return bool(branch) and any(pattern.match(branch) for pattern in patterns)
+
+    def prefetch(self, scm_url: str, project_id, loader: Callable[[], Optional[List[str]]]) -> bool:
+        """
+        在后台线程拉取受保护分支列表并写入缓存，不阻塞调用方
+        同一项目同时只拉取一次，正在拉取的项目数达到上限时放弃
+        :return: 是否提交了拉取任务
+        """
+        key = self.cache_key(scm_url, project_id)
+        with self._lock:
+            if key in self._prefetching or len(self._prefetching) >= self.prefetch_max_pending:
+                return False
+            self._prefetching.add(key)
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.prefetch_workers,
+                                                    thread_name_prefix='protected-branches')
+
+        def run():
+            try:
+                self.get_patterns(scm_url, project_id, loader)
+            except Exception as e:
+                logger.warn(f'Failed to prefetch protected branches for {key}: {e}')
+            finally:
+                with self._lock:
+                    self._prefetching.discard(key)
+
+        self._executor.submit(run)
+        return True
+
+    def stats(self) -> dict:
+        with self._lock:
+            size = len(self._entries)
+        lookups = self.hits + self.redis_hits + self.misses
+        hit_rate = round((self.hits + self.redis_hits) / lookups, 4) if lookups else 0.0
+        return {'size': size, 'hits': self.hits, 'redis_hits': self.redis_hits, 'misses': self.misses,
+                'hit_rate': hit_rate}
+
+
+protected_branch_cache = ProtectedBranchCache(use_redis=queue_driver == 'rq')
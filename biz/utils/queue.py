@@ -1,25 +1,620 @@
+import heapq
+import itertools
+import json
 import os
+import queue as queue_lib
+import threading
+import time
+from collections import OrderedDict, deque
+from datetime import timedelta, timezone
 from multiprocessing import Process
+from typing import Dict, Iterable, List
 
 from redis import Redis
 from rq import Queue
 
+from biz.utils.job_journal import job_journal, resolve_function, QUEUE_JOURNAL_ENABLED, STATE_PENDING, STATE_RUNNING
 from biz.utils.log import logger
 
 queue_driver = os.getenv('QUEUE_DRIVER', 'async')
+# async驱动下API进程检查到期延迟任务的间隔（秒）
+QUEUE_SCHEDULE_INTERVAL = float(os.getenv('QUEUE_SCHEDULE_INTERVAL', 5))
+
+# 优先级通道：目标为受保护分支的MR/PR、其他MR/PR、Push、SVN提交，按优先级从高到低排列
+LANE_MR_PROTECTED = 'mr_protected'
+LANE_MR = 'mr'
+LANE_PUSH = 'push'
+LANE_SVN = 'svn'
+LANES = [LANE_MR_PROTECTED, LANE_MR, LANE_PUSH, LANE_SVN]
+
+
+def parse_lane_weights(value: str) -> Dict[str, int]:
+    """解析 QUEUE_LANE_WEIGHTS，格式为 lane:weight,lane:weight，未配置的通道权重为1"""
+    weights = {lane: 1 for lane in LANES}
+    for item in value.split(','):
+        lane, _, weight = item.strip().partition(':')
+        if lane in weights and weight.strip().isdigit():
+            weights[lane] = max(1, int(weight))
+    return weights
+
+
+LANE_WEIGHTS = parse_lane_weights(os.getenv('QUEUE_LANE_WEIGHTS', 'mr_protected:8,mr:4,push:2,svn:1'))
+# rq按通道拆分队列（{url_slug}_{lane}），需要worker监听所有通道队列，默认关闭以兼容已有的WORKER_QUEUE配置
+QUEUE_LANES_ENABLED = os.getenv('QUEUE_LANES_ENABLED', '0') == '1'
+
+
+def default_lane(function: callable) -> str:
+    """按任务函数推断通道，MR/PR是否以受保护分支为目标由调用方显式指定"""
+    name = getattr(function, '__name__', '')
+    if 'merge_request' in name or 'pull_request' in name:
+        return LANE_MR
+    if 'svn' in name:
+        return LANE_SVN
+    return LANE_PUSH
+
+
+# 同一通道内各项目每轮最多连续出队的任务数，以及单个项目同时执行的任务数上限（0表示不限制）
+QUEUE_PROJECT_QUANTUM = int(os.getenv('QUEUE_PROJECT_QUANTUM', 1))
+QUEUE_PROJECT_MAX_CONCURRENCY = int(os.getenv('QUEUE_PROJECT_MAX_CONCURRENCY', 0))
+
+
+def project_key(data: dict) -> str:
+    """从webhook数据中取出项目标识，用于项目间的公平调度和统计"""
+    if not isinstance(data, dict):
+        return ''
+    project = data.get('project') or {}
+    repository = data.get('repository') or {}
+    return str(project.get('path_with_namespace') or project.get('id') or repository.get('full_name')
+               or data.get('repository_url') or '')
+
+
+def lane_queue_names(url_slug: str) -> List[str]:
+    """rq worker需要按优先级顺序监听的队列名"""
+    if not QUEUE_LANES_ENABLED:
+        return [url_slug]
+    return [f'{url_slug}_{lane}' for lane in LANES]
 
 if queue_driver == 'rq':
     queues = {}
 
+_redis_connection = None
+
+
+def get_redis_connection() -> Redis:
+    """获取进程内共享的Redis连接（连接参数来自REDIS_HOST、REDIS_PORT）"""
+    global _redis_connection
+    if _redis_connection is None:
+        logger.info(f'REDIS_HOST: {os.getenv("REDIS_HOST", "127.0.0.1")}，REDIS_PORT: {os.getenv("REDIS_PORT", 6379)}')
+        _redis_connection = Redis(os.getenv('REDIS_HOST', '127.0.0.1'), os.getenv('REDIS_PORT', 6379))
+    return _redis_connection
+
+
+class QueueFullError(Exception):
+    """任务队列已满，调用方应拒绝本次请求（背压）"""
+    pass
+
+
+class SmoothWeightedRoundRobin:
+    """
+    平滑加权轮询：所有通道都有积压时按权重比例出队，且同一通道不会连续占满
+    空闲通道累积的额度有上限，恢复后不会长时间独占
+    """
+
+    def __init__(self, weights: Dict[str, int]):
+        self.weights = dict(weights)
+        self.total = sum(self.weights.values())
+        self._current = {lane: 0 for lane in self.weights}
+        self._priority = {lane: index for index, lane in enumerate(self.weights)}
+
+    def order(self, lanes: Iterable[str] = None) -> List[str]:
+        """按下一次出队的优先顺序排列通道"""
+        lanes = self.weights if lanes is None else lanes
+        return sorted(lanes, key=lambda lane: (-(self._current[lane] + self.weights[lane]), self._priority[lane]))
+
+    def record(self, lane: str, active: Iterable[str] = None):
+        """记录一次从lane出队，active为当前有积压的通道（为空时视为全部通道）"""
+        active = list(self.weights if active is None else active)
+        if lane not in active:
+            active.append(lane)
+        total = sum(self.weights[name] for name in active)
+        for name in active:
+            self._current[name] += self.weights[name]
+        self._current[lane] -= total
+        for name in self._current:
+            self._current[name] = max(-self.total, min(self.total, self._current[name]))
+
+
+class ProjectStats:
+    """按项目统计入队、开始、完成数，等待和执行耗时，以及最近一小时的完成数（吞吐量）"""
+
+    def __init__(self):
+        self.enqueued = 0
+        self.started = 0
+        self.completed = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.run_total = 0.0
+        self._finished_at = deque()
+
+    def record_finished(self, run_time: float):
+        now = time.monotonic()
+        self.completed += 1
+        self.run_total += run_time
+        self._finished_at.append(now)
+        while self._finished_at and self._finished_at[0] < now - 3600:
+            self._finished_at.popleft()
+
+    def snapshot(self, running: int, depth: int) -> dict:
+        now = time.monotonic()
+        return {
+            'depth': depth,
+            'running': running,
+            'enqueued': self.enqueued,
+            'started': self.started,
+            'completed': self.completed,
+            'avg_wait': round(self.wait_total / self.started, 3) if self.started else 0.0,
+            'max_wait': round(self.wait_max, 3),
+            'avg_run': round(self.run_total / self.completed, 3) if self.completed else 0.0,
+            'completed_last_hour': sum(1 for finished_at in self._finished_at if finished_at >= now - 3600),
+        }
+
+
+class LaneQueue:
+    """
+    多通道有界队列
+    - 通道之间按平滑加权轮询出队；
+    - 通道内按项目做差额轮询（DRR），每个项目每轮最多连续出队quantum个任务，单个项目的大量任务不会挤占其他项目；
+    - 项目正在执行的任务数达到project_max_concurrency时暂不出队该项目的任务（0表示不限制）。
+    出队的任务执行结束后需要调用done(project)。
+    """
+
+    def __init__(self, max_size: int, weights: Dict[str, int] = None, quantum: int = 1,
+                 project_max_concurrency: int = 0):
+        self.max_size = max_size
+        self.quantum = max(1, quantum)
+        self.project_max_concurrency = project_max_concurrency
+        self._scheduler = SmoothWeightedRoundRobin(weights or LANE_WEIGHTS)
+        # lane -> 项目轮转顺序（project -> 任务队列）
+        self._lanes = {lane: OrderedDict() for lane in self._scheduler.weights}
+        self._deficits = {lane: {} for lane in self._lanes}
+        self._running = {}
+        self._projects = {}
+        self._size = 0
+        self._condition = threading.Condition()
+        self._stats = {lane: {'enqueued': 0, 'dequeued': 0, 'wait_total': 0.0, 'wait_max': 0.0}
+                       for lane in self._lanes}
+
+    def put_nowait(self, lane: str, item, project: str = ''):
+        with self._condition:
+            if self._size >= self.max_size:
+                raise queue_lib.Full
+            self._lanes[lane].setdefault(project, deque()).append((time.monotonic(), item))
+            self._size += 1
+            self._stats[lane]['enqueued'] += 1
+            self._projects.setdefault(project, ProjectStats()).enqueued += 1
+            self._condition.notify()
+
+    def _capped(self, project: str) -> bool:
+        return 0 < self.project_max_concurrency <= self._running.get(project, 0)
+
+    def _ready_lanes(self) -> List[str]:
+        return [lane for lane, projects in self._lanes.items()
+                if any(not self._capped(project) for project in projects)]
+
+    def _pop_project(self, lane: str):
+        """在通道内按DRR选出下一个项目并取出它最早的任务"""
+        projects = self._lanes[lane]
+        deficits = self._deficits[lane]
+        for _ in range(len(projects)):
+            project, items = next(iter(projects.items()))
+            if self._capped(project):
+                projects.move_to_end(project)
+                continue
+            if deficits.get(project, 0) < 1:
+                deficits[project] = deficits.get(project, 0) + self.quantum
+            entry = items.popleft()
+            deficits[project] -= 1
+            if not items:
+                del projects[project]
+                deficits.pop(project, None)
+            elif deficits[project] < 1:
+                projects.move_to_end(project)
+            return project, entry
+        raise RuntimeError(f'No ready project in lane {lane}')
+
+    def get(self):
+        with self._condition:
+            while not self._ready_lanes():
+                self._condition.wait()
+            ready = self._ready_lanes()
+            lane = self._scheduler.order(ready)[0]
+            self._scheduler.record(lane, ready)
+            project, (enqueued_at, item) = self._pop_project(lane)
+            self._size -= 1
+            self._running[project] = self._running.get(project, 0) + 1
+
+            wait = time.monotonic() - enqueued_at
+            stats = self._stats[lane]
+            stats['dequeued'] += 1
+            stats['wait_total'] += wait
+            stats['wait_max'] = max(stats['wait_max'], wait)
+            project_stats = self._projects.setdefault(project, ProjectStats())
+            project_stats.started += 1
+            project_stats.wait_total += wait
+            project_stats.wait_max = max(project_stats.wait_max, wait)
+            return item
+
+    def done(self, project: str = '', run_time: float = 0.0):
+        """标记项目的一个任务执行结束，释放并发名额"""
+        with self._condition:
+            self._running[project] = max(0, self._running.get(project, 0) - 1)
+            self._projects.setdefault(project, ProjectStats()).record_finished(run_time)
+            self._condition.notify_all()
+
+    def qsize(self) -> int:
+        return self._size
+
+    def stats(self) -> Dict[str, dict]:
+        now = time.monotonic()
+        with self._condition:
+            result = {}
+            for lane, projects in self._lanes.items():
+                stats = self._stats[lane]
+                oldest = [items[0][0] for items in projects.values()]
+                result[lane] = {
+                    'weight': self._scheduler.weights[lane],
+                    'depth': sum(len(items) for items in projects.values()),
+                    'enqueued': stats['enqueued'],
+                    'dequeued': stats['dequeued'],
+                    'avg_wait': round(stats['wait_total'] / stats['dequeued'], 3) if stats['dequeued'] else 0.0,
+                    'max_wait': round(stats['wait_max'], 3),
+                    'oldest_wait': round(now - min(oldest), 3) if oldest else 0.0,
+                }
+            return result
+
+    def project_stats(self) -> Dict[str, dict]:
+        with self._condition:
+            depths = {}
+            for projects in self._lanes.values():
+                for project, items in projects.items():
+                    depths[project] = depths.get(project, 0) + len(items)
+            return {project: stats.snapshot(self._running.get(project, 0), depths.get(project, 0))
+                    for project, stats in self._projects.items()}
+
+
+class WorkerPool:
+    """
+    固定大小的常驻工作线程池 + 有界准入队列
+    工作线程在进程内复用，避免每个webhook都fork新进程、重复导入依赖
+    """
+
+    def __init__(self, workers: int, max_size: int):
+        self.workers = workers
+        self.max_size = max_size
+        self._jobs = LaneQueue(max_size=max_size, quantum=QUEUE_PROJECT_QUANTUM,
+                               project_max_concurrency=QUEUE_PROJECT_MAX_CONCURRENCY)
+        self._threads = []
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self._threads:
+                return
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._run, name=f'review-worker-{i}', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+            logger.info(f'Worker pool started, workers: {self.workers}, max queue size: {self.max_size}')
+
+    def submit(self, function: callable, *args, **kwargs):
+        self.submit_job(function, args, kwargs)
+
+    def submit_job(self, function: callable, args: tuple, kwargs: dict, lane: str = None, project: str = ''):
+        self.start()
+        try:
+            self._jobs.put_nowait(lane or default_lane(function), (project, function, args, kwargs), project)
+        except queue_lib.Full:
+            raise QueueFullError(f'Review queue is full (max size: {self.max_size}), please retry later.')
 
-def handle_queue(function: callable, data: any, token: str, url: str, url_slug: str):
+    def qsize(self) -> int:
+        return self._jobs.qsize()
+
+    def stats(self) -> Dict[str, dict]:
+        return self._jobs.stats()
+
+    def project_stats(self) -> Dict[str, dict]:
+        return self._jobs.project_stats()
+
+    def _run(self):
+        while True:
+            project, function, args, kwargs = self._jobs.get()
+            start = time.monotonic()
+            try:
+                function(*args, **kwargs)
+            except Exception as e:
+                logger.error(f'Worker pool job {getattr(function, "__name__", function)} failed: {e}')
+            finally:
+                self._jobs.done(project, time.monotonic() - start)
+
+
+class DelayedScheduler:
+    """
+    进程内延迟任务调度器：按到期时间维护小顶堆，由单个后台线程在到期后将任务交给回调执行
+    """
+
+    def __init__(self, dispatch: callable):
+        self._dispatch = dispatch
+        self._heap = []
+        self._counter = itertools.count()
+        self._condition = threading.Condition()
+        self._thread = None
+
+    def schedule(self, delay: float, *args, **kwargs):
+        with self._condition:
+            heapq.heappush(self._heap, (time.monotonic() + delay, next(self._counter), args, kwargs))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='review-delayed-scheduler', daemon=True)
+                self._thread.start()
+            self._condition.notify()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._heap or self._heap[0][0] > time.monotonic():
+                    timeout = self._heap[0][0] - time.monotonic() if self._heap else None
+                    self._condition.wait(timeout)
+                _, _, args, kwargs = heapq.heappop(self._heap)
+            try:
+                self._dispatch(*args, **kwargs)
+            except Exception as e:
+                logger.error(f'Failed to dispatch delayed job: {e}')
+
+
+worker_pool = None
+delayed_scheduler = None
+if queue_driver == 'pool':
+    worker_pool = WorkerPool(workers=int(os.getenv('QUEUE_POOL_WORKERS', 4)),
+                             max_size=int(os.getenv('QUEUE_POOL_MAX_SIZE', 100)))
+
+
+def _get_rq_queue(url_slug: str, lane: str = None) -> Queue:
+    name = f'{url_slug}_{lane}' if QUEUE_LANES_ENABLED and lane else url_slug
+    if name not in queues:
+        queues[name] = Queue(name, connection=get_redis_connection())
+    return queues[name]
+
+
+def handle_queue(function: callable, data: any, token: str, url: str, url_slug: str, lane: str = None, **kwargs):
+    """
+    将任务放入队列
+    :param lane: 优先级通道，为空时按任务函数推断（见default_lane）
+    """
+    lane = lane or default_lane(function)
     if queue_driver == 'rq':
-        if url_slug not in queues:
-            logger.info(f'REDIS_HOST: {os.getenv("REDIS_HOST", "127.0.0.1")}，REDIS_PORT: {os.getenv("REDIS_PORT", 6379)}')
-            queues[url_slug] = Queue(url_slug, connection=Redis(os.getenv('REDIS_HOST', '127.0.0.1'),
-                                                                              os.getenv('REDIS_PORT', 6379)))
+        from biz.queue.fairness import run_project_job, project_metrics
+        project = project_key(data)
+        _get_rq_queue(url_slug, lane).enqueue(run_project_job, args=(project, lane, function, data, token, url, url_slug),
+                                              kwargs=kwargs)
+        project_metrics.record_enqueued(project)
+    else:
+        _submit_local(0, function, (data, token, url, url_slug), kwargs, lane, project_key(data))
 
-        queues[url_slug].enqueue(function, data, token, url, url_slug)
+
+def handle_queue_in(delay: float, function: callable, data: any, token: str, url: str, url_slug: str,
+                    lane: str = None, **kwargs):
+    """
+    延迟delay秒后将任务重新入队，当前worker无需阻塞等待
+    - rq: 使用enqueue_in，需要worker以--with-scheduler方式启动
+    - pool: 由进程内的延迟调度器到期后提交到工作线程池
+    - async: 在当前进程内启动定时器，到期后再启动新进程处理
+    """
+    lane = lane or default_lane(function)
+    if queue_driver == 'rq':
+        from biz.queue.fairness import run_project_job
+        _get_rq_queue(url_slug, lane).enqueue_in(timedelta(seconds=delay), run_project_job,
+                                                 args=(project_key(data), lane, function, data, token, url, url_slug),
+                                                 kwargs=kwargs)
     else:
-        process = Process(target=function, args=(data, token, url, url_slug))
+        _submit_local(delay, function, (data, token, url, url_slug), kwargs, lane, project_key(data))
+
+
+def _submit_local(delay: float, function: callable, args: tuple, kwargs: dict, lane: str, project: str):
+    """
+    async/pool驱动：开启QUEUE_JOURNAL_ENABLED时先写入任务日志，再交给进程或工作线程池执行。
+    async驱动的延迟任务（如changes为空时的重试）总是写入任务日志，由API进程的调度线程到期后投递，
+    发起重试的子进程不必等待，可以立即退出，服务重启后也不会丢失。
+    """
+    job_id = None
+    scheduled = queue_driver == 'async' and delay > 0
+    if QUEUE_JOURNAL_ENABLED or scheduled:
+        try:
+            job_id = job_journal.add(function, args, kwargs, lane=lane, project=project, delay=delay,
+                                     scheduled=scheduled)
+        except Exception as e:
+            # 任务日志不可用时不影响审查，仅失去重启后的恢复能力
+            logger.error(f'Failed to journal job {getattr(function, "__name__", function)}: {e}')
+    if job_id is None:
+        _dispatch_local(delay, lane, project, function, args, kwargs)
+        return
+    if scheduled:
+        return
+    try:
+        _dispatch_local(delay, lane, project, _run_journaled, (job_id, function, args, kwargs),
+                        {'lane': lane, 'project': project})
+    except QueueFullError:
+        # 请求被拒绝（429），由平台重试，不再保留日志记录
+        job_journal.discard(job_id)
+        raise
+
+
+def _dispatch_local(delay: float, lane: str, project: str, function: callable, args: tuple, kwargs: dict):
+    global delayed_scheduler
+    if queue_driver == 'pool':
+        if delay <= 0:
+            worker_pool.submit_job(function, args, kwargs, lane=lane, project=project)
+            return
+        if delayed_scheduler is None:
+            delayed_scheduler = DelayedScheduler(_dispatch_delayed)
+        delayed_scheduler.schedule(delay, lane, project, function, args, kwargs)
+    elif delay <= 0:
+        process = Process(target=function, args=args, kwargs=kwargs)
         process.start()
+    else:
+        # 仅在延迟任务无法写入任务日志时使用：在当前进程中等待到期，进程需保持运行直到任务投递
+        timer = threading.Timer(delay, _dispatch_local, args=(0, lane, project, function, args, kwargs))
+        timer.start()
+
+
+def _dispatch_delayed(lane: str, project: str, function: callable, args: tuple, kwargs: dict):
+    try:
+        worker_pool.submit_job(function, args, kwargs, lane=lane, project=project)
+    except QueueFullError as e:
+        # 队列已满时放弃本次重试，避免延迟任务挤占新到达的webhook（已写入任务日志的任务在下次启动时恢复）
+        logger.error(f'Drop delayed job {getattr(function, "__name__", function)}: {e}')
+
+
+# 当前线程正在执行的任务：_run_journaled 执行期间 journaled 为 True
+_job_context = threading.local()
+
+
+def raise_if_journaled(error: Exception):
+    """
+    任务处理函数捕获异常并发送通知后调用。
+    任务日志中的任务重新抛出异常，由 _run_journaled 记录失败、按退避时间重试，重试次数用尽后进入dead状态；
+    其他任务保持原有行为（只通知不抛出）。
+    """
+    if getattr(_job_context, 'journaled', False):
+        raise error
+
+
+def _run_journaled(job_id: int, function: callable, args: tuple, kwargs: dict, lane: str = None, project: str = ''):
+    """执行任务日志中的任务：开始前标记running，成功后ack，异常时按退避时间重试，重试次数用尽后进入dead状态"""
+    name = getattr(function, '__name__', function)
+    job_journal.start(job_id)
+    _job_context.journaled = True
+    try:
+        function(*args, **kwargs)
+    except Exception as e:
+        # async驱动下任务运行在fork出的子进程中，重试交给API进程的调度线程
+        scheduled = queue_driver == 'async'
+        delay = job_journal.fail(job_id, str(e), scheduled=scheduled)
+        if delay is None:
+            logger.error(f'Journaled job {job_id} ({name}) failed permanently: {e}')
+            return
+        logger.warn(f'Journaled job {job_id} ({name}) failed, retry in {delay:.0f}s: {e}')
+        if not scheduled:
+            _dispatch_local(delay, lane, project, _run_journaled, (job_id, function, args, kwargs),
+                            {'lane': lane, 'project': project})
+        return
+    finally:
+        _job_context.journaled = False
+    job_journal.ack(job_id)
+
+
+def _dispatch_journaled(row, delay: float = 0):
+    function = resolve_function(row['function'])
+    args = tuple(json.loads(row['args']))
+    kwargs = json.loads(row['kwargs'])
+    lane = row['lane'] or default_lane(function)
+    project = row['project'] or ''
+    _dispatch_local(delay, lane, project, _run_journaled, (row['id'], function, args, kwargs),
+                    {'lane': lane, 'project': project})
+
+
+def replay_journal() -> int:
+    """
+    启动时重新投递任务日志中未完成的任务（pending，以及上次进程退出时仍为running的任务）
+    :return: 重新投递的任务数
+    """
+    if not QUEUE_JOURNAL_ENABLED or queue_driver == 'rq':
+        return 0
+    job_journal.purge()
+    count = 0
+    now = time.time()
+    for row in job_journal.unfinished():
+        if row['state'] == STATE_RUNNING and row['attempts'] >= job_journal.max_attempts:
+            job_journal.mark_dead(row['id'], row['last_error'] or 'interrupted')
+            continue
+        if queue_driver == 'async' and row['state'] == STATE_PENDING and row['available_at'] > now:
+            # 尚未到期的任务交给调度线程
+            job_journal.defer(row['id'])
+            continue
+        try:
+            _dispatch_journaled(row, max(0.0, row['available_at'] - now))
+            count += 1
+        except QueueFullError:
+            logger.warn('Review queue is full, remaining journaled jobs will be replayed on next startup.')
+            break
+        except Exception as e:
+            job_journal.mark_dead(row['id'], f'replay failed: {e}')
+            logger.error(f'Failed to replay journaled job {row["id"]}: {e}')
+    if count:
+        logger.info(f'Replayed {count} unfinished journaled jobs.')
+    return count
+
+
+def dispatch_scheduled() -> int:
+    """
+    投递已到期的scheduled任务（async驱动的延迟任务和失败重试）
+    :return: 投递的任务数
+    """
+    count = 0
+    for row in job_journal.claim_due():
+        try:
+            _dispatch_journaled(row)
+            count += 1
+        except Exception as e:
+            job_journal.mark_dead(row['id'], f'dispatch failed: {e}')
+            logger.error(f'Failed to dispatch scheduled job {row["id"]}: {e}')
+    return count
+
+
+_schedule_thread = None
+
+
+def start_journal_scheduler():
+    """API进程启动时调用：async驱动下每隔QUEUE_SCHEDULE_INTERVAL秒投递到期的延迟任务"""
+    global _schedule_thread
+    if queue_driver != 'async' or _schedule_thread is not None:
+        return
+
+    def loop():
+        while True:
+            try:
+                dispatch_scheduled()
+            except Exception as e:
+                logger.error(f'Failed to dispatch scheduled jobs: {e}')
+            time.sleep(QUEUE_SCHEDULE_INTERVAL)
+
+    _schedule_thread = threading.Thread(target=loop, name='queue-journal-scheduler', daemon=True)
+    _schedule_thread.start()
+
+
+def queue_stats() -> Dict[str, dict]:
+    """
+    各通道的队列深度和等待时间
+    - pool: 进程内统计的入队/出队数、平均/最大等待时间和当前最久的等待时间
+    - rq: 本进程入队过的队列的当前深度和最早任务的等待时间
+    以及每个项目的等待时间、执行耗时和吞吐量
+    开启任务日志时，async/pool驱动额外返回各状态的任务数
+    """
+    if queue_driver != 'rq' and QUEUE_JOURNAL_ENABLED:
+        result = {'journal': job_journal.stats()}
+        if queue_driver == 'pool':
+            result.update({'pool': worker_pool.stats(), 'projects': worker_pool.project_stats()})
+        return result
+    if queue_driver == 'pool':
+        return {'pool': worker_pool.stats(), 'projects': worker_pool.project_stats()}
+    if queue_driver == 'rq':
+        from biz.queue.fairness import project_metrics
+        result = {}
+        for name, rq_queue in list(queues.items()):
+            oldest_wait = 0.0
+            job_ids = rq_queue.get_job_ids(0, 1)
+            job = rq_queue.fetch_job(job_ids[0]) if job_ids else None
+            if job is not None and job.enqueued_at:
+                # rq读取的enqueued_at为不带时区的UTC时间
+                oldest_wait = round(time.time() - job.enqueued_at.replace(tzinfo=timezone.utc).timestamp(), 3)
+            result[name] = {'depth': rq_queue.count, 'oldest_wait': oldest_wait}
+        return {'rq': result, 'projects': project_metrics.snapshot()}
+    return {}
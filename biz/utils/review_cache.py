@@ -0,0 +1,171 @@
+"""
+AI Review 结果缓存
+
+重新打开的MR、cherry-pick到多个发布分支、同一个commit先后以push和MR事件到达等场景，
+会把完全相同的diff发送给LLM。这里以规范化后的完整prompt（包含diff、commits和渲染后的规则）、
+REVIEW_STYLE 和模型名称的哈希作为key缓存审查结果，命中时跳过LLM调用。
+
+- REVIEW_CACHE_BACKEND=sqlite（默认）：保存在 data/review_cache.db；
+- REVIEW_CACHE_BACKEND=redis：保存在 Redis，多个worker共享；
+缓存条目数超过 REVIEW_CACHE_MAX_ENTRIES 时按最近使用时间淘汰。
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from biz.utils.db import get_connection
+from biz.utils.log import logger
+
+
+def get_project_root():
+    """获取项目根目录的绝对路径"""
+    if 'PROJECT_ROOT' in os.environ:
+        return Path(os.environ['PROJECT_ROOT'])
+    current_file = Path(__file__).resolve()
+    return current_file.parent.parent.parent
+
+
+def normalize_text(text: str) -> str:
+    """统一换行符并去掉行尾空白，避免无意义的格式差异导致缓存不命中"""
+    lines = text.replace('\r\n', '\n').replace('\r', '\n').split('\n')
+    return '\n'.join(line.rstrip() for line in lines).strip()
+
+
+def make_cache_key(messages: List[Dict[str, str]], style: str, model: str) -> str:
+    payload = {
+        'style': style,
+        'model': model,
+        'messages': [{'role': m.get('role'), 'content': normalize_text(m.get('content') or '')} for m in messages],
+    }
+    return hashlib.sha256(json.dumps(payload, ensure_ascii=False, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+class SqliteReviewCache:
+    DB_TIMEOUT = 30.0
+
+    def __init__(self, db_file: str, max_entries: int):
+        self.db_file = db_file
+        self.max_entries = max_entries
+        self._initialized = False
+        self._lock = threading.Lock()
+
+    def get_db_connection(self):
+        conn = get_connection(self.db_file, self.DB_TIMEOUT)
+        if not self._initialized:
+            with self._lock:
+                conn.execute('''
+                    CREATE TABLE IF NOT EXISTS review_cache (
+                        cache_key TEXT PRIMARY KEY,
+                        model TEXT,
+                        review_result TEXT NOT NULL,
+                        created_at INTEGER NOT NULL,
+                        last_hit_at INTEGER NOT NULL,
+                        hit_count INTEGER DEFAULT 0
+                    )
+                ''')
+                conn.execute('CREATE INDEX IF NOT EXISTS idx_review_cache_last_hit_at ON review_cache (last_hit_at);')
+                conn.commit()
+                self._initialized = True
+        return conn
+
+    def get(self, cache_key: str) -> Optional[str]:
+        conn = self.get_db_connection()
+        try:
+            row = conn.execute('SELECT review_result FROM review_cache WHERE cache_key = ?', (cache_key,)).fetchone()
+            if row is None:
+                return None
+            conn.execute('UPDATE review_cache SET last_hit_at = ?, hit_count = hit_count + 1 WHERE cache_key = ?',
+                         (int(time.time()), cache_key))
+            conn.commit()
+            return row[0]
+        finally:
+            conn.close()
+
+    def set(self, cache_key: str, review_result: str, model: str):
+        now = int(time.time())
+        conn = self.get_db_connection()
+        try:
+            conn.execute('''
+                INSERT OR REPLACE INTO review_cache (cache_key, model, review_result, created_at, last_hit_at, hit_count)
+                VALUES (?, ?, ?, ?, ?, 0)
+            ''', (cache_key, model, review_result, now, now))
+            # 按最近使用时间淘汰超出上限的条目
+            conn.execute('''
+                DELETE FROM review_cache WHERE cache_key IN (
+                    SELECT cache_key FROM review_cache ORDER BY last_hit_at DESC LIMIT -1 OFFSET ?
+                )
+            ''', (self.max_entries,))
+            conn.commit()
+        finally:
+            conn.close()
+
+
+class RedisReviewCache:
+    KEY_PREFIX = 'review:cache:'
+    INDEX_KEY = 'review:cache:index'
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+
+    @staticmethod
+    def _redis():
+        from biz.utils.queue import get_redis_connection
+        return get_redis_connection()
+
+    def get(self, cache_key: str) -> Optional[str]:
+        redis = self._redis()
+        value = redis.get(self.KEY_PREFIX + cache_key)
+        if value is None:
+            return None
+        redis.zadd(self.INDEX_KEY, {cache_key: time.time()})
+        return value.decode('utf-8')
+
+    def set(self, cache_key: str, review_result: str, model: str):
+        redis = self._redis()
+        pipeline = redis.pipeline()
+        pipeline.set(self.KEY_PREFIX + cache_key, review_result.encode('utf-8'))
+        pipeline.zadd(self.INDEX_KEY, {cache_key: time.time()})
+        pipeline.execute()
+        # 按最近使用时间淘汰超出上限的条目
+        overflow = redis.zcard(self.INDEX_KEY) - self.max_entries
+        if overflow > 0:
+            evicted = [key.decode('utf-8') for key, _ in redis.zpopmin(self.INDEX_KEY, overflow)]
+            if evicted:
+                redis.delete(*[self.KEY_PREFIX + key for key in evicted])
+
+
+class ReviewCache:
+    def __init__(self):
+        self.enabled = os.getenv('REVIEW_CACHE_ENABLED', '0') == '1'
+        self.hits = 0
+        self.misses = 0
+        max_entries = int(os.getenv('REVIEW_CACHE_MAX_ENTRIES', 1000))
+        if os.getenv('REVIEW_CACHE_BACKEND', 'sqlite') == 'redis':
+            self.backend = RedisReviewCache(max_entries)
+        else:
+            self.backend = SqliteReviewCache(str(get_project_root() / "data" / "review_cache.db"), max_entries)
+
+    def get(self, cache_key: str) -> Optional[str]:
+        try:
+            result = self.backend.get(cache_key)
+        except Exception as e:
+            logger.warn(f"读取AI Review缓存失败: {e}")
+            return None
+        if result is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return result
+
+    def set(self, cache_key: str, review_result: str, model: str):
+        try:
+            self.backend.set(cache_key, review_result, model)
+        except Exception as e:
+            logger.warn(f"写入AI Review缓存失败: {e}")
+
+
+review_cache = ReviewCache()
@@ -0,0 +1,89 @@
+"""
+GitLab / GitHub / Gitea 共享的 HTTP 客户端
+
+按 host 复用 requests.Session 及其 keep-alive 连接池，同一事件内对同一平台的多次请求
+（changes、commits、protected_branches、notes 等）复用同一条 TCP/TLS 连接。
+所有请求默认带超时和 gzip 压缩。
+"""
+import os
+import threading
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+SCM_HTTP_CONNECT_TIMEOUT = float(os.getenv('SCM_HTTP_CONNECT_TIMEOUT', 5))
+SCM_HTTP_READ_TIMEOUT = float(os.getenv('SCM_HTTP_READ_TIMEOUT', 60))
+SCM_HTTP_POOL_MAXSIZE = int(os.getenv('SCM_HTTP_POOL_MAXSIZE', 10))
+
+_sessions = {}
+_lock = threading.Lock()
+# 创建Session的进程，未经os.fork（例如不支持register_at_fork的平台）换了进程时也能发现
+_pid = os.getpid()
+
+
+def _create_session() -> requests.Session:
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=SCM_HTTP_POOL_MAXSIZE)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.headers.update({'Accept-Encoding': 'gzip, deflate'})
+    return session
+
+
+def get_session(url: str) -> requests.Session:
+    """获取url所属host的共享Session"""
+    if os.getpid() != _pid:
+        _reset_after_fork()
+    parsed = urlparse(url)
+    host_key = f'{parsed.scheme}://{parsed.netloc}'
+    session = _sessions.get(host_key)
+    if session is None:
+        with _lock:
+            session = _sessions.get(host_key)
+            if session is None:
+                session = _create_session()
+                _sessions[host_key] = session
+    return session
+
+
+def request(method: str, url: str, **kwargs) -> requests.Response:
+    kwargs.setdefault('timeout', (SCM_HTTP_CONNECT_TIMEOUT, SCM_HTTP_READ_TIMEOUT))
+    return get_session(url).request(method, url, **kwargs)
+
+
+def get(url: str, **kwargs) -> requests.Response:
+    return request('GET', url, **kwargs)
+
+
+def post(url: str, **kwargs) -> requests.Response:
+    return request('POST', url, **kwargs)
+
+
+def put(url: str, **kwargs) -> requests.Response:
+    return request('PUT', url, **kwargs)
+
+
+def patch(url: str, **kwargs) -> requests.Response:
+    return request('PATCH', url, **kwargs)
+
+
+def close_all():
+    """关闭所有Session及其连接池"""
+    with _lock:
+        sessions = list(_sessions.values())
+        _sessions.clear()
+    for session in sessions:
+        session.close()
+
+
+def _reset_after_fork():
+    # fork出的子进程不能复用父进程的socket，直接丢弃继承来的Session
+    global _lock, _pid
+    _sessions.clear()
+    _lock = threading.Lock()
+    _pid = os.getpid()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
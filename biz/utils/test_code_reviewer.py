@@ -0,0 +1,109 @@
+from unittest import TestCase, main
+from unittest.mock import MagicMock, patch
+
+from biz.llm.client.router import RouterClient
+from biz.utils.code_reviewer import batch_changes, split_diff_hunks, BaseReviewer, CodeReviewer
+
+
+def count_tokens(text: str) -> int:
+    # 测试中以空白分词近似token数，避免依赖tiktoken编码文件
+    return len(text.split())
+
+
+class TestBatchChanges(TestCase):
+    def make_change(self, path: str, hunks: int, lines_per_hunk: int = 20) -> dict:
+        diff = ''.join(
+            f"@@ -{i * 100},{lines_per_hunk} +{i * 100},{lines_per_hunk} @@\n" +
+            ''.join(f"+    value_{i}_{j} = compute_something({j})\n" for j in range(lines_per_hunk))
+            for i in range(hunks)
+        )
+        return {'diff': diff, 'new_path': path, 'additions': hunks * lines_per_hunk, 'deletions': 0}
+
+    def test_split_diff_hunks(self):
+        change = self.make_change('a.py', hunks=3)
+        hunks = split_diff_hunks(change['diff'])
+        self.assertEqual(len(hunks), 3)
+        self.assertEqual(''.join(hunks), change['diff'])
+
+    def test_batches_respect_budget_and_keep_all_files(self):
+        changes = [self.make_change(f'file_{i}.py', hunks=2) for i in range(6)]
+        max_tokens = count_tokens(str(changes[0])) * 2 + 10
+        batches = batch_changes(changes, max_tokens, count=count_tokens)
+        self.assertGreater(len(batches), 1)
+        self.assertEqual([item['new_path'] for batch in batches for item in batch],
+                         [change['new_path'] for change in changes])
+        for batch in batches:
+            self.assertLessEqual(sum(count_tokens(str(item)) for item in batch), max_tokens)
+
+    def test_large_file_split_on_hunk_boundaries(self):
+        change = self.make_change('big.py', hunks=4)
+        max_tokens = count_tokens(str(dict(change, diff=split_diff_hunks(change['diff'])[0]))) + 10
+        batches = batch_changes([change], max_tokens, count=count_tokens)
+        self.assertEqual(len(batches), 4)
+        self.assertTrue(all(batch[0]['diff'].startswith('@@') for batch in batches))
+
+    def test_each_piece_counted_once(self):
+        changes = [self.make_change(f'file_{i}.py', hunks=2) for i in range(3)] + [self.make_change('big.py', hunks=4)]
+        counted = []
+
+        def counting(text: str) -> int:
+            counted.append(text)
+            return count_tokens(text)
+
+        max_tokens = count_tokens(str(changes[0])) + 10
+        batch_changes(changes, max_tokens, count=counting)
+        # 3个小文件各1次，大文件整体1次 + 4个hunk各1次
+        self.assertEqual(len(counted), 3 + 1 + 4)
+
+
+@patch('biz.utils.code_reviewer.review_cache')
+class TestReviewCache(TestCase):
+    messages = [{'role': 'user', 'content': 'diff'}]
+
+    def make_reviewer(self, client) -> CodeReviewer:
+        with patch('biz.utils.code_reviewer.Factory') as factory:
+            factory.return_value.getClient.return_value = client
+            return CodeReviewer()
+
+    def test_cache_hit_marks_review_cached(self, review_cache):
+        review_cache.get.return_value = '总分: 90'
+        client = MagicMock(default_model='model-a')
+        reviewer = self.make_reviewer(client)
+        self.assertEqual(reviewer.call_llm(self.messages), '总分: 90')
+        self.assertTrue(reviewer.cached)
+        client.completions.assert_not_called()
+
+    def test_reduce_call_counted_in_cached_flag(self, review_cache):
+        def load_prompts(reviewer):
+            return {'system_message': {'role': 'system', 'content': ''},
+                    'user_message': {'role': 'user', 'content': reviewer.prompt_key}}
+
+        # map批次命中缓存，合并调用未命中
+        review_cache.get.side_effect = lambda key: None if key == 'code_review_reduce_prompt' else '总分: 90'
+        client = MagicMock(default_model='model-a')
+        client.completions.return_value = '总分: 80'
+        change = {'new_path': 'a.py', 'diff': '+a'}
+        with patch('biz.utils.code_reviewer.Factory') as factory, \
+                patch('biz.utils.code_reviewer.batch_changes', return_value=[[change]]), \
+                patch('biz.utils.code_reviewer.make_cache_key', side_effect=lambda messages, *_: messages[1]['content']), \
+                patch.object(BaseReviewer, '_load_prompts', autospec=True, side_effect=load_prompts):
+            factory.return_value.getClient.return_value = client
+            reviewer = CodeReviewer()
+            reviewer.map_reduce_review([change], 'commit', 1000)
+        self.assertEqual((reviewer.cache_hits, reviewer.llm_calls), (1, 1))
+        self.assertFalse(reviewer.cached)
+
+    def test_router_client_not_cached(self, review_cache):
+        backend = MagicMock()
+        backend.name = 'openai'
+        router = RouterClient([backend])
+        router.completions = MagicMock(return_value='总分: 90')
+        reviewer = self.make_reviewer(router)
+        self.assertEqual(reviewer.call_llm(self.messages), '总分: 90')
+        self.assertFalse(reviewer.cached)
+        review_cache.get.assert_not_called()
+        review_cache.set.assert_not_called()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+import os
+import tempfile
+import threading
+from unittest import TestCase, main
+
+from biz.utils.db import ConnectionPool
+
+
+class TestConnectionPool(TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.pool = ConnectionPool(os.path.join(self.tmpdir.name, 'test.db'))
+        conn = self.pool.connection()
+        conn.execute('CREATE TABLE t (id INTEGER PRIMARY KEY, name TEXT)')
+        conn.commit()
+        conn.close()
+
+    def tearDown(self):
+        self.pool.close()
+        self.tmpdir.cleanup()
+
+    def test_reuse_per_thread(self):
+        first = self.pool.connection()
+        first.close()
+        second = self.pool.connection()
+        second.close()
+        self.assertIs(first, second)
+        self.assertEqual(self.pool.fetch_one('PRAGMA synchronous')[0], 1)  # NORMAL
+
+        other = []
+        thread = threading.Thread(target=lambda: other.append(self.pool.connection()))
+        thread.start()
+        thread.join()
+        self.assertIsNot(other[0], first)
+
+    def test_release_rolls_back_and_resets(self):
+        conn = self.pool.connection()
+        conn.isolation_level = None
+        conn.execute('BEGIN')
+        conn.execute("INSERT INTO t (name) VALUES ('a')")
+        conn.close()
+        conn = self.pool.connection()
+        try:
+            self.assertEqual(conn.isolation_level, '')
+            self.assertEqual(conn.execute('SELECT COUNT(*) FROM t').fetchone()[0], 0)
+        finally:
+            conn.close()
+
+    def test_nested_connection_keeps_transaction(self):
+        outer = self.pool.connection()
+        outer.execute("INSERT INTO t (name) VALUES ('a')")
+        inner = self.pool.connection()
+        self.assertIs(inner, outer)
+        inner.close()
+        outer.commit()
+        outer.close()
+        self.assertEqual(self.pool.fetch_all('SELECT name FROM t'), [('a',)])
+
+
+if __name__ == '__main__':
+    main()
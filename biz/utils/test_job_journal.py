@@ -0,0 +1,98 @@
+import os
+import tempfile
+from unittest import TestCase, main
+from unittest.mock import patch
+
+from biz.utils.job_journal import JobJournal, resolve_function, STATE_DONE, STATE_DEAD, STATE_PENDING, \
+    STATE_SCHEDULED
+from biz.utils.queue import _run_journaled, raise_if_journaled
+
+
+def sample_job(data, token, url, url_slug, **kwargs):
+    pass
+
+
+def failing_job(data, token, url, url_slug, **kwargs):
+    # 与worker中的处理函数相同：捕获异常、发送通知后交给任务日志处理
+    try:
+        raise RuntimeError('review failed')
+    except Exception as e:
+        raise_if_journaled(e)
+
+
+class TestJobJournal(TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.journal = JobJournal(os.path.join(self.tmpdir.name, 'queue.db'), max_attempts=2, retry_delay=10)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_ack(self):
+        job_id = self.journal.add(sample_job, ({'a': 1}, 'token', 'url', 'slug'), {'retry_attempt': 1}, lane='push')
+        row = self.journal.unfinished()[0]
+        self.assertEqual(row['state'], STATE_PENDING)
+        self.assertIs(resolve_function(row['function']), sample_job)
+        self.journal.start(job_id)
+        self.journal.ack(job_id)
+        self.assertEqual(self.journal.unfinished(), [])
+        self.assertEqual(self.journal.stats(), {STATE_DONE: 1})
+
+    def test_retry_then_dead(self):
+        job_id = self.journal.add(sample_job, ({}, 'token', 'url', 'slug'), {})
+        self.journal.start(job_id)
+        self.assertEqual(self.journal.fail(job_id, 'boom'), 10)
+        self.assertEqual(self.journal.unfinished()[0]['state'], STATE_PENDING)
+        self.journal.start(job_id)
+        self.assertIsNone(self.journal.fail(job_id, 'boom'))
+        self.assertEqual(self.journal.stats(), {STATE_DEAD: 1})
+
+    def test_running_job_survives_restart(self):
+        job_id = self.journal.add(sample_job, ({}, 'token', 'url', 'slug'), {})
+        self.journal.start(job_id)
+        # 模拟进程崩溃后重新打开任务日志
+        reopened = JobJournal(self.journal.db_file)
+        self.assertEqual([row['id'] for row in reopened.unfinished()], [job_id])
+
+    def test_discard(self):
+        job_id = self.journal.add(sample_job, ({}, 'token', 'url', 'slug'), {})
+        self.journal.discard(job_id)
+        self.assertEqual(self.journal.stats(), {})
+
+    @patch('biz.utils.queue.queue_driver', 'pool')
+    def test_failing_handler_retried_then_dead(self):
+        args = ({}, 'token', 'url', 'slug')
+        job_id = self.journal.add(failing_job, args, {})
+        with patch('biz.utils.queue.job_journal', self.journal), \
+                patch('biz.utils.queue._dispatch_local') as dispatch:
+            _run_journaled(job_id, failing_job, args, {})
+            self.assertEqual(dispatch.call_args.args[0], 10)
+            self.assertEqual(self.journal.unfinished()[0]['state'], STATE_PENDING)
+            _run_journaled(job_id, failing_job, args, {})
+            self.assertEqual(dispatch.call_count, 1)
+        self.assertEqual(self.journal.stats(), {STATE_DEAD: 1})
+        # 任务日志之外的调用只通知不抛出
+        failing_job(*args)
+
+    def test_claim_due(self):
+        due_id = self.journal.add(sample_job, ({}, 'token', 'url', 'slug'), {}, scheduled=True)
+        self.journal.add(sample_job, ({}, 'token', 'url', 'slug'), {}, delay=100, scheduled=True)
+        self.assertEqual([row['id'] for row in self.journal.claim_due()], [due_id])
+        # 已认领的任务不会被再次认领
+        self.assertEqual(self.journal.claim_due(), [])
+        self.assertEqual(self.journal.stats(), {STATE_PENDING: 1, STATE_SCHEDULED: 1})
+
+    @patch('biz.utils.queue.queue_driver', 'async')
+    def test_async_retry_left_to_scheduler(self):
+        args = ({}, 'token', 'url', 'slug')
+        job_id = self.journal.add(failing_job, args, {})
+        with patch('biz.utils.queue.job_journal', self.journal), \
+                patch('biz.utils.queue._dispatch_local') as dispatch:
+            _run_journaled(job_id, failing_job, args, {})
+        # fork出的子进程不等待重试，到期后由API进程的调度线程投递
+        dispatch.assert_not_called()
+        self.assertEqual(self.journal.stats(), {STATE_SCHEDULED: 1})
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+import json
+from unittest import TestCase, main
+from unittest.mock import patch
+
+from biz.utils.protected_branch_cache import ProtectedBranchCache
+
+
+class TestProtectedBranchCache(TestCase):
+    def setUp(self):
+        self.cache = ProtectedBranchCache(max_size=2, ttl=60)
+        self.loads = 0
+
+    def loader(self):
+        self.loads += 1
+        return ['main', 'release/*']
+
+    def test_match_and_hit_counters(self):
+        self.assertTrue(self.cache.is_protected('https://gitlab.example.com', 1, 'release/1.0', self.loader))
+        self.assertFalse(self.cache.is_protected('https://gitlab.example.com', 1, 'feature/x', self.loader))
+        self.assertEqual(self.loads, 1)
+        self.assertEqual(self.cache.stats()['misses'], 1)
+        self.assertEqual(self.cache.stats()['hits'], 1)
+
+    def test_failed_load_not_cached(self):
+        self.assertFalse(self.cache.is_protected('https://gitlab.example.com', 1, 'main', lambda: None))
+        self.assertTrue(self.cache.is_protected('https://gitlab.example.com', 1, 'main', self.loader))
+
+    def test_lru_eviction(self):
+        for project_id in (1, 2, 3):
+            self.cache.is_protected('https://gitlab.example.com', project_id, 'main', self.loader)
+        self.assertEqual(self.cache.stats()['size'], 2)
+        self.cache.is_protected('https://gitlab.example.com', 1, 'main', self.loader)
+        self.assertEqual(self.loads, 4)
+
+    def test_hit_rate(self):
+        self.assertEqual(self.cache.stats()['hit_rate'], 0.0)
+        for _ in range(4):
+            self.cache.is_protected('https://gitlab.example.com', 1, 'main', self.loader)
+        self.assertEqual(self.cache.stats()['hit_rate'], 0.75)
+
+
+class FakeRedis:
+    def __init__(self):
+        self.values = {}
+        self.expires = {}
+
+    def get(self, key):
+        return self.values.get(key)
+
+    def set(self, key, value, ex=None):
+        self.values[key] = value.encode('utf-8')
+        self.expires[key] = ex
+
+
+class TestProtectedBranchCacheRedis(TestCase):
+    def setUp(self):
+        self.redis = FakeRedis()
+        patcher = patch('biz.utils.protected_branch_cache.get_redis_connection', return_value=self.redis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.loads = 0
+
+    def loader(self):
+        self.loads += 1
+        return ['main', 'release/*']
+
+    def test_shared_between_processes(self):
+        # 两个缓存实例模拟两个worker进程，第二个从Redis读取，不再请求SCM平台
+        first = ProtectedBranchCache(ttl=60, use_redis=True)
+        self.assertTrue(first.is_protected('https://gitlab.example.com', 1, 'main', self.loader))
+        key = ProtectedBranchCache.cache_key('https://gitlab.example.com', 1)
+        self.assertEqual(json.loads(self.redis.values[key]), ['main', 'release/*'])
+        self.assertEqual(self.redis.expires[key], 60)
+
+        second = ProtectedBranchCache(ttl=60, use_redis=True)
+        self.assertTrue(second.is_protected('https://gitlab.example.com', 1, 'release/2.0', self.loader))
+        self.assertEqual(self.loads, 1)
+        self.assertEqual(second.stats()['redis_hits'], 1)
+        self.assertEqual(second.stats()['misses'], 0)
+
+    def test_peek_reads_redis(self):
+        cache = ProtectedBranchCache(ttl=60, use_redis=True)
+        self.assertIsNone(cache.peek('https://gitlab.example.com', 1, 'main'))
+        ProtectedBranchCache(ttl=60, use_redis=True).is_protected('https://gitlab.example.com', 1, 'main',
+                                                                  self.loader)
+        self.assertTrue(cache.peek('https://gitlab.example.com', 1, 'main'))
+        self.assertFalse(cache.peek('https://gitlab.example.com', 1, 'feature/x'))
+        self.assertEqual(cache.stats()['size'], 1)
+
+    def test_redis_error_falls_back_to_loader(self):
+        with patch('biz.utils.protected_branch_cache.get_redis_connection', side_effect=ConnectionError('down')):
+            cache = ProtectedBranchCache(ttl=60, use_redis=True)
+            self.assertTrue(cache.is_protected('https://gitlab.example.com', 1, 'main', self.loader))
+        self.assertEqual(self.loads, 1)
+
+
+if __name__ == '__main__':
+    main()
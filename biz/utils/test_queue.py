@@ -0,0 +1,90 @@
+import threading
+from unittest import TestCase, main
+
+from biz.utils.queue import WorkerPool, QueueFullError, DelayedScheduler, LaneQueue
+
+
+class TestWorkerPool(TestCase):
+    def test_submit_runs_job(self):
+        pool = WorkerPool(workers=2, max_size=10)
+        done = threading.Event()
+        pool.submit(lambda: done.set())
+        self.assertTrue(done.wait(5))
+
+    def test_backpressure_when_queue_full(self):
+        pool = WorkerPool(workers=1, max_size=1)
+        started = threading.Event()
+        release = threading.Event()
+
+        def blocking_job():
+            started.set()
+            release.wait(5)
+
+        pool.submit(blocking_job)
+        self.assertTrue(started.wait(5))
+        # 工作线程被占用，队列容量为1，第二个任务排队，第三个任务被拒绝
+        pool.submit(lambda: None)
+        with self.assertRaises(QueueFullError):
+            pool.submit(lambda: None)
+        release.set()
+
+
+class TestLaneQueue(TestCase):
+    def test_weighted_dequeue_across_lanes(self):
+        lanes = LaneQueue(max_size=100, weights={'mr': 3, 'push': 1})
+        for i in range(8):
+            lanes.put_nowait('push', f'push-{i}')
+            lanes.put_nowait('mr', f'mr-{i}')
+        first_eight = [lanes.get() for _ in range(8)]
+        # 两个通道都有积压时按3:1出队，push通道不会被饿死
+        self.assertEqual(sum(1 for item in first_eight if item.startswith('mr')), 6)
+        self.assertEqual(lanes.stats()['push']['dequeued'], 2)
+
+    def test_single_lane_keeps_fifo(self):
+        lanes = LaneQueue(max_size=10, weights={'mr': 3, 'push': 1})
+        for i in range(3):
+            lanes.put_nowait('push', i)
+        self.assertEqual([lanes.get() for _ in range(3)], [0, 1, 2])
+
+
+class TestProjectFairness(TestCase):
+    def test_projects_take_turns_within_lane(self):
+        lanes = LaneQueue(max_size=100, weights={'push': 1})
+        for i in range(4):
+            lanes.put_nowait('push', f'mono-{i}', project='monorepo')
+        lanes.put_nowait('push', 'small-0', project='small')
+        # 先到达的大量monorepo任务不会阻塞small项目
+        self.assertEqual([lanes.get() for _ in range(3)], ['mono-0', 'small-0', 'mono-1'])
+        self.assertEqual(lanes.project_stats()['small']['started'], 1)
+
+    def test_project_concurrency_cap(self):
+        lanes = LaneQueue(max_size=100, weights={'push': 1}, project_max_concurrency=1)
+        lanes.put_nowait('push', 'mono-0', project='monorepo')
+        lanes.put_nowait('push', 'mono-1', project='monorepo')
+        lanes.put_nowait('push', 'small-0', project='small')
+        self.assertEqual(lanes.get(), 'mono-0')
+        # monorepo已有1个任务在执行，跳过其排队任务
+        self.assertEqual(lanes.get(), 'small-0')
+        lanes.done('monorepo')
+        self.assertEqual(lanes.get(), 'mono-1')
+
+
+class TestDelayedScheduler(TestCase):
+    def test_jobs_dispatched_in_due_order(self):
+        dispatched = []
+        done = threading.Event()
+
+        def dispatch(name):
+            dispatched.append(name)
+            if len(dispatched) == 2:
+                done.set()
+
+        scheduler = DelayedScheduler(dispatch)
+        scheduler.schedule(0.2, 'later')
+        scheduler.schedule(0.05, 'sooner')
+        self.assertTrue(done.wait(5))
+        self.assertEqual(dispatched, ['sooner', 'later'])
+
+
+if __name__ == '__main__':
+    main()
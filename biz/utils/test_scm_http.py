@@ -0,0 +1,51 @@
+import os
+from unittest import TestCase, main
+from unittest.mock import patch
+
+from biz.utils import scm_http
+
+
+class TestScmHttp(TestCase):
+    def setUp(self):
+        scm_http.close_all()
+        self.addCleanup(scm_http.close_all)
+
+    def test_session_reused_per_host(self):
+        session = scm_http.get_session('https://gitlab.example.com/api/v4/projects/1')
+        self.assertIs(scm_http.get_session('https://gitlab.example.com/api/v4/projects/2/merge_requests'), session)
+        self.assertIsNot(scm_http.get_session('https://api.github.com/repos/a/b'), session)
+        self.assertIsNot(scm_http.get_session('http://gitlab.example.com/api/v4/projects/1'), session)
+
+    def test_session_recreated_after_pid_change(self):
+        session = scm_http.get_session('https://gitlab.example.com')
+        with patch('biz.utils.scm_http.os.getpid', return_value=os.getpid() + 1):
+            child_session = scm_http.get_session('https://gitlab.example.com')
+            self.assertIsNot(child_session, session)
+            # 新进程内继续复用
+            self.assertIs(scm_http.get_session('https://gitlab.example.com'), child_session)
+
+    def test_reset_after_fork(self):
+        session = scm_http.get_session('https://gitlab.example.com')
+        scm_http._reset_after_fork()
+        self.assertIsNot(scm_http.get_session('https://gitlab.example.com'), session)
+
+    def test_default_timeout(self):
+        session = scm_http.get_session('https://gitlab.example.com')
+        with patch.object(session, 'request') as request:
+            scm_http.get('https://gitlab.example.com/api/v4/projects/1', params={'page': 1})
+            self.assertEqual(request.call_args.kwargs['timeout'],
+                             (scm_http.SCM_HTTP_CONNECT_TIMEOUT, scm_http.SCM_HTTP_READ_TIMEOUT))
+            self.assertEqual(request.call_args.args, ('GET', 'https://gitlab.example.com/api/v4/projects/1'))
+
+            scm_http.post('https://gitlab.example.com/api/v4/projects/1/notes', json={}, timeout=3)
+            self.assertEqual(request.call_args.kwargs['timeout'], 3)
+
+    def test_gzip_and_pool_size(self):
+        session = scm_http.get_session('https://gitlab.example.com')
+        self.assertIn('gzip', session.headers['Accept-Encoding'])
+        self.assertEqual(session.get_adapter('https://gitlab.example.com')._pool_maxsize,
+                         scm_http.SCM_HTTP_POOL_MAXSIZE)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+from unittest import TestCase, main
+from unittest.mock import patch
+
+from biz.utils.token_util import token_budget, changes_token_budget
+
+
+class CharEncoding:
+    """每个字符一个token，测试中替代tiktoken编码器（避免下载BPE文件）"""
+
+    def __init__(self):
+        self.encoded = []
+
+    def encode(self, text: str) -> list:
+        self.encoded.append(text)
+        return list(text)
+
+    def decode(self, tokens: list) -> str:
+        return ''.join(tokens)
+
+
+class TestTokenBudget(TestCase):
+    def setUp(self):
+        self.encoding = CharEncoding()
+        patcher = patch('biz.utils.token_util.get_encoding', return_value=self.encoding)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_count_within_budget(self):
+        budget = token_budget('abcdef', 6)
+        self.assertEqual((budget.text, budget.count, budget.truncated), ('abcdef', 6, False))
+
+    def test_truncation_boundary(self):
+        budget = token_budget('abcdefg', 6)
+        self.assertEqual((budget.text, budget.count, budget.truncated), ('abcdef', 7, True))
+
+    def test_estimate_skips_encoding_for_short_text(self):
+        budget = token_budget('abc', 10, estimate=True)
+        self.assertTrue(budget.estimated)
+        self.assertFalse(budget.truncated)
+        self.assertEqual(self.encoding.encoded, [])
+
+    def test_estimate_encodes_prefix_for_long_text(self):
+        text = 'x' * 1000
+        budget = token_budget(text, 10, estimate=True)
+        self.assertTrue(budget.estimated and budget.truncated)
+        self.assertEqual(budget.text, 'x' * 10)
+        self.assertEqual(budget.count, 1000)
+        # 只编码了开头 max_tokens * ESTIMATE_CHARS_PER_TOKEN 个字符
+        self.assertEqual([len(text) for text in self.encoding.encoded], [80])
+
+
+class TestChangesTokenBudget(TestCase):
+    changes = [{'new_path': 'a.py', 'diff': '+a'}, {'new_path': 'b.py', 'diff': '+bb'}]
+
+    def setUp(self):
+        self.encoding = CharEncoding()
+        patcher = patch('biz.utils.token_util.get_encoding', return_value=self.encoding)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_count_and_file_counts(self):
+        budget = changes_token_budget(self.changes, 1000)
+        self.assertEqual(budget.text, str(self.changes))
+        self.assertEqual(budget.count, len(str(self.changes)))
+        self.assertEqual(budget.file_counts, {'a.py': len(str(self.changes[0])), 'b.py': len(str(self.changes[1]))})
+
+    def test_truncation_matches_whole_text(self):
+        max_tokens = len(str(self.changes)) - 5
+        budget = changes_token_budget(self.changes, max_tokens)
+        self.assertTrue(budget.truncated)
+        self.assertEqual(budget.text, str(self.changes)[:max_tokens])
+
+    def test_estimate_shortcut(self):
+        budget = changes_token_budget(self.changes, 1000, estimate=True)
+        self.assertTrue(budget.estimated)
+        self.assertEqual(budget.text, str(self.changes))
+        self.assertEqual(self.encoding.encoded, [])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+import os
+import tempfile
+from unittest import TestCase, main
+
+from biz.utils.webhook_dedupe import DeliveryDedupe, SqliteDeliveryStore, delivery_key
+
+
+class TestDeliveryKey(TestCase):
+    def test_delivery_header(self):
+        self.assertEqual(delivery_key({'X-GitHub-Delivery': 'abc'}, {}), 'x-github-delivery:abc')
+
+    def test_content_key(self):
+        data = {'object_kind': 'merge_request', 'project': {'path_with_namespace': 'group/app'},
+                'object_attributes': {'action': 'update', 'last_commit': {'id': 'sha1'}}}
+        key = delivery_key({}, data)
+        self.assertTrue(key.startswith('content:'))
+        self.assertEqual(key, delivery_key({}, dict(data)))
+        data['object_attributes'] = {'action': 'update', 'last_commit': {'id': 'sha2'}}
+        self.assertNotEqual(key, delivery_key({}, data))
+
+    def test_unknown_event(self):
+        self.assertIsNone(delivery_key({}, {'foo': 'bar'}))
+
+
+class TestDeliveryDedupe(TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db_file = os.path.join(self.tmpdir.name, 'deliveries.db')
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_claim_once(self):
+        dedupe = DeliveryDedupe(SqliteDeliveryStore(self.db_file), ttl=60)
+        self.assertTrue(dedupe.claim('k1'))
+        self.assertFalse(dedupe.claim('k1'))
+        # 其他进程（独立的进程内缓存）同样识别为重复投递
+        other = DeliveryDedupe(SqliteDeliveryStore(self.db_file), ttl=60)
+        self.assertFalse(other.claim('k1'))
+        self.assertTrue(other.claim('k2'))
+
+    def test_release(self):
+        dedupe = DeliveryDedupe(SqliteDeliveryStore(self.db_file), ttl=60)
+        self.assertTrue(dedupe.claim('k1'))
+        dedupe.release('k1')
+        self.assertTrue(dedupe.claim('k1'))
+
+    def test_expired(self):
+        dedupe = DeliveryDedupe(SqliteDeliveryStore(self.db_file), ttl=0)
+        self.assertTrue(dedupe.claim('k1'))
+        self.assertTrue(dedupe.claim('k1'))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,4 +1,37 @@
-import tiktoken
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import TYPE_CHECKING, Dict, List
+
+if TYPE_CHECKING:
+    import tiktoken
+
+# 估算模式下每个token对应的字符数上限，文本长度远超预算时只编码前 max_tokens * 该值 个字符
+ESTIMATE_CHARS_PER_TOKEN = 8
+
+
+@dataclass
+class TokenBudget:
+    """按token预算处理文本的结果"""
+    text: str  # 预算内的文本（超出时为截断后的文本）
+    count: int  # 原始文本的token数量（estimated为True时为估算值）
+    truncated: bool = False
+    estimated: bool = False
+    file_counts: Dict[str, int] = field(default_factory=dict)  # 每个文件的token数量（仅changes_token_budget提供）
+
+
+@lru_cache(maxsize=None)
+def get_encoding(encoding_name: str = "cl100k_base") -> 'tiktoken.Encoding':
+    """
+    获取编码器，每个进程只加载一次BPE文件（tiktoken在首次使用时导入）。
+
+    Args:
+        encoding_name (str): 编码器名称，默认为 "cl100k_base"（适用于 OpenAI GPT 系列）。
+
+    Returns:
+        tiktoken.Encoding: 编码器。
+    """
+    import tiktoken
+    return tiktoken.get_encoding(encoding_name)
 
 
 def count_tokens(text: str) -> int:
@@ -11,8 +44,7 @@ def count_tokens(text: str) -> int:
     Returns:
         int: token 数量。
     """
-    encoding = tiktoken.get_encoding("cl100k_base")  # 适用于 OpenAI GPT 系列
-    return len(encoding.encode(text))
+    return len(get_encoding().encode(text))
 
 
 def truncate_text_by_tokens(text: str, max_tokens: int, encoding_name: str = "cl100k_base") -> str:
@@ -27,21 +59,94 @@ def truncate_text_by_tokens(text: str, max_tokens: int, encoding_name: str = "cl
     Returns:
         str: 截断后的文本。
     """
-    # 获取编码器
-    encoding = tiktoken.get_encoding(encoding_name)
+    return token_budget(text, max_tokens, encoding_name).text
 
-    # 将文本编码为 tokens
-    tokens = encoding.encode(text)
 
-    # 如果 tokens 数量超过最大限制，则截断
+def token_budget(text: str, max_tokens: int, encoding_name: str = "cl100k_base",
+                 estimate: bool = False) -> TokenBudget:
+    """
+    只编码一次，同时得到token数量和预算内的文本。
+
+    Args:
+        text (str): 原始文本。
+        max_tokens (int): 最大 token 数量。
+        encoding_name (str): 使用的编码器名称。
+        estimate (bool): 估算模式。文本的UTF-8字节数不超过预算时（每个token至少一个字节）直接判定不超限；
+            文本长度远超预算时只编码开头部分，token总数按比例估算。两种情况都跳过完整编码。
+
+    Returns:
+        TokenBudget: 处理结果。
+    """
+    if estimate:
+        byte_length = len(text.encode('utf-8'))
+        if byte_length <= max_tokens:
+            return TokenBudget(text=text, count=byte_length, estimated=True)
+        prefix_length = max_tokens * ESTIMATE_CHARS_PER_TOKEN
+        if len(text) > prefix_length:
+            encoding = get_encoding(encoding_name)
+            prefix_tokens = encoding.encode(text[:prefix_length])
+            if len(prefix_tokens) > max_tokens:
+                estimated_count = int(len(prefix_tokens) * len(text) / prefix_length)
+                return TokenBudget(text=encoding.decode(prefix_tokens[:max_tokens]), count=estimated_count,
+                                   truncated=True, estimated=True)
+
+    encoding = get_encoding(encoding_name)
+    tokens = encoding.encode(text)
     if len(tokens) > max_tokens:
-        truncated_tokens = tokens[:max_tokens]
-        truncated_text = encoding.decode(truncated_tokens)
-        return truncated_text
+        return TokenBudget(text=encoding.decode(tokens[:max_tokens]), count=len(tokens), truncated=True)
+    return TokenBudget(text=text, count=len(tokens))
+
+
+def changes_token_budget(changes: List[dict], max_tokens: int, encoding_name: str = "cl100k_base",
+                         estimate: bool = False) -> TokenBudget:
+    """
+    对changes列表按token预算处理，每个文件只编码一次，并返回每个文件的token数量。
+    返回的文本与 str(changes) 一致（超出预算时为其截断结果）。
+
+    Args:
+        changes (List[dict]): 变更列表，每项包含 new_path、diff 等字段。
+        max_tokens (int): 最大 token 数量。
+        encoding_name (str): 使用的编码器名称。
+        estimate (bool): 估算模式，与 token_budget 相同；命中估算时跳过按文件编码，不提供 file_counts。
+
+    Returns:
+        TokenBudget: 处理结果，count 为各部分token数之和（分段编码，与整体编码结果可能有细微差异）。
+    """
+    if estimate:
+        budget = token_budget(str(changes), max_tokens, encoding_name, estimate=True)
+        if budget.estimated:
+            return budget
+
+    encoding = get_encoding(encoding_name)
+    # str(list) 等价于 "[" + ", ".join(str(item)) + "]"，按文件分段编码
+    separator_tokens = encoding.encode(", ")
+    parts = [encoding.encode("[")]
+    file_counts = {}
+    for index, change in enumerate(changes):
+        if index > 0:
+            parts.append(separator_tokens)
+        change_tokens = encoding.encode(str(change))
+        path = change.get('new_path', '')
+        file_counts[path] = file_counts.get(path, 0) + len(change_tokens)
+        parts.append(change_tokens)
+    parts.append(encoding.encode("]"))
+
+    count = sum(len(part) for part in parts)
+    if count <= max_tokens:
+        return TokenBudget(text=str(changes), count=count, file_counts=file_counts)
+
+    kept = []
+    remaining = max_tokens
+    for part in parts:
+        if len(part) >= remaining:
+            kept.append(encoding.decode(part[:remaining]))
+            break
+        kept.append(encoding.decode(part))
+        remaining -= len(part)
+    return TokenBudget(text=''.join(kept), count=count, truncated=True, file_counts=file_counts)
 
-    return text
 
 if __name__ == '__main__':
     text = "Hello, world! This is a test text for token counting."
     print(count_tokens(text))  # 输出：11
-    print(truncate_text_by_tokens(text, 5))  # 输出："Hello, world!"
\ No newline at end of file
+    print(truncate_text_by_tokens(text, 5))  # 输出："Hello, world!"
@@ -0,0 +1,183 @@
+"""
+Webhook 投递去重
+
+GitLab、GitHub、Gitea 在投递超时后会重新投递同一个事件，每次投递都会被放入队列并重复审查。
+这里在入队前按投递标识登记，同一投递在 WEBHOOK_DEDUPE_TTL 秒内再次到达时直接返回，不再入队：
+- 优先使用平台的投递ID（Idempotency-Key、X-Gitlab-Event-UUID、X-GitHub-Delivery、X-Gitea-Delivery）；
+- 没有投递ID时使用 (项目, 事件, 动作, head commit) 作为标识；
+- 进程内保留最近登记过的标识（LRU），重复投递无需访问存储；
+- 登记保存在 data/webhook_deliveries.db（主键索引，INSERT OR IGNORE 原子登记），
+  QUEUE_DRIVER=rq 时改为 Redis（SET NX EX），多个API进程共享。
+入队失败（如队列已满返回429）时撤销登记，平台重试时可以正常入队。
+"""
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Mapping, Optional
+
+from biz.utils.db import get_connection
+from biz.utils.log import logger
+from biz.utils.queue import queue_driver, get_redis_connection
+
+WEBHOOK_DEDUPE_ENABLED = os.getenv('WEBHOOK_DEDUPE_ENABLED', '1') == '1'
+WEBHOOK_DEDUPE_TTL = int(os.getenv('WEBHOOK_DEDUPE_TTL', 86400))
+WEBHOOK_DEDUPE_CACHE_SIZE = int(os.getenv('WEBHOOK_DEDUPE_CACHE_SIZE', 10000))
+
+DELIVERY_ID_HEADERS = ['Idempotency-Key', 'X-Gitlab-Event-UUID', 'X-GitHub-Delivery', 'X-Gitea-Delivery']
+
+
+def get_project_root():
+    """获取项目根目录的绝对路径"""
+    if 'PROJECT_ROOT' in os.environ:
+        return Path(os.environ['PROJECT_ROOT'])
+    current_file = Path(__file__).resolve()
+    return current_file.parent.parent.parent
+
+
+def delivery_key(headers: Mapping[str, str], data: dict) -> Optional[str]:
+    """计算投递标识，无法识别事件时返回None（不去重）"""
+    for header in DELIVERY_ID_HEADERS:
+        value = headers.get(header)
+        if value:
+            return f'{header.lower()}:{value}'
+
+    # 没有投递ID时按事件内容识别
+    event = headers.get('X-GitHub-Event') or headers.get('X-Gitea-Event') or data.get('object_kind')
+    if not event:
+        return None
+    project = data.get('project') or {}
+    repository = data.get('repository') or {}
+    project_name = project.get('path_with_namespace') or project.get('id') or repository.get('full_name')
+    object_attributes = data.get('object_attributes') or {}
+    pull_request = data.get('pull_request') or {}
+    action = object_attributes.get('action') or data.get('action') or data.get('ref') or ''
+    sha = ((object_attributes.get('last_commit') or {}).get('id')
+           or (pull_request.get('head') or {}).get('sha')
+           or data.get('after') or data.get('checkout_sha'))
+    if not project_name or not sha:
+        return None
+    digest = hashlib.sha256(f'{project_name}|{event}|{action}|{sha}'.encode('utf-8')).hexdigest()
+    return f'content:{digest}'
+
+
+class SqliteDeliveryStore:
+    DB_TIMEOUT = 30.0
+    PURGE_INTERVAL = 3600
+
+    def __init__(self, db_file: str):
+        self.db_file = db_file
+        self._initialized = False
+        self._last_purge = 0.0
+        self._lock = threading.Lock()
+
+    def get_db_connection(self):
+        conn = get_connection(self.db_file, self.DB_TIMEOUT)
+        if not self._initialized:
+            with self._lock:
+                conn.execute('''
+                    CREATE TABLE IF NOT EXISTS webhook_deliveries (
+                        delivery_key TEXT PRIMARY KEY,
+                        expires_at INTEGER NOT NULL
+                    )
+                ''')
+                conn.execute('CREATE INDEX IF NOT EXISTS idx_webhook_deliveries_expires_at '
+                             'ON webhook_deliveries (expires_at);')
+                conn.commit()
+                self._initialized = True
+        return conn
+
+    def claim(self, key: str, ttl: int) -> bool:
+        now = int(time.time())
+        conn = self.get_db_connection()
+        try:
+            # 已过期的登记视为不存在
+            conn.execute('DELETE FROM webhook_deliveries WHERE delivery_key = ? AND expires_at <= ?', (key, now))
+            cursor = conn.execute('INSERT OR IGNORE INTO webhook_deliveries (delivery_key, expires_at) VALUES (?, ?)',
+                                  (key, now + ttl))
+            if now - self._last_purge > self.PURGE_INTERVAL:
+                conn.execute('DELETE FROM webhook_deliveries WHERE expires_at <= ?', (now,))
+                self._last_purge = now
+            conn.commit()
+            return cursor.rowcount == 1
+        finally:
+            conn.close()
+
+    def release(self, key: str):
+        conn = self.get_db_connection()
+        try:
+            conn.execute('DELETE FROM webhook_deliveries WHERE delivery_key = ?', (key,))
+            conn.commit()
+        finally:
+            conn.close()
+
+
+class RedisDeliveryStore:
+    KEY_PREFIX = 'review:delivery:'
+
+    def claim(self, key: str, ttl: int) -> bool:
+        return bool(get_redis_connection().set(self.KEY_PREFIX + key, 1, nx=True, ex=ttl))
+
+    def release(self, key: str):
+        get_redis_connection().delete(self.KEY_PREFIX + key)
+
+
+class DeliveryDedupe:
+    def __init__(self, store, ttl: int = WEBHOOK_DEDUPE_TTL, cache_size: int = WEBHOOK_DEDUPE_CACHE_SIZE):
+        self.store = store
+        self.ttl = ttl
+        self.cache_size = cache_size
+        # key -> 登记过期时间
+        self._recent = OrderedDict()
+        self._lock = threading.Lock()
+        self.duplicates = 0
+
+    def _seen_recently(self, key: str) -> bool:
+        with self._lock:
+            expires_at = self._recent.get(key)
+            if expires_at is None:
+                return False
+            if expires_at <= time.monotonic():
+                del self._recent[key]
+                return False
+            return True
+
+    def claim(self, key: str) -> bool:
+        """
+        登记一次投递
+        :return: 首次到达返回True；TTL内重复到达返回False
+        """
+        if self._seen_recently(key):
+            self.duplicates += 1
+            return False
+        try:
+            claimed = self.store.claim(key, self.ttl)
+        except Exception as e:
+            # 存储不可用时放行，宁可重复审查也不丢弃事件
+            logger.warn(f'Webhook dedupe store unavailable, accept delivery: {e}')
+            return True
+        with self._lock:
+            self._recent[key] = time.monotonic() + self.ttl
+            self._recent.move_to_end(key)
+            while len(self._recent) > self.cache_size:
+                self._recent.popitem(last=False)
+        if not claimed:
+            self.duplicates += 1
+        return claimed
+
+    def release(self, key: str):
+        """撤销登记，用于入队失败的投递"""
+        with self._lock:
+            self._recent.pop(key, None)
+        try:
+            self.store.release(key)
+        except Exception as e:
+            logger.warn(f'Failed to release webhook delivery {key}: {e}')
+
+
+if queue_driver == 'rq':
+    delivery_dedupe = DeliveryDedupe(RedisDeliveryStore())
+else:
+    delivery_dedupe = DeliveryDedupe(SqliteDeliveryStore(str(get_project_root() / 'data' / 'webhook_deliveries.db')))
@@ -9,9 +9,9 @@ os.environ['PROJECT_ROOT'] = str(PROJECT_ROOT)
 
 print("初始化数据库...")
 
-# 导入服务会自动触发数据库初始化
-from biz.service.review_service import ReviewService
-from biz.service.rule_service import RuleService
+from biz.bootstrap import bootstrap
+
+bootstrap()
 
 print("✓ 数据库初始化完成")
 print("✓ 规则表已创建")
@@ -7,6 +7,7 @@ from pathlib import Path
 import streamlit as st
 from dotenv import load_dotenv
 
+from biz.bootstrap import bootstrap
 from biz.service.rule_service import RuleService
 
 # 获取项目根目录
@@ -24,6 +25,7 @@ st.set_page_config(layout="wide", page_title="规则管理 - AI代码审查平
 # 加载环境变量
 env_path = PROJECT_ROOT / "conf" / ".env"
 load_dotenv(env_path)
+bootstrap()
 
 # 导入认证相关的配置和函数（不导入ui.py以避免set_page_config冲突）
 import sys
@@ -1,15 +1,39 @@
 # -*- coding: utf-8 -*-
 """规则服务测试脚本"""
 import os
+import tempfile
 from pathlib import Path
+from unittest.mock import patch
 
 # 设置项目根目录
 PROJECT_ROOT = Path(__file__).resolve().parent
 os.environ['PROJECT_ROOT'] = str(PROJECT_ROOT)
 
+from biz.service.review_service import ReviewService
 from biz.service.rule_service import RuleService
 from biz.utils.code_reviewer import CodeReviewer
 
+_tmpdir = None
+_patchers = []
+
+
+def setup_module(module=None):
+    """使用临时数据库，测试不修改 data/data.db"""
+    global _tmpdir
+    _tmpdir = tempfile.TemporaryDirectory()
+    db_file = os.path.join(_tmpdir.name, 'data.db')
+    for service in (ReviewService, RuleService):
+        patcher = patch.object(service, 'DB_FILE', db_file)
+        patcher.start()
+        _patchers.append(patcher)
+
+
+def teardown_module(module=None):
+    while _patchers:
+        _patchers.pop().stop()
+    _tmpdir.cleanup()
+
+
 def test_rule_import():
     """测试从YAML导入规则"""
     print("\n=== 测试1: 从YAML导入规则 ===")
@@ -154,6 +178,7 @@ def main():
         ("规则列表", test_all_rules),
     ]
     
+    setup_module()
     results = []
     for name, test_func in tests:
         try:
@@ -162,6 +187,7 @@ def main():
         except Exception as e:
             print(f"\n测试 {name} 发生异常: {e}")
             results.append((name, False))
+    teardown_module()
     
     # 输出测试结果
     print("\n" + "=" * 60)
@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""
+导入耗时基准
+
+在全新的子进程中以 python -X importtime 导入各入口模块，统计总耗时（多次运行取中位数）以及累计耗时最高的模块，
+用于跟踪 api.py、队列worker的冷启动开销。导入 api 与执行 python -X importtime api.py 的导入阶段相同，但不会启动服务。
+
+用法：
+    python tools/bench_import_time.py
+    python tools/bench_import_time.py --modules api --runs 5 --top 20
+    python tools/bench_import_time.py --budget-ms 800   # 任一模块的中位数超出预算时返回非0，可用于CI
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_MODULES = ['api', 'biz.queue.worker', 'biz.queue.rq_worker']
+
+
+def import_times(module: str) -> Tuple[int, Dict[str, int]]:
+    """
+    在子进程中导入模块
+    :return: (模块总耗时微秒, {模块名: 累计耗时微秒})
+    """
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                            cwd=PROJECT_ROOT, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f'import {module} failed:\n{result.stderr[-2000:]}')
+    cumulative = {}
+    for line in result.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith('import time:') or 'imported package' in line:
+            continue
+        _, cumulative_us, name = line[len('import time:'):].split('|')
+        cumulative[name.strip()] = int(cumulative_us)
+    return cumulative.get(module, 0), cumulative
+
+
+def bench(module: str, runs: int) -> Tuple[float, List[Tuple[str, int]]]:
+    totals = []
+    cumulative = {}
+    for _ in range(runs):
+        total, cumulative = import_times(module)
+        totals.append(total)
+    ranking = sorted(((name, us) for name, us in cumulative.items() if name != module),
+                     key=lambda item: item[1], reverse=True)
+    return statistics.median(totals) / 1000, ranking
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure cold import time of the service entry points')
+    parser.add_argument('--modules', nargs='+', default=DEFAULT_MODULES)
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--top', type=int, default=10, help='show the N slowest imported modules (cumulative)')
+    parser.add_argument('--budget-ms', type=float, default=0, help='exit with 1 when a median exceeds the budget')
+    args = parser.parse_args()
+
+    # 与服务相同的环境：入口模块导入前会加载 conf/.env
+    os.chdir(PROJECT_ROOT)
+    over_budget = []
+    for module in args.modules:
+        median_ms, ranking = bench(module, args.runs)
+        print(f'{module}: {median_ms:.1f} ms (median of {args.runs})')
+        for name, us in ranking[:args.top]:
+            print(f'    {us / 1000:8.1f} ms  {name}')
+        if args.budget_ms and median_ms > args.budget_ms:
+            over_budget.append(module)
+
+    if over_budget:
+        print(f'Over budget ({args.budget_ms} ms): {", ".join(over_budget)}')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
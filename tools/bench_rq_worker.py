@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+"""
+rq worker 单任务固定开销基准
+
+模拟 rq worker 执行任务的方式，测量每个任务在真正调用LLM之前的准备耗时
+（导入 biz.queue.worker、加载tiktoken编码器、读取并渲染提示词、创建LLM客户端），不需要Redis：
+- cold：默认 rq Worker，主进程未预加载，每个任务fork出的子进程从头完成准备；
+- fork：WarmWorker / WarmLaneWorker，主进程执行 preload() 后fork，子进程通过写时复制继承；
+- inproc：WarmSimpleWorker，预加载后在主进程内连续执行任务。
+
+用法：
+    python tools/bench_rq_worker.py
+    python tools/bench_rq_worker.py --jobs 20 --modes cold fork
+离线环境无法下载tiktoken的BPE文件时，编码器一项会失败并在结果中注明，其余项照常统计。
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+# 创建LLM客户端不会发起请求，未配置时使用占位的API Key
+os.environ.setdefault('LLM_PROVIDER', 'openai')
+os.environ.setdefault('OPENAI_API_KEY', 'sk-bench')
+os.environ.setdefault('OPENAI_API_BASE_URL', 'https://api.openai.com/v1')
+
+
+def job_setup() -> list:
+    """任务执行前的准备工作，返回失败的步骤"""
+    failed = []
+    try:
+        import biz.queue.worker  # noqa: F401
+    except Exception:
+        failed.append('modules')
+    try:
+        from biz.utils.token_util import get_encoding
+        get_encoding().encode('warm up')
+    except Exception:
+        failed.append('encoder')
+    try:
+        from biz.service.rule_service import rule_cache
+        rule_cache.get_prompts('code_review_prompt', os.getenv('REVIEW_STYLE', 'professional'))
+    except Exception:
+        failed.append('prompts')
+    try:
+        from biz.llm.factory import Factory
+        Factory.getClient()
+    except Exception:
+        failed.append('llm client')
+    return failed
+
+
+def forked_job() -> float:
+    """与rq的work horse相同：fork子进程执行任务，返回从fork到子进程退出的耗时（秒）"""
+    started = time.perf_counter()
+    pid = os.fork()
+    if pid == 0:
+        failed = job_setup()
+        os._exit(1 if failed else 0)
+    os.waitpid(pid, 0)
+    return time.perf_counter() - started
+
+
+def run_mode(mode: str, jobs: int):
+    """在当前进程中执行一种模式，输出 '中位数ms 失败步骤'"""
+    from biz.queue.rq_worker import preload
+    if mode in ('fork', 'inproc'):
+        preload()
+    failed = []
+    timings = []
+    for _ in range(jobs):
+        if mode == 'inproc':
+            started = time.perf_counter()
+            failed = job_setup()
+            timings.append(time.perf_counter() - started)
+        else:
+            timings.append(forked_job())
+    if mode != 'inproc':
+        failed = job_setup()
+    print(f'{statistics.median(timings) * 1000:.1f} {",".join(failed)}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure per-job setup overhead of rq workers')
+    parser.add_argument('--jobs', type=int, default=10)
+    parser.add_argument('--modes', nargs='+', default=['cold', 'fork', 'inproc'], choices=['cold', 'fork', 'inproc'])
+    parser.add_argument('--run-mode', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_mode:
+        run_mode(args.run_mode, args.jobs)
+        return
+
+    # 每种模式在独立的进程中测量，互不影响已导入的模块
+    for mode in args.modes:
+        result = subprocess.run([sys.executable, __file__, '--run-mode', mode, '--jobs', str(args.jobs)],
+                                cwd=PROJECT_ROOT, capture_output=True, text=True)
+        if result.returncode != 0:
+            print(f'{mode}: failed\n{result.stderr[-2000:]}')
+            continue
+        median_ms, _, failed = result.stdout.strip().splitlines()[-1].partition(' ')
+        note = f'  (failed: {failed})' if failed else ''
+        print(f'{mode:>6}: {float(median_ms):8.1f} ms per job (median of {args.jobs}){note}')
+
+
+if __name__ == '__main__':
+    main()
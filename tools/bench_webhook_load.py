@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+"""
+Webhook 接入压测
+
+以固定并发向 /review/webhook 发送GitLab push事件（每个请求使用不同的commit，不会被去重），
+统计吞吐（requests/s）以及确认延迟（收到响应的耗时）的p50/p99和状态码分布。
+
+用法：
+    # 压测已启动的服务（python api.py 或 uvicorn asgi:app），注意会真实入队
+    python tools/bench_webhook_load.py --url http://127.0.0.1:5001 --requests 2000 --concurrency 50
+
+    # 不启动服务，直接在进程内压测 ASGI 应用（asgi）或 Flask 应用（flask），入队替换为空操作，只测接入开销
+    python tools/bench_webhook_load.py --inprocess asgi
+    python tools/bench_webhook_load.py --inprocess flask
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+import uuid
+from collections import Counter
+from pathlib import Path
+from typing import List
+
+import httpx
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+
+def push_payload(commit_count: int) -> dict:
+    sha = uuid.uuid4().hex + uuid.uuid4().hex[:8]
+    return {
+        'object_kind': 'push',
+        'ref': 'refs/heads/main',
+        'before': '0' * 40,
+        'after': sha,
+        'checkout_sha': sha,
+        'project': {'id': 1, 'path_with_namespace': 'bench/project', 'web_url': 'https://gitlab.example.com/bench/project'},
+        'repository': {'homepage': 'https://gitlab.example.com/bench/project'},
+        'commits': [{'id': uuid.uuid4().hex, 'message': f'bench commit {i}', 'author': {'name': 'bench'}}
+                    for i in range(commit_count)],
+    }
+
+
+def percentile(values: List[float], percent: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(percent / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+async def run(client: httpx.AsyncClient, total: int, concurrency: int, commit_count: int):
+    headers = {'X-Gitlab-Token': 'bench-token', 'X-Gitlab-Instance': 'https://gitlab.example.com'}
+    latencies = []
+    statuses = Counter()
+    remaining = iter(range(total))
+
+    async def sender():
+        for _ in remaining:
+            payload = push_payload(commit_count)
+            started = time.perf_counter()
+            try:
+                response = await client.post('/review/webhook', json=payload, headers=headers)
+                statuses[response.status_code] += 1
+            except httpx.HTTPError as e:
+                statuses[type(e).__name__] += 1
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(sender() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    print(f'requests: {total}, concurrency: {concurrency}, elapsed: {elapsed:.2f}s')
+    print(f'throughput: {total / elapsed:.1f} requests/s')
+    print(f'ack latency: p50 {statistics.median(latencies) * 1000:.1f} ms, '
+          f'p99 {percentile(latencies, 99) * 1000:.1f} ms, max {max(latencies) * 1000:.1f} ms')
+    print(f'status: {dict(statuses)}')
+
+
+def inprocess_transport(kind: str) -> httpx.AsyncBaseTransport:
+    # 入队替换为空操作，不启动任务进程、不连接Redis；关闭去重（每次投递都完整处理）
+    os.environ['WEBHOOK_DEDUPE_ENABLED'] = '0'
+    from biz import intake
+    intake.handle_queue = lambda *args, **kwargs: None
+    intake.WEBHOOK_DEDUPE_ENABLED = False
+    if kind == 'asgi':
+        from asgi import WebhookApp
+        return httpx.ASGITransport(app=WebhookApp(start_services=False))
+
+    # Flask为WSGI应用，在线程中同步调用，模拟多线程WSGI服务器
+    from api import api_app
+    wsgi_transport = httpx.WSGITransport(app=api_app)
+
+    class ThreadedWSGITransport(httpx.AsyncBaseTransport):
+        async def handle_async_request(self, request):
+            request.read()
+            response = await asyncio.to_thread(wsgi_transport.handle_request, request)
+            return httpx.Response(response.status_code, headers=response.headers, content=response.read())
+
+    return ThreadedWSGITransport()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test the webhook intake endpoint')
+    parser.add_argument('--url', default='http://127.0.0.1:5001')
+    parser.add_argument('--inprocess', choices=['asgi', 'flask'], help='call the app in-process instead of --url')
+    parser.add_argument('--requests', type=int, default=1000)
+    parser.add_argument('--concurrency', type=int, default=50)
+    parser.add_argument('--commits', type=int, default=20, help='commits per push payload')
+    args = parser.parse_args()
+
+    os.chdir(PROJECT_ROOT)
+    if args.inprocess:
+        client = httpx.AsyncClient(transport=inprocess_transport(args.inprocess), base_url='http://bench')
+    else:
+        limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+        client = httpx.AsyncClient(base_url=args.url, limits=limits, timeout=60)
+
+    async def bench():
+        async with client:
+            await run(client, args.requests, args.concurrency, args.commits)
+
+    asyncio.run(bench())
+
+
+if __name__ == '__main__':
+    main()
@@ -10,14 +10,11 @@ import time
 from pathlib import Path
 
 import pandas as pd
-import matplotlib.pyplot as plt
-import matplotlib as mpl
-import matplotlib.font_manager as fm
 import streamlit as st
 from dotenv import load_dotenv
-from matplotlib.ticker import MaxNLocator
 from streamlit_cookies_manager import CookieManager
 
+from biz.bootstrap import bootstrap
 from biz.service.review_service import ReviewService
 
 # 获取项目根目录（基于当前脚本文件的位置）
@@ -41,14 +38,19 @@ load_dotenv(env_path)
 
 DETAIL_PAGE_PATH = "/review_detail"
 DETAIL_COLUMN_NAME = "详细信息"
-HIDDEN_COLUMNS = ['id', 'review_result']
+HIDDEN_COLUMNS = ['id', 'has_review']
 JS_INIT_DELAYS = [100, 500]
 DETAIL_LINK_ICON = "📋"
 NO_REVIEW_ICON = "⚠️"
 NO_REVIEW_STYLE = "color: #cccccc; cursor: not-allowed; font-size: 1.2rem;"
 
 
+bootstrap()
+
+
 def set_global_font():
+    import matplotlib as mpl
+    import matplotlib.font_manager as fm
     font_path = PROJECT_ROOT / "fonts" / "SourceHanSansCN-Regular.otf"
     if font_path.exists():
         try:
@@ -58,8 +60,18 @@ def set_global_font():
             st.warning(f"字体加载失败：{e}")
     mpl.rcParams["axes.unicode_minus"] = False
 
-# 在 st.set_page_config() 之后调用 set_global_font()
-set_global_font()
+
+# matplotlib 在首次绘制图表时导入并设置字体（登录页等不绘图的页面无需加载）
+_pyplot = None
+
+
+def get_pyplot():
+    global _pyplot
+    if _pyplot is None:
+        import matplotlib.pyplot as plt
+        set_global_font()
+        _pyplot = plt
+    return _pyplot
 
 DASHBOARD_USER = os.getenv("DASHBOARD_USER", "admin")
 DASHBOARD_PASSWORD = os.getenv("DASHBOARD_PASSWORD", "admin")
@@ -180,8 +192,8 @@ def _build_detail_urls(df, tab_type):
         try:
             record_id = row.get('id')
             record_id = int(record_id) if record_id is not None and not pd.isna(record_id) else int(idx) if isinstance(idx, (int, float)) else idx
-            review_result = row.get('review_result', '')
-            has_review = review_result and not pd.isna(review_result) and review_result.strip() != ""
+            has_review = row.get('has_review', 0)
+            has_review = not pd.isna(has_review) and bool(has_review)
             urls.append(f"{DETAIL_PAGE_PATH}?id={record_id}&type={tab_type}" if has_review else "")
         except:
             urls.append("")
@@ -268,6 +280,8 @@ def _create_bar_chart(df, x_col, y_col, colormap='tab20', use_mean=False):
         data = df[x_col].value_counts().reset_index()
         data.columns = [x_col, 'count']
         y_values = data['count']
+    from matplotlib.ticker import MaxNLocator
+    plt = get_pyplot()
     colors = plt.colormaps[colormap].resampled(len(data))
     fig, ax = plt.subplots(figsize=(10, 6))
     ax.bar(data[x_col], y_values, color=[colors(i) for i in range(len(data))])
@@ -300,6 +314,7 @@ def generate_author_code_line_chart(df):
         return
     add_data = df.groupby('author')['additions'].sum().reset_index()
     del_data = df.groupby('author')['deletions'].sum().reset_index()
+    plt = get_pyplot()
     fig, ax = plt.subplots(figsize=(10, 6))
     ax.bar(add_data['author'], add_data['additions'], color=(0.7, 1, 0.7))
     ax.bar(del_data['author'], -del_data['deletions'], color=(1, 0.7, 0.7))